@@ -16,6 +16,9 @@ Including another URLconf
 from django.urls import path, include
 from organization.views import OrganizationList
 from application.views import ApplicationList
+from distribute.views import ReleaseManifest, SignedDownload, UpdateCheck
+from util.permission import cache_metrics
+from util.replica import database_metrics
 
 urlpatterns = [
     path('api/user/', include('user.urls')),
@@ -25,4 +28,9 @@ urlpatterns = [
     path('api/orgs', OrganizationList.as_view()),
     path('api/orgs/', include('organization.urls')),
     path('api/orgs/', include('distribute.urls.org_app')),
+    path('api/updates/<uuid:deployment_key>', UpdateCheck.as_view()),
+    path('api/downloads/<str:token>', SignedDownload.as_view(), name='signed-download'),
+    path('api/manifests/<str:token>', ReleaseManifest.as_view(), name='release-manifest'),
+    path('api/metrics/cache', cache_metrics),
+    path('api/metrics/database', database_metrics),
 ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_apps(apps, schema_editor):
+    """Stop when two apps of an owner or an organization share a name.
+
+    They may hold packages and releases of their own, so which one to keep
+    is left to an administrator.
+    """
+    Application = apps.get_model('application', 'Application')
+    duplicates = []
+    for field in ('owner', 'org'):
+        rows = Application.objects.filter(**{field + '__isnull': False}).values(field, 'name').annotate(rows=Count('pk')).filter(rows__gt=1)
+        duplicates += ['{0} {1}: {2}'.format(field, row[field], row['name']) for row in rows]
+    if duplicates:
+        raise RuntimeError('Rename or delete the apps sharing a name before migrating: ' + ', '.join(duplicates) + '.')
+
+
+def merge_duplicate_members(apps, schema_editor):
+    """Keep one membership per user of an app, the one with the strongest role.
+
+    The check-then-create of the member views could add a user twice.
+    """
+    ApplicationUser = apps.get_model('application', 'ApplicationUser')
+    duplicates = ApplicationUser.objects.values('app', 'user').annotate(rows=Count('pk')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        rows = ApplicationUser.objects.filter(app=duplicate['app'], user=duplicate['user']).order_by('role', 'pk')
+        ApplicationUser.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_apps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='application',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='unique_owner_app_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='application',
+            constraint=models.UniqueConstraint(fields=('org', 'name'), name='unique_org_app_name'),
+        ),
+        migrations.RunPython(merge_duplicate_members, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='applicationuser',
+            constraint=models.UniqueConstraint(fields=('app', 'user'), name='unique_app_user'),
+        ),
+    ]
@@ -59,6 +59,14 @@ class Application(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # An app belongs to either a user or an organization, the other
+        # column is NULL and never conflicts.
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name'], name='unique_owner_app_name'),
+            models.UniqueConstraint(fields=['org', 'name'], name='unique_org_app_name'),
+        ]
+
 class ApplicationUser(models.Model):
     class ApplicationUserRole(models.IntegerChoices):
         Manager = 1
@@ -70,6 +78,11 @@ class ApplicationUser(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['app', 'user'], name='unique_app_user'),
+        ]
+
 class UniversalApp(models.Model):
     iOS = models.OneToOneField(Application, related_name='iOS', on_delete=models.CASCADE)
     android = models.OneToOneField(Application, related_name='Android', on_delete=models.CASCADE)
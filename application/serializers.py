@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from application.models import Application, ApplicationUser
 from util.choice import ChoiceField
+from util.media import MediaUrlField
 from util.visibility import VisibilityType
 
 
@@ -13,14 +14,8 @@ class ApplicationSerializer(serializers.ModelSerializer):
     release_type = ChoiceField(choices=Application.ReleaseType.choices)
     os = ChoiceField(choices=Application.OperatingSystem.choices, help_text='The OS the app will be running on')
     platform = ChoiceField(choices=Application.Platform.choices, help_text='The platform of the app')
-    icon_file = serializers.SerializerMethodField()
+    icon_file = MediaUrlField()
 
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.icon_file.url)
-        except:
-            return ''
     class Meta:
         model = Application
         read_only_fields = ['icon_file']
@@ -39,18 +34,11 @@ class UserApplicationSerializer(serializers.ModelSerializer):
     release_type = ChoiceField(choices=Application.ReleaseType.choices, source='app.release_type')
     os = ChoiceField(choices=Application.OperatingSystem.choices, source='app.os', help_text='The OS the app will be running on')
     platform = ChoiceField(choices=Application.Platform.choices, source='app.platform', help_text='The platform of the app')
-    icon_file = serializers.SerializerMethodField()
+    icon_file = MediaUrlField(source='app.icon_file')
     role = ChoiceField(choices=ApplicationUser.ApplicationUserRole.choices, required=False)
     update_time = serializers.ReadOnlyField(source='app.update_time')
     create_time = serializers.ReadOnlyField(source='app.create_time')
 
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.app.icon_file.url)
-        except:
-            return ''
-
     class Meta:
         model = ApplicationUser
         fields = ['role', 'name', 'display_name', 'description', 'icon_file', 'visibility', 'release_type', 'os', 'platform', 'update_time', 'create_time']
@@ -224,3 +224,48 @@ class ApplicationCreateTest(BaseTestCase):
 
         r3 = self.client.app.get_one(self.client_name, app['name'])
         self.assert_status_404(r3)
+
+    def test_list_apps(self):
+        visibility = ['Public', 'Internal', 'Private']
+        apps = []
+        for i in range(15):
+            app = self.generate_app(visibility[i % 3])
+            app['os'], app['platform'] = ('Android', 'JavaKotlin') if i % 2 else ('iOS', 'ObjectiveCSwift')
+            self.assert_status_201(self.client.app.create(app))
+            apps.append(app)
+        jack = ApiClient(UnitTestClient('/api/', 'jack'))
+        ApiClient(UnitTestClient('/api/', 'paul'))
+        self.assert_status_201(self.client.app.add_member('admin', apps[2]['name'], {'username': 'jack', 'role': 'Developer'}))
+        self.assert_status_201(self.client.app.add_member('admin', apps[2]['name'], {'username': 'paul', 'role': 'Viewer'}))
+
+        # An app with several members is listed once.
+        r = self.client.app.get_list('admin', {'count': 'true', 'top': 100})
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['count'], 15)
+        self.assert_list_length(r, 15)
+        self.assertTrue(all(app['role'] == 'Manager' for app in self.get_resp_list(r)))
+
+        r = jack.app.get_list('admin', {'filter': "visibility eq 'Private'"})
+        self.assertEqual([(app['name'], app['role']) for app in self.get_resp_list(r)], [(apps[2]['name'], 'Developer')])
+
+        r = self.client.app.get_list('admin', {'filter': "os eq 'Android' and visibility ne 'Public'", 'sort': 'display_name desc'})
+        self.assert_status_200(r)
+        expected = [app['name'] for app in apps if app['os'] == 'Android' and app['visibility'] != 'Public']
+        expected.sort(key=lambda name: [app['display_name'] for app in apps if app['name'] == name][0], reverse=True)
+        self.assertEqual([app['name'] for app in self.get_resp_list(r)], expected)
+
+        names = []
+        query = {'top': 4, 'sort': '-create_time'}
+        while True:
+            r = self.client.app.get_list('admin', query)
+            self.assert_status_200(r)
+            names += [app['name'] for app in self.get_resp_list(r)]
+            if 'cursor' not in r.json():
+                break
+            query['cursor'] = r.json()['cursor']
+        self.assertEqual(names, [app['name'] for app in reversed(apps)])
+
+        r = self.client.app.get_list('admin', {'filter': "os eq 'BlackBerry'"})
+        self.assert_status_400(r)
+        r = self.client.app.get_list('admin', {'sort': 'description'})
+        self.assert_status_400(r)
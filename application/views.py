@@ -1,7 +1,7 @@
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
 from django.http import Http404
-from django.db.models import Q
+from django.db.models import F, FilteredRelation, Q
 from django.contrib.auth.models import User
 from rest_framework import permissions, status
 from rest_framework.response import Response
@@ -10,58 +10,54 @@ from application.models import Application, ApplicationUser
 from application.serializers import *
 from util.visibility import VisibilityType
 from util.choice import ChoiceField
-
-def viewer_query(ownername, app_name, user):
-    if user.is_authenticated:
-        allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-        q1 = Q(app__name=app_name, app__owner__username=ownername)
-        q2 = Q(app__visibility__in=allow_visibility)
-        q3 = Q(user=user)
-        return (q2 | q3) & q1
-    else:
-        q1 = Q(app__name=app_name, app__owner__username=ownername)
-        q2 = Q(app__visibility=VisibilityType.Public)
-        return q1 & q2
-
-def check_app_view_permission(ownername, app_name, user):
-    try:
-        return ApplicationUser.objects.get(viewer_query(ownername, app_name, user))
-    except ApplicationUser.DoesNotExist:
-        raise Http404
-
-def check_app_manager_permission(ownername, app_name, user):
-    try:
-        manager_role = ApplicationUser.ApplicationUserRole.Manager
-        user_app = ApplicationUser.objects.get(app__name=app_name, app__owner__username=ownername, user=user)
-        if user_app.role != manager_role:
-            raise PermissionDenied
-        return user_app
-    except ApplicationUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Application.objects.get(name=app_name, owner__username=ownername, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Application.DoesNotExist:
-            raise Http404
+from util.conditional import respond_with_objects
+from util.media import media_urls
+from util.pagination import ListField, paginate
+from util.permission import check_app_view_permission, check_app_manager_permission
+
+app_list_fields = {
+    'name': ListField('name'),
+    'display_name': ListField('display_name'),
+    'visibility': ListField('visibility', VisibilityType),
+    'release_type': ListField('release_type', Application.ReleaseType),
+    'os': ListField('os', Application.OperatingSystem),
+    'platform': ListField('platform', Application.Platform),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
+
+member_list_fields = {
+    'username': ListField('user__username'),
+    'role': ListField('role', ApplicationUser.ApplicationUserRole),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
 
 class ApplicationList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, ownername):
+        apps = Application.objects.filter(owner__username=ownername)
         if request.user.is_authenticated:
-            q1 = Q(app__owner__username=ownername)
-            q2 = Q(app__visibility=VisibilityType.Public) | Q(app__visibility=VisibilityType.Internal)
-            q3 = Q(user=request.user, app__owner__username=ownername)
-            apps = ApplicationUser.objects.filter(q3 | (q1 & q2))
-            # todo： an app has multi member
-            # print('====')
-            # for app in apps:
-            #     print('{0}: {1}'.format(app.user.username, app.app.name))
-            serializer = UserApplicationSerializer(apps, many=True, context={'request': request})
+            # LEFT JOIN the user's own membership, if any, to get the role.
+            apps = apps.annotate(
+                membership=FilteredRelation('applicationuser', condition=Q(applicationuser__user=request.user)),
+                role=F('membership__role'))
+            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
+            apps = apps.filter(Q(visibility__in=allow_visibility) | Q(role__isnull=False))
         else:
-            apps = Application.objects.filter(owner__username=ownername, visibility=VisibilityType.Public)
-            serializer = ApplicationSerializer(apps, many=True, context={'request': request})
-        return Response(serializer.data)
+            apps = apps.filter(visibility=VisibilityType.Public)
+
+        def serialize(apps):
+            data = ApplicationSerializer(apps, many=True, context={'request': request}).data
+            role_field = ChoiceField(choices=ApplicationUser.ApplicationUserRole.choices)
+            for app, item in zip(apps, data):
+                if getattr(app, 'role', None) is not None:
+                    item['role'] = role_field.to_representation(app.role)
+            return data
+        # A role change only touches the membership row.
+        times = ['update_time', 'membership__update_time'] if request.user.is_authenticated else ['update_time']
+        return paginate(request, apps, ['name'], serialize, app_list_fields, times)
 
     @transaction.atomic
     def post(self, request, ownername):
@@ -85,26 +81,17 @@ class ApplicationDetail(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, ownername, app_name):
-        if request.user.is_authenticated:
-            try:
-                user_app = ApplicationUser.objects.get(app__name=app_name, app__owner__username=ownername, user=request.user)
+        user_app = check_app_view_permission(request, ownername, app_name)
+        def build():
+            if user_app.role is not None:
                 serializer = UserApplicationSerializer(user_app, context={'request': request})
-                return Response(serializer.data)
-            except ApplicationUser.DoesNotExist:
-                pass
-        try:
-            if request.user.is_authenticated:
-                allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
             else:
-                allow_visibility = [VisibilityType.Public]
-            app = Application.objects.get(name=app_name, owner__username=ownername, visibility__in=allow_visibility)
-            serializer = ApplicationSerializer(app, context={'request': request})
+                serializer = ApplicationSerializer(user_app.app, context={'request': request})
             return Response(serializer.data)
-        except Application.DoesNotExist:
-            raise Http404
+        return respond_with_objects(request, [user_app.app], build, extra=[user_app.role])
 
     def put(self, request, ownername, app_name):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         serializer = ApplicationSerializer(user_app.app, data=request.data, partial=True)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -120,7 +107,7 @@ class ApplicationDetail(APIView):
         return Response(data)
 
     def delete(self, request, ownername, app_name):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         # todo: check users, delete related object
         user_app.app.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -129,18 +116,18 @@ class ApplicationIcon(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, ownername, app_name):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         serializer = ApplicationIconSerializer(user_app.app, data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         instance = serializer.save()
         data = {
-            'icon_file': request.build_absolute_uri(instance.icon_file.url)
+            'icon_file': media_urls(request).url(instance.icon_file.name)
         }
         return Response(data)
 
     def delete(self, request, ownername, app_name):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         storage = user_app.app.icon_file.storage
         icon_file = user_app.app.icon_file
         user_app.app.icon_file = None
@@ -152,13 +139,13 @@ class ApplicationUserList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, ownername, app_name):
-        check_app_view_permission(ownername, app_name, request.user)
-        users = ApplicationUser.objects.filter(app__name=app_name, app__owner__username=ownername)
-        serializer = ApplicationUserSerializer(users, many=True)
-        return Response(serializer.data)
+        user_app = check_app_view_permission(request, ownername, app_name)
+        users = ApplicationUser.objects.filter(app=user_app.app).select_related('user')
+        serialize = lambda users: ApplicationUserSerializer(users, many=True).data
+        return paginate(request, users, ['pk'], serialize, member_list_fields)
 
     def post(self, request, ownername, app_name):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         serializer = ApplicationUserAddSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -187,14 +174,14 @@ class ApplicationUserDetail(APIView):
 
     def get(self, request, ownername, app_name, username):
         # todo
-        check_app_view_permission(ownername, app_name, request.user)
+        check_app_view_permission(request, ownername, app_name)
         app_user = self.get_object(ownername, app_name, username)
-        serializer = ApplicationUserSerializer(app_user)
-        return Response(serializer.data)
+        build = lambda: Response(ApplicationUserSerializer(app_user).data)
+        return respond_with_objects(request, [app_user], build)
 
     def put(self, request, ownername, app_name, username):
         manager_role = ApplicationUser.ApplicationUserRole.Manager
-        check_app_manager_permission(ownername, app_name, request.user)
+        check_app_manager_permission(request, ownername, app_name)
         app_user = self.get_object(ownername, app_name, username)
         serializer = ApplicationUserSerializer(app_user, data=request.data)
         if not serializer.is_valid():
@@ -206,7 +193,7 @@ class ApplicationUserDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, ownername, app_name, username):
-        check_app_manager_permission(ownername, app_name, request.user)
+        check_app_manager_permission(request, ownername, app_name)
         app_user = self.get_object(ownername, app_name, username)
         if app_user.app.owner == app_user.user:
             raise PermissionDenied
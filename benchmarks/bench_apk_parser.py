@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the androguard and the manifest reader backends of ApkParser.
+
+    python benchmarks/bench_apk_parser.py path/to/sample.apk [size_in_mb]
+
+The sample APK is padded with random assets up to the given size, then both
+backends read the fields the upload path stores.
+"""
+
+import os, sys, time, tempfile, zipfile, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appcenter.settings')
+
+import django
+django.setup()
+
+from androguard.core.bytecodes.apk import APK
+from distribute.app_parser.apk_parser import ApkManifest
+from distribute.app_parser.zip_index import ZipIndex
+
+def make_apk(sample, path, size):
+    with zipfile.ZipFile(sample) as src, zipfile.ZipFile(path, 'w') as dst:
+        for info in src.infolist():
+            dst.writestr(info, src.read(info))
+        for i in range(size // (1 << 20)):
+            dst.writestr('assets/blob{0}.bin'.format(i), os.urandom(1 << 20))
+
+def fields(apk):
+    icon = apk.get_app_icon()
+    return (apk.get_app_name(), apk.get_androidversion_code(), apk.get_androidversion_name(), apk.get_package(),
+        apk.get_min_sdk_version(), apk.get_target_sdk_version(), icon, apk.get_file(icon))
+
+def androguard(path):
+    with open(path, 'rb') as f:
+        return fields(APK(f.read(), raw=True))
+
+def manifest_reader(path):
+    with open(path, 'rb') as f:
+        return fields(ApkManifest(f, ZipIndex.from_file(f)))
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main():
+    sample = sys.argv[1]
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'package.apk')
+        make_apk(sample, path, size << 20)
+        print('package: {0} MB'.format(os.path.getsize(path) >> 20))
+        results = []
+        for name, func in [('androguard', androguard), ('manifest', manifest_reader)]:
+            elapsed, peak, result = measure(func, path)
+            results.append(result)
+            print('{0:12} {1:8.3f}s  peak {2:8.1f} MB'.format(name, elapsed, peak / (1 << 20)))
+        if results[0] != results[1]:
+            print('backends disagree:', results[0][:7], results[1][:7])
+
+if __name__ == '__main__':
+    main()
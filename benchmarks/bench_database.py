@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load test the database profiles with concurrent uploads, releases and lists.
+
+    python benchmarks/bench_database.py [processes] [requests] [postgres://...]
+
+Every profile gets a fresh, migrated database: SQLite with Django's
+defaults (rollback journal, deferred transactions), the WAL profile, and
+PostgreSQL with and without persistent connections when the URL of a
+throwaway database is given. Worker processes stand in for uwsgi workers:
+each request is a package upload, a release or a package list, and the
+connection is handled as at the end of a request.
+"""
+
+import json, os, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appcenter.settings')
+
+def setup_app():
+    from django.contrib.auth.models import User
+    from application.models import Application
+    owner, created = User.objects.get_or_create(username='bench')
+    app, created = Application.objects.get_or_create(owner=owner, name='bench', defaults={
+        'display_name': 'bench', 'os': Application.OperatingSystem.Android,
+        'platform': Application.Platform.JavaKotlin, 'release_type': Application.ReleaseType.Alpha})
+    return app
+
+def upload(app):
+    from django.db import transaction
+    from distribute.models import Package
+    from distribute import sequence
+    with transaction.atomic():
+        internal_build = sequence.next_internal_build(app)
+        Package.objects.create(app=app, name='Sample', package_file='packages/{0}.apk'.format(internal_build),
+            icon_file='', fingerprint='0' * 32, sha256='0' * 64, version=str(internal_build), short_version='1.0',
+            internal_build=internal_build, size=1 << 20, min_os='21', bundle_identifier='com.example.sample',
+            description='', commit_id='', channle='')
+
+def release(app):
+    from django.db import transaction
+    from distribute.models import Package, Release, ReleaseDeploymentKey
+    from distribute import sequence
+    package = Package.objects.filter(app=app).order_by('-internal_build').first()
+    if package is None:
+        return upload(app)
+    with transaction.atomic():
+        deployment = ReleaseDeploymentKey.objects.get(app=app, name='production')
+        Release.objects.create(app=app, deployment=deployment, package=package, release_id=sequence.next_release_id(app),
+            release_notes='notes', enabled=True)
+
+def list_packages(app):
+    from distribute.models import Package
+    list(Package.objects.filter(app=app).order_by('-internal_build').values('internal_build', 'short_version', 'update_time')[:20])
+
+def worker(requests):
+    import django
+    django.setup()
+    from django.db import OperationalError, close_old_connections
+    from application.models import Application
+    app = Application.objects.get(name='bench')
+    close_old_connections()
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        handler = upload if i % 10 < 2 else release if i % 10 == 2 else list_packages
+        began = time.perf_counter()
+        try:
+            handler(app)
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - began)
+        # request_finished: close the connection unless it is persistent.
+        close_old_connections()
+    print(json.dumps({'elapsed': time.perf_counter() - start, 'latencies': latencies, 'errors': errors}))
+
+def run_profile(name, url, conn_max_age, processes, requests):
+    env = dict(os.environ, APPCENTER_SETTINGS_DATABASE_URL=url, APPCENTER_SETTINGS_DATABASE_CONN_MAX_AGE=str(conn_max_age))
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=ROOT, env=env, check=True)
+    subprocess.run([sys.executable, __file__, '--setup'], cwd=ROOT, env=env, check=True)
+    workers = [subprocess.Popen([sys.executable, __file__, '--worker', str(requests)], cwd=ROOT, env=env, stdout=subprocess.PIPE)
+        for i in range(processes)]
+    results = [json.loads(w.communicate()[0]) for w in workers]
+    latencies = sorted(latency for r in results for latency in r['latencies'])
+    elapsed = max(r['elapsed'] for r in results)
+    errors = sum(r['errors'] for r in results)
+    print('{0:24} {1:8.0f} req/s  p50 {2:6.1f}ms  p95 {3:6.1f}ms  locked {4:5}'.format(
+        name, len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000, latencies[len(latencies) * 95 // 100] * 1000, errors))
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    postgres = sys.argv[3] if len(sys.argv) > 3 else None
+    print('processes: {0}, requests: {1} each'.format(processes, requests))
+    with tempfile.TemporaryDirectory() as directory:
+        run_profile('sqlite rollback journal', 'sqlite:///' + os.path.join(directory, 'journal.sqlite3') + '?journal_mode=delete&transaction_mode=deferred&timeout=5', 0, processes, requests)
+        run_profile('sqlite wal', 'sqlite:///' + os.path.join(directory, 'wal.sqlite3'), 0, processes, requests)
+    if postgres:
+        run_profile('postgres', postgres, 0, processes, requests)
+        run_profile('postgres persistent', postgres, 60, processes, requests)
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        worker(int(sys.argv[2]))
+    elif sys.argv[1:2] == ['--setup']:
+        import django
+        django.setup()
+        setup_app()
+    else:
+        main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the legacy upload path with the single-pass ingest.
+
+    python benchmarks/bench_ingest.py [size_in_mb]
+
+The legacy path spools the upload, reads it fully for the parser and then
+reads it again for the checksums. The ingest path hashes the bytes while
+they are spooled and reads a single member through the central directory.
+"""
+
+import os, sys, time, tempfile, hashlib, zipfile, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appcenter.settings')
+
+import django
+django.setup()
+
+from distribute.ingest import PackageIngest, CHUNK_SIZE
+
+MEMBER = 'Payload/Sample.app/Info.plist'
+
+def make_archive(path, size):
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr(MEMBER, b'<plist/>')
+        for i in range(size // (1 << 20)):
+            z.writestr('Payload/Sample.app/Assets/blob{0}.bin'.format(i), os.urandom(1 << 20))
+
+class CountingReader:
+    """A file that counts the bytes read from it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+def stream(f):
+    for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+        yield data
+
+def spool(path, out, ingest=None):
+    with open(path, 'rb') as f, open(out, 'wb') as spooled:
+        for data in stream(f):
+            if ingest is not None:
+                ingest.update(data)
+            spooled.write(data)
+
+def legacy(path, out):
+    spool(path, out)
+    with open(out, 'rb') as f:
+        f = CountingReader(f)
+        f.read()
+        f.seek(0)
+        zipfile.ZipFile(f).read(MEMBER)
+        f.seek(0)
+        md5, sha256 = hashlib.md5(), hashlib.sha256()
+        for data in stream(f):
+            md5.update(data)
+            sha256.update(data)
+    return f.bytes_read
+
+def single_pass(path, out):
+    ingest = PackageIngest()
+    spool(path, out, ingest)
+    with open(out, 'rb') as f:
+        # The central directory, when it does not fit the kept tail, and the member.
+        f = CountingReader(f)
+        index = ingest.zip_index(f)
+        index.read(f, MEMBER)
+    ingest.fingerprint, ingest.sha256
+    return f.bytes_read
+
+def measure(func, path, out):
+    tracemalloc.start()
+    start = time.perf_counter()
+    bytes_read = func(path, out)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, bytes_read
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'package.ipa')
+        out = os.path.join(tmp, 'spool')
+        make_archive(path, size << 20)
+        print('package: {0} MB'.format(os.path.getsize(path) >> 20))
+        for name, func in [('legacy', legacy), ('single pass', single_pass)]:
+            elapsed, peak, bytes_read = measure(func, path, out)
+            print('{0:12} {1:8.3f}s  peak {2:8.1f} MB  re-read {3:>14,} bytes'.format(name, elapsed, peak / (1 << 20), bytes_read))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the DRF serializers with the values() rows of list endpoints.
+
+    python benchmarks/bench_serializers.py [rows]
+
+Both sides serialize the same packages and releases to JSON from a
+throwaway test database. The serializer side loads model instances, the
+rows side reads values() and the precompiled row functions.
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appcenter.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from application.models import Application
+from distribute.models import Package, Release, ReleaseDeploymentKey
+from distribute.serializers import PackageSerializer, ReleaseSerializer, package_rows, release_rows
+
+ROUNDS = 5
+
+def populate(count):
+    owner = User.objects.create(username='bench')
+    app = Application.objects.create(owner=owner, name='bench', display_name='bench', os=Application.OperatingSystem.iOS,
+        platform=Application.Platform.ObjectiveCSwift, release_type=Application.ReleaseType.Alpha)
+    deployment, created = ReleaseDeploymentKey.objects.get_or_create(app=app, name='production')
+    Package.objects.bulk_create([Package(app=app, name='Sample', package_file='packages/{0}.ipa'.format(i),
+        icon_file='icons/{0}.png'.format(i), fingerprint='0' * 32, sha256='0' * 64, version=str(i), short_version='1.0.{0}'.format(i),
+        internal_build=i, size=1 << 20, min_os='12.0', bundle_identifier='com.example.sample', description='build {0}'.format(i),
+        commit_id='abcdef', channle='') for i in range(1, count + 1)])
+    packages = Package.objects.filter(app=app)
+    Release.objects.bulk_create([Release(deployment=deployment, app=app, package=package, release_id=package.internal_build,
+        release_notes='notes', enabled=True) for package in packages])
+
+def measure(func):
+    best = None
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        content = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, content
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        populate(count)
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/api/users/bench/apps/bench/distribute/packages')
+        renderer = JSONRenderer()
+        packages = Package.objects.order_by('internal_build', 'pk')
+        releases = Release.objects.select_related('package').order_by('release_id', 'pk')
+        cases = [
+            ('packages', lambda: PackageSerializer(list(packages), many=True, context={'request': request}).data,
+                lambda: package_rows.compile(request)(list(packages.values(*package_rows.columns)))),
+            ('releases', lambda: ReleaseSerializer(list(releases), many=True, context={'request': request}).data,
+                lambda: release_rows.compile(request)(list(releases.values(*release_rows.columns)))),
+        ]
+        print('rows: {0}'.format(count))
+        for name, serializer, rows in cases:
+            serializer_time, expected = measure(lambda: renderer.render(serializer()))
+            rows_time, content = measure(lambda: renderer.render(rows()))
+            assert content == expected, name
+            print('{0:10} serializer {1:8.3f}s  rows {2:8.3f}s  {3:6.1f}x  {4:8.0f} rows/s'.format(
+                name, serializer_time, rows_time, serializer_time / rows_time, count / rows_time))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+if __name__ == '__main__':
+    main()
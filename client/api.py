@@ -65,19 +65,25 @@ class Api:
         def create_org(self, org):
             return self.client.post('/orgs', org)
 
-        def get_org_list(self, top=10, skip=0, sort=None):
+        def get_org_list(self, top=10, skip=0, filter=None, sort=None, count=False, cursor=None):
             query = {
                 'top': top,
                 'skip': skip
             }
+            if filter:
+                query['filter'] = filter
             if sort:
                 query['sort'] = sort
+            if count:
+                query['count'] = 'true'
+            if cursor:
+                query['cursor'] = cursor
             return self.client.get('/orgs', query)
 
         def create_app(self, app):
             return self.client.post('/users/' + self.username + 'apps', app)
 
-        def get_app_list(self, username=None, top=10, skip=0, filter=None, sort=None):
+        def get_app_list(self, username=None, top=10, skip=0, filter=None, sort=None, count=False, cursor=None):
             ownername = username
             if ownername is None:
                 ownername = self.username
@@ -89,7 +95,11 @@ class Api:
                 query['filter'] = filter
             if sort:
                 query['sort'] = sort
-            return self.client.get('/users/' + ownername + 'apps', query)
+            if count:
+                query['count'] = 'true'
+            if cursor:
+                query['cursor'] = cursor
+            return self.client.get('/users/' + ownername + '/apps', query)
 
     class OrganizationApi:
         def __init__(self, client, org_name):
@@ -1,9 +1,77 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import logging
 from androguard.core.bytecodes.apk import APK
 from application.models import Application
+from .axml import AxmlError, parse_manifest, ResourceTable
 from .base import AppParser
+from .zip_index import BadZipFile, ZipIndex
+
+logger = logging.getLogger(__name__)
+
+class ApkManifest:
+    """The few fields of an APK the upload path needs.
+
+    Only AndroidManifest.xml and resources.arsc are read, through the zip
+    central directory. Every field is resolved here, so anything the reader
+    does not understand fails the constructor, where ``ApkParser`` falls back.
+    The methods are named after androguard's ``APK`` so either can back
+    ``ApkParser``.
+    """
+
+    def __init__(self, file, index):
+        self.file = file
+        self.index = index
+        elements = parse_manifest(index.read(file, 'AndroidManifest.xml'))
+        if 'manifest' not in elements:
+            raise AxmlError('No manifest element.')
+        manifest = elements['manifest']
+        uses_sdk = elements.get('uses-sdk', {})
+        application = elements.get('application', {})
+        resources = ResourceTable(index.read(file, 'resources.arsc'))
+
+        def value(attributes, name):
+            value = attributes.get(name)
+            if value is None:
+                return None
+            value = resources.resolve(value)
+            return None if value is None else str(value)
+
+        self.app_name = value(application, 'label') or ''
+        self.version_code = value(manifest, 'versionCode')
+        self.version_name = value(manifest, 'versionName')
+        self.package = value(manifest, 'package')
+        self.min_sdk_version = value(uses_sdk, 'minSdkVersion')
+        self.target_sdk_version = value(uses_sdk, 'targetSdkVersion')
+        icon = application.get('icon')
+        self.app_icon = None if icon is None else resources.resolve_file(icon)
+
+    def get_app_name(self):
+        return self.app_name
+
+    def get_androidversion_code(self):
+        return self.version_code
+
+    def get_androidversion_name(self):
+        return self.version_name
+
+    def get_package(self):
+        return self.package
+
+    def get_min_sdk_version(self):
+        return self.min_sdk_version
+
+    def get_target_sdk_version(self):
+        return self.target_sdk_version
+
+    def get_app_icon(self):
+        return self.app_icon
+
+    def get_file(self, name):
+        if name is None or name not in self.index:
+            return None
+        return self.index.read(self.file, name)
 
 class ApkParser(AppParser):
 
@@ -13,9 +81,16 @@ class ApkParser(AppParser):
             return os == Application.OperatingSystem.Android and platform == Application.Platform.JavaKotlin and ext == 'apk'
         return ext == 'apk'
 
-    def __init__(self, file):
-      self.apk = APK(file.read(), raw=True)
-      
+    def __init__(self, file, index=None):
+        try:
+            self.apk = ApkManifest(file, index if index is not None else ZipIndex.from_file(file))
+        except (AxmlError, BadZipFile, KeyError) as e:
+            # Fall back to a full androguard load for anything the
+            # lightweight reader does not understand.
+            logger.warning('Reading the manifest failed, falling back to androguard: %s', e)
+            file.seek(0)
+            self.apk = APK(file.read(), raw=True)
+
     @property
     def display_name(self):
         return self.apk.get_app_name()
@@ -0,0 +1,249 @@
+import struct
+from collections import namedtuple
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+UTF8_FLAG = 0x100
+
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_FIRST_INT = 0x10
+TYPE_LAST_INT = 0x1f
+
+FLAG_COMPLEX = 0x0001
+FLAG_COMPACT = 0x0008
+TYPE_FLAG_SPARSE = 0x01
+TYPE_FLAG_OFFSET16 = 0x02
+NO_ENTRY = 0xffffffff
+
+DENSITY_ANY = 0xfffe
+DENSITY_NONE = 0xffff
+
+# Attributes of the android namespace we read, by resource id. Matching the id
+# rather than the name keeps working when a shrinker strips attribute names.
+ANDROID_ATTRIBUTES = {
+    0x01010001: 'label',
+    0x01010002: 'icon',
+    0x0101020c: 'minSdkVersion',
+    0x0101021b: 'versionCode',
+    0x0101021c: 'versionName',
+    0x01010270: 'targetSdkVersion',
+}
+
+Reference = namedtuple('Reference', ['id'])
+
+class AxmlError(Exception):
+    pass
+
+def iter_chunks(data, start, end):
+    pos = start
+    while pos + 8 <= end:
+        chunk_type, header_size, size = struct.unpack_from('<HHI', data, pos)
+        if size < 8 or pos + size > end:
+            raise AxmlError('Bad chunk at offset %d.' % pos)
+        yield chunk_type, header_size, pos
+        pos += size
+
+class StringPool:
+    """A string pool chunk, decoding entries only when they are asked for.
+
+    The pool of resources.arsc holds every string of the app, and we need two
+    or three of them.
+    """
+
+    def __init__(self, data, offset):
+        header_size = struct.unpack_from('<H', data, offset + 2)[0]
+        self.count, _, flags, strings_start = struct.unpack_from('<IIII', data, offset + 8)
+        self.data = data
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self.offsets_start = offset + header_size
+        self.strings_start = offset + strings_start
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise AxmlError('String index %d out of range.' % i)
+        data = self.data
+        pos = self.strings_start + struct.unpack_from('<I', data, self.offsets_start + i * 4)[0]
+        if self.utf8:
+            # The UTF-16 length comes first, then the UTF-8 byte length.
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = (length & 0x7f) << 8 | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            return data[pos:pos + length].decode('utf-8', errors='replace')
+        length = struct.unpack_from('<H', data, pos)[0]
+        if length & 0x8000:
+            length = (length & 0x7fff) << 16 | struct.unpack_from('<H', data, pos + 2)[0]
+            pos += 4
+        else:
+            pos += 2
+        return data[pos:pos + length * 2].decode('utf-16-le', errors='replace')
+
+def typed_value(strings, data_type, data, raw=NO_ENTRY):
+    if data_type == TYPE_STRING:
+        return strings[data if raw == NO_ENTRY else raw]
+    if data_type == TYPE_REFERENCE:
+        return Reference(data)
+    if TYPE_FIRST_INT <= data_type <= TYPE_LAST_INT:
+        return data
+    if raw != NO_ENTRY:
+        return strings[raw]
+    return None
+
+def parse_manifest(data, tags=('manifest', 'uses-sdk', 'application')):
+    """Return the attributes of the first element of each of ``tags`` in a binary AndroidManifest.xml.
+
+    Android attributes are keyed by their plain name, string values are
+    decoded, integers are returned as is and resource references as
+    ``Reference`` for the resource table to resolve.
+    """
+    try:
+        chunk_type, header_size, size = struct.unpack_from('<HHI', data, 0)
+        if chunk_type != RES_XML_TYPE:
+            raise AxmlError('Not a binary XML file.')
+        strings = None
+        resource_ids = ()
+        elements = {}
+        for chunk_type, chunk_header_size, pos in iter_chunks(data, header_size, min(size, len(data))):
+            if chunk_type == RES_STRING_POOL_TYPE and strings is None:
+                strings = StringPool(data, pos)
+            elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+                count = (struct.unpack_from('<I', data, pos + 4)[0] - chunk_header_size) // 4
+                resource_ids = struct.unpack_from('<%dI' % count, data, pos + chunk_header_size)
+            elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+                if strings is None:
+                    raise AxmlError('Element before the string pool.')
+                ext = pos + chunk_header_size
+                _, name, attribute_start, attribute_size, attribute_count = struct.unpack_from('<IIHHH', data, ext)
+                tag = strings[name]
+                if tag not in tags or tag in elements:
+                    continue
+                attributes = {}
+                for i in range(attribute_count):
+                    at = ext + attribute_start + i * attribute_size
+                    _, name, raw, data_type, value = struct.unpack_from('<III3xBI', data, at)
+                    if name < len(resource_ids) and resource_ids[name] in ANDROID_ATTRIBUTES:
+                        key = ANDROID_ATTRIBUTES[resource_ids[name]]
+                    else:
+                        key = strings[name]
+                    attributes[key] = typed_value(strings, data_type, value, raw)
+                elements[tag] = attributes
+                if len(elements) == len(tags):
+                    break
+        return elements
+    except (struct.error, IndexError) as e:
+        raise AxmlError(str(e)) from e
+
+class ResourceTable:
+    """Entries of resources.arsc, looked up by resource id.
+
+    Building the table only records where each type chunk starts. Looking up
+    an entry seeks straight to it through the chunk's offset array.
+    """
+
+    def __init__(self, data):
+        try:
+            chunk_type, header_size, size = struct.unpack_from('<HHI', data, 0)
+            if chunk_type != RES_TABLE_TYPE:
+                raise AxmlError('Not a resource table.')
+            self.data = data
+            self.strings = None
+            self.types = {}
+            for chunk_type, chunk_header_size, pos in iter_chunks(data, header_size, min(size, len(data))):
+                if chunk_type == RES_STRING_POOL_TYPE and self.strings is None:
+                    self.strings = StringPool(data, pos)
+                elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+                    package_id = struct.unpack_from('<I', data, pos + 8)[0]
+                    package_end = pos + struct.unpack_from('<I', data, pos + 4)[0]
+                    for sub_type, _, sub_pos in iter_chunks(data, pos + chunk_header_size, package_end):
+                        if sub_type == RES_TABLE_TYPE_TYPE:
+                            self.types.setdefault((package_id, data[sub_pos + 8]), []).append(sub_pos)
+        except (struct.error, IndexError) as e:
+            raise AxmlError(str(e)) from e
+
+    def entry_offset(self, pos, header_size, flags, entry_count, index):
+        data = self.data
+        offsets = pos + header_size
+        if flags & TYPE_FLAG_SPARSE:
+            # (index, offset / 4) pairs sorted by index.
+            lo, hi = 0, entry_count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                idx, offset = struct.unpack_from('<HH', data, offsets + mid * 4)
+                if idx == index:
+                    return offset * 4
+                if idx < index:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return None
+        if index >= entry_count:
+            return None
+        if flags & TYPE_FLAG_OFFSET16:
+            offset = struct.unpack_from('<H', data, offsets + index * 2)[0]
+            return None if offset == 0xffff else offset * 4
+        offset = struct.unpack_from('<I', data, offsets + index * 4)[0]
+        return None if offset == NO_ENTRY else offset
+
+    def values(self, resource_id):
+        """Yield ``(language, density, value)`` for every configuration of a resource."""
+        data = self.data
+        package_id, type_id, index = resource_id >> 24, resource_id >> 16 & 0xff, resource_id & 0xffff
+        try:
+            for pos in self.types.get((package_id, type_id), ()):
+                header_size = struct.unpack_from('<H', data, pos + 2)[0]
+                flags, entry_count, entries_start = struct.unpack_from('<xBxxII', data, pos + 8)
+                offset = self.entry_offset(pos, header_size, flags, entry_count, index)
+                if offset is None:
+                    continue
+                config = pos + 20
+                language = data[config + 8:config + 12]
+                density = struct.unpack_from('<H', data, config + 14)[0]
+                entry = pos + entries_start + offset
+                entry_size, entry_flags = struct.unpack_from('<HH', data, entry)
+                if entry_flags & FLAG_COMPACT:
+                    data_type, value = entry_flags >> 8, struct.unpack_from('<I', data, entry + 4)[0]
+                elif entry_flags & FLAG_COMPLEX:
+                    continue
+                else:
+                    data_type, value = struct.unpack_from('<3xBI', data, entry + entry_size)
+                yield language, density, typed_value(self.strings, data_type, value)
+        except (struct.error, IndexError) as e:
+            raise AxmlError(str(e)) from e
+
+    def resolve(self, value, depth=8):
+        """Follow references to the value of the default configuration."""
+        while isinstance(value, Reference) and depth > 0:
+            values = list(self.values(value.id))
+            if not values:
+                return None
+            default = [v for language, _, v in values if language == b'\0\0\0\0']
+            value = default[0] if default else values[0][2]
+            depth -= 1
+        return None if isinstance(value, Reference) else value
+
+    def resolve_file(self, value, depth=8):
+        """Follow references to the file of the highest density, preferring images to XML drawables."""
+        while isinstance(value, Reference) and depth > 0:
+            candidates = [(density, v) for _, density, v in self.values(value.id) if v is not None]
+            if not candidates:
+                return None
+            def rank(candidate):
+                density, v = candidate
+                is_image = isinstance(v, str) and not v.endswith('.xml')
+                return is_image, -1 if density in (DENSITY_ANY, DENSITY_NONE) else density
+            value = max(candidates, key=rank)[1]
+            depth -= 1
+        return value if isinstance(value, str) else None
@@ -5,7 +5,7 @@ class AppParser:
     def can_parse(ext, os=None, platform=None):
         return False
 
-    def __init__(self, fp):
+    def __init__(self, fp, index=None):
         pass
 
     @property
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import zipfile, plistlib, re
+import plistlib, re
 from application.models import Application
 from .base import AppParser
+from .zip_index import ZipIndex
+
+icon_size_pattern = re.compile(r'(\d+(?:\.\d+)?)x\d+(?:\.\d+)?(?:@(\d)x)?')
 
 class IpaParser(AppParser):
 
@@ -13,9 +16,23 @@ class IpaParser(AppParser):
             return os == Application.OperatingSystem.iOS and platform == Application.Platform.ObjectiveCSwift and ext == 'ipa'
         return ext == 'ipa'
 
-    def __init__(self, file):
-        self.zip = zipfile.ZipFile(file)
-        self.__plist = None
+    def __init__(self, file, index=None):
+        self.file = file
+        self.index = index if index is not None else ZipIndex.from_file(file)
+        self.app_path = self.find_app_path()
+        self.plist = self.read_plist()
+        self.__app_icon = None
+
+    def find_app_path(self):
+        # The bundle is the only directory under Payload/, and its Info.plist
+        # is usually one of the first entries of the central directory.
+        for name in self.index.names():
+            if name.startswith('Payload/') and name.endswith('.app/Info.plist') and name.count('/') == 2:
+                return name[:-len('Info.plist')]
+        raise ValueError('No Payload/*.app/Info.plist in the package.')
+
+    def read_plist(self):
+        return plistlib.loads(self.index.read(self.file, self.app_path + 'Info.plist'))
 
     @property
     def display_name(self):
@@ -43,23 +60,42 @@ class IpaParser(AppParser):
 
     @property
     def app_icon(self):
-        pattern = re.compile(r'Payload/[^/]*.app/AppIcon60x60@3x.png')
-        for path in self.zip.namelist():
-            m = pattern.match(path)
-            if m is not None:
-                return self.zip.read(m.group())
-        return None
+        if self.__app_icon is None:
+            name = self.icon_path()
+            if name is not None:
+                self.__app_icon = self.index.read(self.file, name)
+        return self.__app_icon
 
-    @property
-    def plist(self):
-        if self.__plist:
-            return self.__plist
-
-        pattern = re.compile(r'Payload/[^/]*.app/Info.plist')
-        for path in self.zip.namelist():
-            m = pattern.match(path)
-            if m is not None:
-                # print(m)
-                data = self.zip.read(m.group())
-                self.__plist = plistlib.loads(data)
-        return self.__plist
+    def icon_files(self):
+        """Icon file names declared by Info.plist, without extension or scale."""
+        names = []
+        for key in ('CFBundleIcons', 'CFBundleIcons~ipad'):
+            primary = self.plist.get(key, {}).get('CFBundlePrimaryIcon', {})
+            names += primary.get('CFBundleIconFiles', [])
+        names += self.plist.get('CFBundleIconFiles', [])
+        if self.plist.get('CFBundleIconFile'):
+            names.append(self.plist['CFBundleIconFile'])
+        return names
+
+    def icon_path(self):
+        candidates = []
+        for name in self.icon_files():
+            base = name[:-4] if name.endswith('.png') else name
+            for scale in ('@3x', '@2x', ''):
+                for idiom in ('', '~ipad'):
+                    path = self.app_path + base + scale + idiom + '.png'
+                    if path in self.index:
+                        candidates.append(path)
+        if not candidates:
+            # Nothing declared, fall back to every png at the top of the bundle.
+            candidates = [name for name in self.index.names()
+                if name.startswith(self.app_path) and name.endswith('.png') and '/' not in name[len(self.app_path):]]
+        if not candidates:
+            return None
+        return max(candidates, key=self.icon_size)
+
+    def icon_size(self, path):
+        """Rank icons by their pixel size, taken from names like AppIcon60x60@3x.png."""
+        m = icon_size_pattern.search(path[len(self.app_path):])
+        pixels = float(m.group(1)) * int(m.group(2) or 1) if m is not None else 0
+        return pixels, self.index.entries[path].file_size
@@ -1,10 +1,14 @@
 from .ipa_parser import IpaParser
 from .apk_parser import ApkParser
 
-def parse(fd, ext, os=None, platform=None):
-    parser_list = [IpaParser, ApkParser]
+parser_list = [IpaParser, ApkParser]
+
+def can_parse(ext, os=None, platform=None):
+    return any(p.can_parse(ext, os, platform) for p in parser_list)
+
+def parse(fd, ext, os=None, platform=None, index=None):
     for p in parser_list:
         if p.can_parse(ext, os, platform):
-            return p(fd)
+            return p(fd, index)
     return None
     
\ No newline at end of file
@@ -0,0 +1,156 @@
+import struct, zlib
+from collections import namedtuple
+
+ZipEntry = namedtuple('ZipEntry', ['name', 'header_offset', 'compress_type', 'compress_size', 'file_size', 'crc'])
+
+EOCD_SIGNATURE = b'PK\x05\x06'
+EOCD_SIZE = 22
+ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_LOCATOR_SIZE = 20
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+CENTRAL_SIGNATURE = b'PK\x01\x02'
+LOCAL_SIGNATURE = b'PK\x03\x04'
+LOCAL_HEADER_SIZE = 30
+
+# The end of central directory record may be followed by a comment of up to 64KB.
+TAIL_SIZE = EOCD_SIZE + 0xffff + ZIP64_LOCATOR_SIZE
+
+class BadZipFile(Exception):
+    pass
+
+class ZipIndex:
+    """Offsets of the members of a zip archive, read from its central directory.
+
+    Members are read by seeking straight to their local header, so a parser
+    only touches the bytes of the members it actually needs.
+    """
+
+    def __init__(self, entries, directory=None):
+        self.entries = entries
+        # (offset, size, count) of the central directory, to read it again
+        # later without searching for it.
+        self.directory = directory
+
+    @classmethod
+    def from_file(cls, fp):
+        fp.seek(0, 2)
+        file_size = fp.tell()
+        fp.seek(max(0, file_size - TAIL_SIZE))
+        return cls.from_tail(fp.read(), file_size, fp)
+
+    @classmethod
+    def from_tail(cls, tail, file_size, fp):
+        """Build the index from the last bytes of an archive.
+
+        ``fp`` is only read when the central directory does not fit in ``tail``.
+        """
+        tail_offset = file_size - len(tail)
+        pos = tail.rfind(EOCD_SIGNATURE, max(0, len(tail) - TAIL_SIZE))
+        if pos < 0 or len(tail) - pos < EOCD_SIZE:
+            raise BadZipFile('End of central directory not found.')
+        count, cd_size, cd_offset = struct.unpack('<6xHII', tail[pos + 4:pos + 20])
+        if cd_offset == 0xffffffff or count == 0xffff:
+            locator = pos - ZIP64_LOCATOR_SIZE
+            if locator < 0 or tail[locator:locator + 4] != ZIP64_LOCATOR_SIGNATURE:
+                raise BadZipFile('Zip64 end of central directory locator not found.')
+            eocd64_offset = struct.unpack('<Q', tail[locator + 8:locator + 16])[0]
+            record = cls.read_range(tail, tail_offset, fp, eocd64_offset, 56)
+            if len(record) < 56 or record[:4] != ZIP64_EOCD_SIGNATURE:
+                raise BadZipFile('Zip64 end of central directory not found.')
+            count, cd_size, cd_offset = struct.unpack('<QQQ', record[32:56])
+        data = cls.read_range(tail, tail_offset, fp, cd_offset, cd_size)
+        if len(data) != cd_size:
+            raise BadZipFile('Central directory out of range.')
+        return cls(cls.parse_central_directory(data, count), (cd_offset, cd_size, count))
+
+    @classmethod
+    def from_directory(cls, fp, offset, size, count):
+        """Build the index from the ``directory`` of an earlier index of the same file."""
+        fp.seek(offset)
+        data = fp.read(size)
+        if len(data) != size:
+            raise BadZipFile('Central directory out of range.')
+        return cls(cls.parse_central_directory(data, count), (offset, size, count))
+
+    @staticmethod
+    def read_range(tail, tail_offset, fp, offset, size):
+        if offset >= tail_offset:
+            start = offset - tail_offset
+            return tail[start:start + size]
+        fp.seek(offset)
+        return fp.read(size)
+
+    @staticmethod
+    def parse_central_directory(data, count):
+        entries = {}
+        pos = 0
+        for _ in range(count):
+            if len(data) - pos < 46 or data[pos:pos + 4] != CENTRAL_SIGNATURE:
+                raise BadZipFile('Bad central directory entry.')
+            (flags, compress_type, crc, compress_size, file_size, name_len, extra_len,
+                comment_len, header_offset) = struct.unpack('<8xHH4xIIIHHH8xI', data[pos:pos + 46])
+            if len(data) - pos < 46 + name_len + extra_len + comment_len:
+                raise BadZipFile('Truncated central directory entry.')
+            name = data[pos + 46:pos + 46 + name_len]
+            try:
+                name = name.decode('utf-8' if flags & 0x800 else 'cp437')
+            except UnicodeDecodeError:
+                raise BadZipFile('Bad file name in central directory.')
+            extra = data[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+            if 0xffffffff in (compress_size, file_size, header_offset):
+                file_size, compress_size, header_offset = ZipIndex.parse_zip64_extra(extra, file_size, compress_size, header_offset)
+            entries[name] = ZipEntry(name, header_offset, compress_type, compress_size, file_size, crc)
+            pos += 46 + name_len + extra_len + comment_len
+        return entries
+
+    @staticmethod
+    def parse_zip64_extra(extra, file_size, compress_size, header_offset):
+        pos = 0
+        while pos + 4 <= len(extra):
+            tag, size = struct.unpack('<HH', extra[pos:pos + 4])
+            if tag == 1:
+                values = extra[pos + 4:pos + 4 + size]
+                values = list(struct.unpack('<%dQ' % (len(values) // 8), values[:len(values) // 8 * 8]))
+                try:
+                    if file_size == 0xffffffff:
+                        file_size = values.pop(0)
+                    if compress_size == 0xffffffff:
+                        compress_size = values.pop(0)
+                    if header_offset == 0xffffffff:
+                        header_offset = values.pop(0)
+                except IndexError:
+                    raise BadZipFile('Truncated zip64 extra field.')
+                break
+            pos += 4 + size
+        return file_size, compress_size, header_offset
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def names(self):
+        return self.entries.keys()
+
+    def read(self, fp, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError(name)
+        fp.seek(entry.header_offset)
+        header = fp.read(LOCAL_HEADER_SIZE)
+        if len(header) < LOCAL_HEADER_SIZE or header[:4] != LOCAL_SIGNATURE:
+            raise BadZipFile('Bad local file header for %s.' % name)
+        name_len, extra_len = struct.unpack('<HH', header[26:30])
+        fp.seek(entry.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len)
+        data = fp.read(entry.compress_size)
+        if entry.compress_type == 8:
+            try:
+                data = zlib.decompressobj(-15).decompress(data)
+            except zlib.error as e:
+                raise BadZipFile('Bad deflated data for %s: %s' % (name, e))
+        elif entry.compress_type != 0:
+            raise BadZipFile('Unsupported compression method %d for %s.' % (entry.compress_type, name))
+        if zlib.crc32(data) != entry.crc:
+            raise BadZipFile('Bad CRC-32 for %s.' % name)
+        return data
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class DistributeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'distribute'
+
+    def ready(self):
+        # Register the background tasks, the LatestRelease updates, the blob
+        # reference counting, the manifest invalidation, the store polling and
+        # the store adapters.
+        from distribute import jobs, latest, blobs, manifest
+        from distribute.store import scheduler, vivo
@@ -0,0 +1,62 @@
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from distribute.models import Blob, Package
+
+# Package files are private and only served through the download endpoints,
+# icons are public. nginx tells them apart by the directory.
+PACKAGES = 'packages'
+ICONS = 'icons'
+
+def blob_name(directory, sha256, ext):
+    return '{0}/{1}/{2}/{3}.{4}'.format(directory, sha256[:2], sha256[2:4], sha256, ext)
+
+def retain(name):
+    """Count one more reference to the blob stored as ``name``.
+
+    Files stored before blobs existed have no row and are left alone.
+    """
+    Blob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+def store(file, sha256, ext, directory):
+    """The storage name of ``file``, written only when no blob holds its bytes yet.
+
+    The caller owns one reference to the returned name.
+    """
+    # Counting first keeps the blob from being released in between.
+    if Blob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1):
+        return Blob.objects.values_list('name', flat=True).get(sha256=sha256)
+    # Written even if the name exists, the file may be the one of a released
+    # blob whose delete_file is still to run. Storage then picks a fresh name.
+    name = default_storage.save(blob_name(directory, sha256, ext), file)
+    try:
+        with transaction.atomic():
+            Blob.objects.create(sha256=sha256, name=name, size=file.size, refcount=1)
+    except IntegrityError:
+        # Stored concurrently by another upload, keep the first copy.
+        Blob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1)
+        existing = Blob.objects.values_list('name', flat=True).get(sha256=sha256)
+        if existing != name:
+            default_storage.delete(name)
+        name = existing
+    return name
+
+def release(name):
+    """Drop a reference, the file is deleted with its last reference."""
+    if not name:
+        return
+    Blob.objects.filter(name=name).update(refcount=F('refcount') - 1)
+    if Blob.objects.filter(name=name, refcount__lte=0).delete()[0]:
+        transaction.on_commit(lambda: delete_file(name))
+
+def delete_file(name):
+    # A new upload may have stored the same bytes again in the meantime.
+    if not Blob.objects.filter(name=name).exists():
+        default_storage.delete(name)
+
+@receiver(post_delete, sender=Package)
+def package_deleted(sender, instance, **kwargs):
+    release(instance.package_file.name)
+    release(instance.icon_file.name)
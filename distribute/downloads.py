@@ -0,0 +1,94 @@
+import time
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from rest_framework import serializers
+from util.sendfile import sendfile
+
+SIGNED_DOWNLOAD_SALT = 'distribute.downloads.signed'
+
+class DownloadUrls:
+    """Download URLs of the packages and releases of the app a request is for.
+
+    The URL of the app is resolved once, the rows only add their number.
+    """
+
+    def __init__(self, request):
+        kwargs = request.resolver_match.kwargs
+        if 'org_name' in kwargs:
+            packages = reverse('org-package-list', args=(kwargs['org_name'], kwargs['app_name']))
+        else:
+            packages = reverse('user-package-list', args=(kwargs['ownername'], kwargs['app_name']))
+        self.root = request.build_absolute_uri(packages[:-len('packages')])
+
+    def url(self, kind, number):
+        return '{0}{1}/{2}/download'.format(self.root, kind, number)
+
+def download_urls(request):
+    urls = getattr(request, '_download_urls', None)
+    if urls is None:
+        urls = request._download_urls = DownloadUrls(request)
+    return urls
+
+class DownloadUrlField(serializers.Field):
+    """The download URL of a package or release, from its number.
+
+    ``kind`` is ``packages`` or ``releases``.
+    """
+
+    def __init__(self, kind, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.kind = kind
+
+    def to_representation(self, value):
+        return download_urls(self.context['request']).url(self.kind, value)
+
+def download_url(kind):
+    """The RowSerializer converter of DownloadUrlField."""
+    def convert(request):
+        url = download_urls(request).url
+        return lambda number: url(kind, number)
+    return convert
+
+def package_filename(prefix, short_version, internal_build, name):
+    ext = name.split('.')[-1]
+    return '{0}_{1}_{2}.{3}'.format(prefix, short_version or 'build', internal_build, ext)
+
+def download_package(request, app_name, package):
+    filename = package_filename(app_name, package.short_version, package.internal_build, package.package_file.name)
+    return sendfile(request, package.package_file.name, filename)
+
+def signed_expiry(now=None):
+    """When links signed now expire.
+
+    Links signed within the same DOWNLOAD_URL_MAX_AGE window share their
+    expiry and so their URL, which lets caches keep them. They stay valid
+    for at least one window.
+    """
+    max_age = settings.DOWNLOAD_URL_MAX_AGE
+    now = int(time.time() if now is None else now)
+    return (now // max_age + 2) * max_age
+
+def signed_url(request, name, filename, expires=None):
+    """A download URL of the stored file ``name`` that needs no session.
+
+    ``request`` may be None in background jobs, the URL is then based on
+    EXTERNAL_URL.
+    """
+    token = signing.Signer(salt=SIGNED_DOWNLOAD_SALT).sign_object([name, filename, expires or signed_expiry()], compress=True)
+    path = reverse('signed-download', args=(token,))
+    if request is None:
+        return settings.EXTERNAL_URL.rstrip('/') + path
+    return request.build_absolute_uri(path)
+
+def unsign(token):
+    """The ``(name, filename, expires)`` of a signed link.
+
+    Raises BadSignature for links that were not signed with SECRET_KEY.
+    """
+    try:
+        name, filename, expires = signing.Signer(salt=SIGNED_DOWNLOAD_SALT).unsign_object(token)
+    except (TypeError, ValueError):
+        raise signing.BadSignature
+    return name, filename, expires
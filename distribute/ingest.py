@@ -0,0 +1,87 @@
+import hashlib
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from distribute.app_parser.zip_index import ZipIndex, BadZipFile, TAIL_SIZE
+
+CHUNK_SIZE = 64 * 1024
+
+class PackageIngest:
+    """Single pass over the bytes of an uploaded package.
+
+    Every chunk is fed to the MD5 and SHA-256 hashers while the last bytes are
+    kept around, so the zip central directory can be located once the upload
+    is complete without reading the file again. Multipart uploads are
+    ingested as they stream in; chunked uploads are read once at commit.
+    """
+
+    def __init__(self):
+        self.md5_hash = hashlib.md5()
+        self.sha256_hash = hashlib.sha256()
+        self.size = 0
+        self.tail = bytearray()
+
+    def update(self, data):
+        self.md5_hash.update(data)
+        self.sha256_hash.update(data)
+        self.size += len(data)
+        self.tail += data
+        if len(self.tail) > 2 * TAIL_SIZE:
+            del self.tail[:-TAIL_SIZE]
+
+    @property
+    def fingerprint(self):
+        return self.md5_hash.hexdigest()
+
+    @property
+    def sha256(self):
+        return self.sha256_hash.hexdigest()
+
+    def zip_index(self, fp):
+        """The central directory index, or None when the package is not a zip archive.
+
+        ``fp`` is only read when the central directory is larger than the kept tail.
+        """
+        try:
+            return ZipIndex.from_tail(bytes(self.tail[-TAIL_SIZE:]), self.size, fp)
+        except BadZipFile:
+            return None
+
+    @classmethod
+    def from_file(cls, fp):
+        ingest = cls()
+        fp.seek(0)
+        for data in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            ingest.update(data)
+        return ingest
+
+class PackageIngestUploadHandler(TemporaryFileUploadHandler):
+    """Streams an uploaded package to a temporary file while ingesting it.
+
+    The resulting file carries its ``ingest`` so the view neither re-reads it
+    for checksums nor for the zip central directory, and the temporary file is
+    moved into storage instead of copied. The parse job gets the location of
+    the central directory and reads only that range.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.ingest = PackageIngest()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.ingest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.ingest = self.ingest
+        return file
+
+class PackageIngestMixin:
+    """Ingests the files uploaded to an APIView.
+
+    The handlers are installed before the request is authenticated, as the
+    CSRF check of a session login already parses the body.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [PackageIngestUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
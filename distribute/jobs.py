@@ -0,0 +1,82 @@
+import hashlib, logging, os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from distribute import blobs, upload
+from distribute.app_parser import parser
+from distribute.app_parser.zip_index import ZipIndex
+from distribute.models import Package, PackageUpload
+from job.queue import schedule, task
+
+logger = logging.getLogger(__name__)
+
+def read_package(package, file, directory=None):
+    app = package.app
+    ext = package.package_file.name.split('.')[-1]
+    # The upload located the central directory already.
+    index = ZipIndex.from_directory(file, *directory) if directory else ZipIndex.from_file(file)
+    pkg = parser.parse(file, ext, app.os, app.platform, index)
+    if pkg is None:
+        return None
+    return {
+        'name': pkg.display_name or '',
+        'version': pkg.version or '',
+        'short_version': pkg.short_version or '',
+        'bundle_identifier': pkg.bundle_identifier or '',
+        'min_os': pkg.minimum_os_version or '',
+        'extra': pkg.extra,
+        'app_icon': pkg.app_icon
+    }
+
+@task('distribute.parse_package')
+def parse_package(package_id, directory=None):
+    try:
+        package = Package.objects.select_related('app').get(pk=package_id)
+    except Package.DoesNotExist:
+        return
+    with package.package_file.open('rb') as file:
+        try:
+            info = read_package(package, file, directory)
+        except Exception:
+            # A malformed package fails the same way on every attempt.
+            logger.exception('Failed to parse package %s', package_id)
+            info = None
+    if info is None:
+        package.state = Package.State.Failed
+        package.save()
+        return
+    app_icon = info.pop('app_icon')
+    for key, value in info.items():
+        setattr(package, key, value)
+    if app_icon is not None:
+        blobs.release(package.icon_file.name)
+        package.icon_file = blobs.store(ContentFile(app_icon), hashlib.sha256(app_icon).hexdigest(), 'png', blobs.ICONS)
+    package.state = Package.State.Ready
+    package.save()
+    app = package.app
+    if not app.icon_file and app_icon is not None:
+        app.icon_file.save('icon.png', ContentFile(app_icon))
+
+EXPIRE_UPLOADS = 'distribute.expire_uploads'
+
+@task(EXPIRE_UPLOADS, recur=True)
+def expire_uploads():
+    """Delete the upload sessions that got no chunk for UPLOAD_EXPIRE_SECONDS.
+
+    Part files left without a session are deleted once as old. The job
+    schedules itself again every UPLOAD_EXPIRE_INTERVAL seconds.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.UPLOAD_EXPIRE_SECONDS)
+    try:
+        for instance in PackageUpload.objects.filter(update_time__lt=cutoff):
+            upload.remove_part_file(instance)
+            instance.delete()
+        if os.path.isdir(settings.UPLOAD_ROOT):
+            active = {str(upload_id) for upload_id in PackageUpload.objects.values_list('upload_id', flat=True)}
+            for entry in os.scandir(settings.UPLOAD_ROOT):
+                if entry.name.split('.')[0] not in active and entry.stat().st_mtime < cutoff.timestamp():
+                    os.remove(entry.path)
+    finally:
+        schedule(EXPIRE_UPLOADS, now + timedelta(seconds=settings.UPLOAD_EXPIRE_INTERVAL))
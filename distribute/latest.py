@@ -0,0 +1,71 @@
+import re, uuid
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from distribute.models import LatestRelease, Release, ReleaseDeploymentKey, Upgrade
+
+def refresh(deployment_id):
+    """Copy the newest enabled release of a deployment into LatestRelease."""
+    deployment = ReleaseDeploymentKey.objects.filter(pk=deployment_id).first()
+    if deployment is None:
+        return
+    release = Release.objects.filter(deployment=deployment, enabled=True).select_related('package').order_by('-release_id').first()
+    if release is None:
+        LatestRelease.objects.filter(deployment=deployment).delete()
+        return
+    package = release.package
+    upgrades = Upgrade.objects.filter(release=release, enabled=True).order_by('upgrade_id')
+    values = {
+        'deployment_key': deployment.key,
+        'release_id': release.release_id,
+        'release_notes': release.release_notes,
+        'name': package.name,
+        'bundle_identifier': package.bundle_identifier,
+        'version': package.version,
+        'short_version': package.short_version,
+        'internal_build': package.internal_build,
+        'size': package.size,
+        'fingerprint': package.fingerprint,
+        'min_os': package.min_os,
+        'package_file': package.package_file.name or '',
+        'icon_file': package.icon_file.name or '',
+        'upgrades': [{
+            'target_version': upgrade.target_version,
+            'mandatory': upgrade.mandatory,
+            'release_notes': upgrade.release_notes,
+        } for upgrade in upgrades],
+    }
+    instance = LatestRelease.objects.filter(deployment=deployment).first()
+    if instance is None:
+        instance = LatestRelease(deployment=deployment)
+    elif all(getattr(instance, name) == value for name, value in values.items()):
+        # Unchanged, keep the revision so that clients keep their ETag.
+        return
+    for name, value in values.items():
+        setattr(instance, name, value)
+    instance.revision = uuid.uuid4()
+    instance.save()
+
+@receiver(post_save, sender=Release)
+@receiver(post_delete, sender=Release)
+def release_changed(sender, instance, **kwargs):
+    refresh(instance.deployment_id)
+
+@receiver(post_save, sender=Upgrade)
+@receiver(post_delete, sender=Upgrade)
+def upgrade_changed(sender, instance, **kwargs):
+    deployment_id = Release.objects.filter(pk=instance.release_id).values_list('deployment_id', flat=True).first()
+    if deployment_id is not None:
+        refresh(deployment_id)
+
+version_part = re.compile(r'\d+|[^\d.]+')
+
+def version_key(version):
+    """Sort key for version strings: '1.10' is newer than '1.9'."""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in version_part.findall(version)]
+
+def find_upgrade(latest, version):
+    # An upgrade without target_version applies to every version.
+    for upgrade in latest.upgrades:
+        if upgrade['target_version'] in ('', version):
+            return upgrade
+    return None
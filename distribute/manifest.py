@@ -0,0 +1,94 @@
+import plistlib, time
+from urllib.parse import quote
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+from application.models import Application
+from distribute.downloads import package_filename, signed_expiry, signed_url
+from distribute.models import Release
+from util.media import media_urls
+
+MANIFEST_SALT = 'distribute.manifest'
+
+def cache_key(release_id, expires):
+    return 'distribute.manifest.{0}.{1}'.format(release_id, expires)
+
+def build(request, release, expires):
+    """The itms-services manifest of an iOS release.
+
+    The package link in it is signed, the device downloads without a session.
+    """
+    package = release.package
+    name = package.package_file.name
+    filename = package_filename(release.app.name, package.short_version, package.internal_build, name)
+    assets = [{'kind': 'software-package', 'url': signed_url(request, name, filename, expires)}]
+    if package.icon_file:
+        icon = media_urls(request).url(package.icon_file.name)
+        assets += [{'kind': 'display-image', 'url': icon}, {'kind': 'full-size-image', 'url': icon}]
+    return plistlib.dumps({
+        'items': [{
+            'assets': assets,
+            'metadata': {
+                'bundle-identifier': package.bundle_identifier,
+                'bundle-version': package.short_version,
+                'kind': 'software',
+                'title': package.name,
+            },
+        }],
+    })
+
+def load(request, release_id, expires):
+    """The cached manifest, built when missing. None when the release is gone or disabled."""
+    content = cache.get(cache_key(release_id, expires)) if settings.MANIFEST_CACHE else None
+    if content is None:
+        release = Release.objects.select_related('package', 'app').filter(pk=release_id, enabled=True).first()
+        if release is None:
+            return None
+        content = store(request, release, expires)
+    return content
+
+def store(request, release, expires):
+    content = build(request, release, expires)
+    if settings.MANIFEST_CACHE:
+        cache.set(cache_key(release.pk, expires), content, max(expires - int(time.time()), 1))
+    return content
+
+def manifest_url(request, release):
+    """The signed URL of the manifest, for the manifest's lifetime."""
+    expires = signed_expiry()
+    token = signing.Signer(salt=MANIFEST_SALT).sign_object([release.pk, expires])
+    return request.build_absolute_uri(reverse('release-manifest', args=(token,)))
+
+def install_url(request, release):
+    """The itms-services link installing an iOS release, None for other systems."""
+    if release.app.os != Application.OperatingSystem.iOS:
+        return None
+    return 'itms-services://?action=download-manifest&url=' + quote(manifest_url(request, release), safe='')
+
+def unsign(token):
+    """The ``(release_id, expires)`` of a manifest token, raises BadSignature."""
+    try:
+        release_id, expires = signing.Signer(salt=MANIFEST_SALT).unsign_object(token)
+    except (TypeError, ValueError):
+        raise signing.BadSignature
+    return release_id, expires
+
+def invalidate(release_id):
+    if not settings.MANIFEST_CACHE:
+        return
+    # Tokens signed in this and in the previous window are still valid.
+    expires = signed_expiry()
+    cache.delete_many([cache_key(release_id, expires), cache_key(release_id, expires - settings.DOWNLOAD_URL_MAX_AGE)])
+
+def precompute(request, release):
+    """Build the manifest of a new or changed release ahead of the first device."""
+    if settings.MANIFEST_CACHE and release.enabled and release.app.os == Application.OperatingSystem.iOS:
+        store(request, release, signed_expiry())
+
+@receiver(post_save, sender=Release)
+@receiver(post_delete, sender=Release)
+def release_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Schema drift of the baseline models, which never got a migration."""
+
+    dependencies = [
+        ('distribute', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='releasestore',
+            name='release_store_id',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='storeapp',
+            name='store',
+            field=models.IntegerField(choices=[(1, 'Rawlink'), (2, 'Appstore'), (3, 'Googleplay'), (4, 'Microsoftstore'), (5, 'Vivo')]),
+        ),
+    ]
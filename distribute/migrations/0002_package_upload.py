@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('distribute', '0001_baseline_drift'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('file_name', models.CharField(help_text='The name of the package file being uploaded.', max_length=128)),
+                ('file_size', models.BigIntegerField(help_text='The total size of the package file in bytes.')),
+                ('offset', models.BigIntegerField(default=0, help_text='The number of contiguous bytes received so far.')),
+                ('create_time', models.DateTimeField(auto_now_add=True)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='application.application')),
+                ('uploader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
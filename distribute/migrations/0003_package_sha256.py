@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0002_package_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 checksum of the package binary.', max_length=64),
+        ),
+    ]
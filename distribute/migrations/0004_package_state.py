@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0003_package_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='state',
+            field=models.IntegerField(choices=[(1, 'Processing'), (2, 'Ready'), (3, 'Failed')], default=2, help_text='Packages are processing until the background worker has parsed them.'),
+        ),
+    ]
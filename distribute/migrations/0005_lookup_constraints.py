@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:14
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+import uuid
+
+
+def renumber(model, field):
+    """Give the rows sharing a number of their app the next free numbers.
+
+    Numbers were count() + 1, which repeats one after a delete. The oldest
+    row keeps the number.
+    """
+    duplicates = model.objects.values('app', field).annotate(rows=Count('pk')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        rows = model.objects.filter(app=duplicate['app'], **{field: duplicate[field]}).order_by('pk')
+        for row in rows[1:]:
+            last = model.objects.filter(app=duplicate['app']).aggregate(value=Max(field))['value']
+            setattr(row, field, last + 1)
+            row.save(update_fields=[field])
+
+
+def renumber_duplicates(apps, schema_editor):
+    renumber(apps.get_model('distribute', 'Package'), 'internal_build')
+    renumber(apps.get_model('distribute', 'Release'), 'release_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0004_package_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='releasedeploymentkey',
+            name='key',
+            field=models.UUIDField(default=uuid.uuid4, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='release',
+            index=models.Index(fields=['deployment', 'release_id'], name='distribute__deploym_1ad0bc_idx'),
+        ),
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='package',
+            constraint=models.UniqueConstraint(fields=('app', 'internal_build'), name='unique_app_internal_build'),
+        ),
+        migrations.AddConstraint(
+            model_name='release',
+            constraint=models.UniqueConstraint(fields=('app', 'release_id'), name='unique_app_release_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='releasedeploymentkey',
+            constraint=models.UniqueConstraint(fields=('app', 'name'), name='unique_app_deployment_name'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0002_app_constraints'),
+        ('distribute', '0005_lookup_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(max_length=32)),
+                ('value', models.IntegerField(default=0)),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='application.application')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='appsequence',
+            constraint=models.UniqueConstraint(fields=('app', 'name'), name='unique_app_sequence'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def fill_latest_releases(apps, schema_editor):
+    ReleaseDeploymentKey = apps.get_model('distribute', 'ReleaseDeploymentKey')
+    Release = apps.get_model('distribute', 'Release')
+    Upgrade = apps.get_model('distribute', 'Upgrade')
+    LatestRelease = apps.get_model('distribute', 'LatestRelease')
+    for deployment in ReleaseDeploymentKey.objects.all():
+        release = Release.objects.filter(deployment=deployment, enabled=True).select_related('package').order_by('-release_id').first()
+        if release is None:
+            continue
+        package = release.package
+        upgrades = Upgrade.objects.filter(release=release, enabled=True).order_by('upgrade_id')
+        LatestRelease.objects.create(
+            deployment=deployment,
+            deployment_key=deployment.key,
+            release_id=release.release_id,
+            release_notes=release.release_notes,
+            name=package.name,
+            bundle_identifier=package.bundle_identifier,
+            version=package.version,
+            short_version=package.short_version,
+            internal_build=package.internal_build,
+            size=package.size,
+            fingerprint=package.fingerprint,
+            min_os=package.min_os,
+            package_file=package.package_file.name or '',
+            icon_file=package.icon_file.name or '',
+            upgrades=[{
+                'target_version': upgrade.target_version,
+                'mandatory': upgrade.mandatory,
+                'release_notes': upgrade.release_notes,
+            } for upgrade in upgrades])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0006_app_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestRelease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deployment_key', models.UUIDField(unique=True)),
+                ('release_id', models.IntegerField()),
+                ('release_notes', models.CharField(max_length=1024)),
+                ('name', models.CharField(max_length=32)),
+                ('bundle_identifier', models.CharField(max_length=64)),
+                ('version', models.CharField(max_length=64)),
+                ('short_version', models.CharField(max_length=64)),
+                ('internal_build', models.IntegerField()),
+                ('size', models.IntegerField()),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('min_os', models.CharField(max_length=32)),
+                ('package_file', models.CharField(max_length=256)),
+                ('icon_file', models.CharField(max_length=256)),
+                ('upgrades', models.JSONField(default=list, help_text='The enabled upgrades of the release: target_version, mandatory and release_notes.')),
+                ('revision', models.UUIDField(default=uuid.uuid4, help_text='Replaced whenever the row changes, used as the ETag.')),
+                ('update_time', models.DateTimeField(auto_now=True)),
+                ('deployment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='latest_release', to='distribute.releasedeploymentkey')),
+            ],
+        ),
+        migrations.RunPython(fill_latest_releases, migrations.RunPython.noop),
+    ]
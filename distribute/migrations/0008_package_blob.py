@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0007_latest_release'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=256, unique=True)),
+                ('size', models.IntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('create_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['app', 'sha256'], name='distribute__app_id_e2f1a9_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0008_package_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='releasestore',
+            name='message',
+            field=models.CharField(blank=True, help_text="The store's answer to the submission, the reason of a rejection.", max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='releasestore',
+            name='next_poll_time',
+            field=models.DateTimeField(help_text='When the store is polled next, null once the submission has settled.', null=True),
+        ),
+        migrations.AddField(
+            model_name='releasestore',
+            name='poll_interval',
+            field=models.IntegerField(default=0, help_text='Seconds between two polls of the store, grows while the review is pending.'),
+        ),
+        migrations.AlterField(
+            model_name='releasestore',
+            name='state',
+            field=models.IntegerField(choices=[(1, 'Initial'), (2, 'SubmitReview'), (3, 'ReviewPassed'), (4, 'ReviewRejected'), (5, 'Released')]),
+        ),
+        migrations.AlterField(
+            model_name='storeapp',
+            name='store',
+            field=models.IntegerField(choices=[(1, 'RawLink'), (2, 'AppStore'), (3, 'GooglePlay'), (4, 'MicrosoftStore'), (5, 'Vivo')]),
+        ),
+        migrations.AddIndex(
+            model_name='releasestore',
+            index=models.Index(fields=['next_poll_time'], name='distribute__next_po_1357f6_idx'),
+        ),
+    ]
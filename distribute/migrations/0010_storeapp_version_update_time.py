@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0009_release_store_polling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeapp',
+            name='version_update_time',
+            field=models.DateTimeField(help_text='When current_version was last read from the store.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='storeapp',
+            name='current_version',
+            field=models.CharField(help_text='The version on sale in the store, as last read by the background refresh.', max_length=64),
+        ),
+    ]
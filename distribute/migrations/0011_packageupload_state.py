@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribute', '0010_storeapp_version_update_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packageupload',
+            name='state',
+            field=models.IntegerField(choices=[(1, 'Uploading'), (2, 'Committing')], default=1, help_text='Committing while the package is created from the part file.'),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 from application.models import Application
+from util.choice import CustomChoicesMeta
 
 
 # alpha, beta, production, ...
@@ -25,7 +26,12 @@ from application.models import Application
 class ReleaseDeploymentKey(models.Model):
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
     name = models.SlugField(max_length=32)
-    key = models.UUIDField(default=uuid.uuid4)
+    key = models.UUIDField(default=uuid.uuid4, unique=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['app', 'name'], name='unique_app_deployment_name'),
+        ]
 
 @receiver(post_save, sender=Application)
 def notify_app_save(sender, instance, created, **kwargs):
@@ -37,7 +43,8 @@ def notify_app_save(sender, instance, created, **kwargs):
     ])
 
 def distribute_package_path(instance, filename):
-    name = instance.app.name + '_' + instance.short_version + '.' + filename.split('.')[-1]
+    # The package is stored before it is parsed, the short version is not known yet.
+    name = instance.app.name + '_' + str(instance.internal_build) + '.' + filename.split('.')[-1]
     if instance.app.org is not None:
       return 'orgs/{0}/apps/{1}/releases/{2}'.format(instance.app.org.name, instance.app.name, name)
     else:
@@ -50,12 +57,30 @@ def distribute_icon_path(instance, filename):
     else:
       return 'users/{0}/apps/{1}/icons/{2}'.format(instance.app.owner.username, instance.app.name, name)
 
+class Blob(models.Model):
+    """A stored file named by the SHA-256 of its content.
+
+    Packages holding the same bytes share one blob, ``refcount`` is the
+    number of package and icon files pointing at it.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=256, unique=True)
+    size = models.IntegerField()
+    refcount = models.IntegerField(default=0)
+    create_time = models.DateTimeField(auto_now_add=True)
+
 class Package(models.Model):
+    class State(models.IntegerChoices):
+        Processing = 1
+        Ready = 2
+        Failed = 3
+
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
     name = models.CharField(max_length=32, help_text="The app's name (extracted from the uploaded package).")
     package_file = models.FileField(upload_to=distribute_package_path)
     icon_file = models.FileField(upload_to=distribute_icon_path)
     fingerprint = models.CharField(max_length=32, help_text="MD5 checksum of the package binary.")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 checksum of the package binary.")
     version = models.CharField(max_length=64, help_text="The package's version.\nFor iOS: CFBundleVersion from info.plist.\nFor Android: android:versionCode from AppManifest.xml.")
     short_version = models.CharField(max_length=64, help_text="The package's short version.\nFor iOS: CFBundleShortVersionString from info.plist.\nFor Android: android:versionName from AppManifest.xml.")
     internal_build = models.IntegerField()
@@ -66,17 +91,56 @@ class Package(models.Model):
     description = models.CharField(max_length=1024, help_text="The package's description.")
     commit_id = models.CharField(max_length=32)
     channle = models.CharField(max_length=32)
+    state = models.IntegerField(choices=State.choices, default=State.Ready, help_text="Packages are processing until the background worker has parsed them.")
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.pk and self.package_file is not None:
+        if not self.pk and self.package_file is not None and not self.fingerprint:
             md5 = hashlib.md5()
+            sha256 = hashlib.sha256()
             for chunk in self.package_file.chunks():
                 md5.update(chunk)
+                sha256.update(chunk)
             self.fingerprint = md5.hexdigest()
+            self.sha256 = sha256.hexdigest()
         super(Package, self).save(*args, **kwargs)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['app', 'internal_build'], name='unique_app_internal_build'),
+        ]
+        indexes = [
+            # Re-uploads of a package the app already has.
+            models.Index(fields=['app', 'sha256']),
+        ]
+
+class PackageUpload(models.Model):
+    class State(models.IntegerChoices):
+        Uploading = 1
+        Committing = 2
+
+    app = models.ForeignKey(Application, on_delete=models.CASCADE)
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True)
+    file_name = models.CharField(max_length=128, help_text="The name of the package file being uploaded.")
+    file_size = models.BigIntegerField(help_text="The total size of the package file in bytes.")
+    offset = models.BigIntegerField(default=0, help_text="The number of contiguous bytes received so far.")
+    state = models.IntegerField(choices=State.choices, default=State.Uploading, help_text="Committing while the package is created from the part file.")
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE)
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+class AppSequence(models.Model):
+    # The last internal_build, release_id, ... handed out for an app.
+    app = models.ForeignKey(Application, on_delete=models.CASCADE)
+    name = models.SlugField(max_length=32)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['app', 'name'], name='unique_app_sequence'),
+        ]
+
 class Release(models.Model):
     deployment = models.ForeignKey(ReleaseDeploymentKey, on_delete=models.CASCADE)
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
@@ -87,6 +151,15 @@ class Release(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['app', 'release_id'], name='unique_app_release_id'),
+        ]
+        indexes = [
+            # Release lists of one environment, in release order.
+            models.Index(fields=['deployment', 'release_id']),
+        ]
+
 class Upgrade(models.Model):
     release = models.ForeignKey(Release, on_delete=models.CASCADE)
     release_notes = models.CharField(max_length=1024, help_text="The release's release notes.")
@@ -97,8 +170,30 @@ class Upgrade(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+class LatestRelease(models.Model):
+    # The newest enabled release of a deployment, copied from Release, Package
+    # and Upgrade, so that update checks read one row by deployment key.
+    # Kept up to date by distribute.latest.
+    deployment = models.OneToOneField(ReleaseDeploymentKey, on_delete=models.CASCADE, related_name='latest_release')
+    deployment_key = models.UUIDField(unique=True)
+    release_id = models.IntegerField()
+    release_notes = models.CharField(max_length=1024)
+    name = models.CharField(max_length=32)
+    bundle_identifier = models.CharField(max_length=64)
+    version = models.CharField(max_length=64)
+    short_version = models.CharField(max_length=64)
+    internal_build = models.IntegerField()
+    size = models.IntegerField()
+    fingerprint = models.CharField(max_length=32)
+    min_os = models.CharField(max_length=32)
+    package_file = models.CharField(max_length=256)
+    icon_file = models.CharField(max_length=256)
+    upgrades = models.JSONField(default=list, help_text="The enabled upgrades of the release: target_version, mandatory and release_notes.")
+    revision = models.UUIDField(default=uuid.uuid4, help_text="Replaced whenever the row changes, used as the ETag.")
+    update_time = models.DateTimeField(auto_now=True)
+
 class StoreApp(models.Model):
-    class StoreType(models.IntegerChoices):
+    class StoreType(models.IntegerChoices, metaclass=CustomChoicesMeta):
         RawLink = 1
         AppStore = 2
         GooglePlay = 3
@@ -111,12 +206,13 @@ class StoreApp(models.Model):
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
     store = models.IntegerField(choices=StoreType.choices)
     auth_data = models.JSONField()
-    current_version = models.CharField(max_length=64)
+    current_version = models.CharField(max_length=64, help_text="The version on sale in the store, as last read by the background refresh.")
+    version_update_time = models.DateTimeField(null=True, help_text="When current_version was last read from the store.")
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
 class ReleaseStore(models.Model):
-    class State(models.IntegerChoices):
+    class State(models.IntegerChoices, metaclass=CustomChoicesMeta):
         Initial = 1
         SubmitReview = 2
         ReviewPassed = 3
@@ -128,6 +224,14 @@ class ReleaseStore(models.Model):
     release_notes = models.CharField(max_length=1024, help_text="The release's release notes.")
     store = models.ForeignKey(StoreApp, on_delete=models.CASCADE)
     state = models.IntegerField(choices=State.choices)
+    message = models.CharField(max_length=1024, blank=True, help_text="The store's answer to the submission, the reason of a rejection.")
+    poll_interval = models.IntegerField(default=0, help_text="Seconds between two polls of the store, grows while the review is pending.")
+    next_poll_time = models.DateTimeField(null=True, help_text="When the store is polled next, null once the submission has settled.")
     operator = models.ForeignKey(User, on_delete=models.CASCADE)
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_poll_time']),
+        ]
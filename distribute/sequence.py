@@ -0,0 +1,34 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from distribute.models import AppSequence, Package, Release, ReleaseStore
+
+def next_value(app, name, rows, field):
+    """Allocate the next ``field`` of the app's ``rows`` for ``app``.
+
+    The UPDATE locks the counter row until the transaction ends, so
+    concurrent callers get consecutive numbers instead of the same one. A
+    number is lost if the caller's transaction rolls back, numbers are never
+    handed out twice.
+    """
+    counters = AppSequence.objects.filter(app=app, name=name)
+    with transaction.atomic():
+        if counters.update(value=F('value') + 1) == 0:
+            # First use: continue after the rows created before the counter.
+            start = rows.aggregate(value=Max(field))['value'] or 0
+            try:
+                with transaction.atomic():
+                    AppSequence.objects.create(app=app, name=name, value=start + 1)
+                    return start + 1
+            except IntegrityError:
+                # Another request created it first.
+                counters.update(value=F('value') + 1)
+        return counters.values_list('value', flat=True).get()
+
+def next_internal_build(app):
+    return next_value(app, 'internal_build', Package.objects.filter(app=app), 'internal_build')
+
+def next_release_id(app):
+    return next_value(app, 'release_id', Release.objects.filter(app=app), 'release_id')
+
+def next_release_store_id(app):
+    return next_value(app, 'release_store_id', ReleaseStore.objects.filter(package__app=app), 'release_store_id')
@@ -1,7 +1,13 @@
 from collections import OrderedDict
-from distribute.models import Package, Release, ReleaseStore, Upgrade, StoreApp
+from django.conf import settings
+from distribute.models import LatestRelease, Package, PackageUpload, Release, ReleaseStore, Upgrade, StoreApp
 from rest_framework import serializers
 from util.choice import ChoiceField
+from distribute import manifest
+from distribute.store import registry
+from distribute.downloads import DownloadUrlField, download_url, package_filename, signed_url
+from util.media import MediaUrlField
+from util.rows import RowSerializer, choice, datetime, media_url
 
 class NonNullModelSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
@@ -9,29 +15,72 @@ class NonNullModelSerializer(serializers.ModelSerializer):
         return OrderedDict([(key, result[key]) for key in result if result[key] is not None])
 
 class PackageSerializer(NonNullModelSerializer):
-    package_file = serializers.SerializerMethodField()
-    def get_package_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.package_file.url)
-        except:
-            return ''
+    package_file = DownloadUrlField('packages', source='internal_build')
+    icon_file = MediaUrlField(empty=None)
+    state = ChoiceField(choices=Package.State.choices, read_only=True)
 
     class Meta:
         model = Package
-        fields = ['name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle', 'description', 'update_time', 'create_time']
-        read_only_fields = ['name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'min_os', 'channle']
+        fields = ['name', 'package_file', 'icon_file', 'fingerprint', 'sha256', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle', 'description', 'state', 'update_time', 'create_time']
+        read_only_fields = ['name', 'package_file', 'icon_file', 'fingerprint', 'sha256', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'min_os', 'channle']
+
+# PackageSerializer output of values() rows, for package lists.
+package_rows = RowSerializer(
+    ('name', 'name', None),
+    ('package_file', 'internal_build', download_url('packages')),
+    ('icon_file', 'icon_file', media_url(None)),
+    ('fingerprint', 'fingerprint', None),
+    ('sha256', 'sha256', None),
+    ('version', 'version', None),
+    ('short_version', 'short_version', None),
+    ('internal_build', 'internal_build', None),
+    ('size', 'size', None),
+    ('bundle_identifier', 'bundle_identifier', None),
+    ('commit_id', 'commit_id', None),
+    ('min_os', 'min_os', None),
+    ('channle', 'channle', None),
+    ('description', 'description', None),
+    ('state', 'state', choice(Package.State)),
+    ('update_time', 'update_time', datetime),
+    ('create_time', 'create_time', datetime),
+)
 
 class PackageUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Package
         fields = ['description', 'commit_id']
 
+def validate_upload_size(size):
+    # Read on every call, so override_settings applies.
+    if size > settings.UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError('Ensure this value is less than or equal to {0}.'.format(settings.UPLOAD_MAX_SIZE))
+
 class UploadPackageSerializer(serializers.Serializer):
     file = serializers.FileField()
     class Meta:
         fields = ['file']
 
+    def validate_file(self, value):
+        validate_upload_size(value.size)
+        return value
+
+class PackageUploadSerializer(serializers.ModelSerializer):
+    file_size = serializers.IntegerField(min_value=1, help_text="The total size of the package file in bytes, UPLOAD_MAX_SIZE at most.")
+
+    class Meta:
+        model = PackageUpload
+        fields = ['upload_id', 'file_name', 'file_size', 'offset', 'update_time', 'create_time']
+        read_only_fields = ['upload_id', 'offset']
+
+    def validate_file_size(self, value):
+        validate_upload_size(value)
+        return value
+
+class PackageUploadCommitSerializer(serializers.Serializer):
+    fingerprint = serializers.CharField(max_length=32, required=False, help_text="MD5 checksum of the whole package binary, verified before the package is created.")
+    class Meta:
+        fields = ['fingerprint']
+
 class ReleaseSerializer(NonNullModelSerializer):
     name = serializers.ReadOnlyField(source='package.name')
     fingerprint = serializers.ReadOnlyField(source='package.fingerprint')
@@ -43,29 +92,54 @@ class ReleaseSerializer(NonNullModelSerializer):
     commit_id = serializers.ReadOnlyField(source='package.commit_id')
     min_os = serializers.ReadOnlyField(source='package.min_os')
     channle = serializers.ReadOnlyField(source='package.channle')
+    state = ChoiceField(choices=Package.State.choices, source='package.state', read_only=True)
 
-    package_file = serializers.SerializerMethodField()
-    icon_file = serializers.SerializerMethodField()
-
-    def get_package_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.package.package_file.url)
-        except:
-            return ''
-
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.package.icon_file.url)
-        except:
-            return ''
+    package_file = DownloadUrlField('releases', source='release_id')
+    icon_file = MediaUrlField(source='package.icon_file')
 
     class Meta:
         model = Release
-        fields = ['release_id', 'release_notes', 'enabled', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle', 'update_time', 'create_time']
+        fields = ['release_id', 'release_notes', 'enabled', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle', 'state', 'update_time', 'create_time']
         read_only_fields = ['release_id', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle']
 
+# ReleaseSerializer output of values() rows, for release lists.
+release_rows = RowSerializer(
+    ('release_id', 'release_id', None),
+    ('release_notes', 'release_notes', None),
+    ('enabled', 'enabled', None),
+    ('name', 'package__name', None),
+    ('package_file', 'release_id', download_url('releases')),
+    ('icon_file', 'package__icon_file', media_url()),
+    ('fingerprint', 'package__fingerprint', None),
+    ('version', 'package__version', None),
+    ('short_version', 'package__short_version', None),
+    ('internal_build', 'package__internal_build', None),
+    ('size', 'package__size', None),
+    ('bundle_identifier', 'package__bundle_identifier', None),
+    ('commit_id', 'package__commit_id', None),
+    ('min_os', 'package__min_os', None),
+    ('channle', 'package__channle', None),
+    ('state', 'package__state', choice(Package.State)),
+    ('update_time', 'update_time', datetime),
+    ('create_time', 'create_time', datetime),
+)
+
+class ReleaseDetailSerializer(ReleaseSerializer):
+    download_url = serializers.SerializerMethodField(help_text="A download link that needs no authentication, valid for at least DOWNLOAD_URL_MAX_AGE seconds.")
+    install_url = serializers.SerializerMethodField(help_text="The itms-services link installing an iOS release over the air.")
+
+    def get_download_url(self, obj):
+        request = self.context['request']
+        name = obj.package.package_file.name
+        filename = package_filename(request.resolver_match.kwargs['app_name'], obj.package.short_version, obj.package.internal_build, name)
+        return signed_url(request, name, filename)
+
+    def get_install_url(self, obj):
+        return manifest.install_url(self.context['request'], obj)
+
+    class Meta(ReleaseSerializer.Meta):
+        fields = ReleaseSerializer.Meta.fields + ['download_url', 'install_url']
+
 class ReleaseCreateSerializer(serializers.Serializer):
     internal_build = serializers.IntegerField()
     enabled = serializers.BooleanField()
@@ -97,10 +171,46 @@ class UpgradeSerializer(NonNullModelSerializer):
         fields = ['upgrade_id', 'release_notes', 'target_version', 'enabled', 'mandatory', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'bundle_identifier', 'channle', 'update_time', 'create_time']
         read_only_fields = ['upgrade_id', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'bundle_identifier', 'channle']
 
+class LatestReleaseSerializer(NonNullModelSerializer):
+    package_file = serializers.SerializerMethodField()
+    icon_file = MediaUrlField(empty=None)
+
+    def get_package_file(self, obj):
+        # Installed apps download without a session.
+        if not obj.package_file:
+            return None
+        filename = package_filename(obj.bundle_identifier or 'package', obj.short_version, obj.internal_build, obj.package_file)
+        return signed_url(self.context['request'], obj.package_file, filename)
+
+    class Meta:
+        model = LatestRelease
+        fields = ['release_id', 'release_notes', 'name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'min_os', 'update_time']
+
 class StoreAppSerializer(NonNullModelSerializer):
+    store = ChoiceField(choices=StoreApp.StoreType.choices, read_only=True)
+    store_name = serializers.SerializerMethodField()
+    store_display_name = serializers.SerializerMethodField()
+    store_icon = serializers.SerializerMethodField()
+
+    def adapter(self, obj):
+        return registry.get_adapter(obj.store)
+
+    def get_store_name(self, obj):
+        adapter = self.adapter(obj)
+        return adapter.name() if adapter else None
+
+    def get_store_display_name(self, obj):
+        adapter = self.adapter(obj)
+        return adapter.display_name() if adapter else None
+
+    def get_store_icon(self, obj):
+        adapter = self.adapter(obj)
+        return adapter.icon() if adapter else None
+
     class Meta:
         model = StoreApp
-        fields = ['store_name', 'store_display_name', 'store_icon', 'auth_data', 'current_version']
+        # current_version is cached, version_update_time tells how fresh it is.
+        fields = ['store', 'store_name', 'store_display_name', 'store_icon', 'current_version', 'version_update_time']
 
 class StoreAppVivoAuthSerializer(serializers.Serializer):
     access_key = serializers.CharField()
@@ -111,9 +221,18 @@ class StoreAppVivoAuthSerializer(serializers.Serializer):
         fields = ['access_key', 'access_secret', 'vivo_store_app_id', 'store_link']
 
 class ReleaseStoreSerializer(NonNullModelSerializer):
+    name = serializers.ReadOnlyField(source='package.name')
+    version = serializers.ReadOnlyField(source='package.version')
+    short_version = serializers.ReadOnlyField(source='package.short_version')
+    internal_build = serializers.ReadOnlyField(source='package.internal_build')
+    bundle_identifier = serializers.ReadOnlyField(source='package.bundle_identifier')
+    store = ChoiceField(choices=StoreApp.StoreType.choices, source='store.store', read_only=True)
+    state = ChoiceField(choices=ReleaseStore.State.choices, read_only=True)
+    operator = serializers.ReadOnlyField(source='operator.username')
+
     class Meta:
         model = ReleaseStore
-        fields = ['name', 'package_file', 'icon_file', 'fingerprint', 'version', 'short_version', 'internal_build', 'size', 'bundle_identifier', 'commit_id', 'min_os', 'channle', 'release_store_id', 'release_notes', 'store', 'state', 'operator', 'update_time', 'create_time']
+        fields = ['name', 'version', 'short_version', 'internal_build', 'bundle_identifier', 'release_store_id', 'release_notes', 'store', 'state', 'message', 'operator', 'update_time', 'create_time']
 
 class ReleaseStoreCreateSerializer(serializers.Serializer):
     internal_build = serializers.IntegerField()
@@ -124,6 +243,13 @@ class ReleaseStoreCreateSerializer(serializers.Serializer):
     class Meta:
         fields = ['internal_build', 'release_notes', 'store', 'state']
 
+class StoreSubmissionSerializer(serializers.Serializer):
+    release_notes = serializers.CharField(max_length=1024)
+    stores = serializers.ListField(child=ChoiceField(choices=StoreApp.StoreType.choices), required=False, allow_empty=False, help_text="The stores to submit to, every store app with an adapter by default.")
+
+    class Meta:
+        fields = ['release_notes', 'stores']
+
 class ReleaseStoreUpdateSerializer(serializers.Serializer):
     internal_build = serializers.IntegerField()
     release_notes = serializers.CharField()
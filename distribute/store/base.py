@@ -57,30 +57,41 @@ class AppPackage:
     def release_notes(self, value):
         self._release_notes = value
 
+def result(code, message=''):
+    """The answer of submit and submit_result."""
+    return {
+        'error': {
+            'code': code,
+            'message': message
+        }
+    }
+
 class StoreBase:
     def __init__(self, auth_data):
         pass
 
     @classmethod
-    def name():
+    def name(cls):
         return ''
 
     @classmethod
-    def display_name():
+    def display_name(cls):
         return ''
 
     @classmethod
-    def icon():
+    def icon(cls):
         return ''
 
     @classmethod
-    def channel():
+    def channel(cls):
         return ''
 
     def submit(self, package):
+        """Submit an AppPackage for review, returns ``{'error': {'code', 'message'}}``."""
         pass
 
     def submit_result(self, submit_id):
+        """The review outcome, its code is success, failure or pending."""
         pass
 
     def current_version(self):
@@ -0,0 +1,137 @@
+import logging, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt, the store is overloaded or restarting.
+RETRY_STATUSES = (429, 502, 503, 504)
+# The ones that say the store did not act on the call, for calls that are
+# not idempotent. A gateway error may come after the store applied it.
+REJECTED_STATUSES = (429, 503)
+
+class StoreError(Exception):
+    """A store API call that failed for good, after the retries."""
+
+class MaybeSentError(StoreError):
+    """A call that is not idempotent failed after it may have reached the store."""
+
+class RateLimiter:
+    """A token bucket allowing ``rate`` calls per second, in bursts of ``burst``.
+
+    Shared by the threads calling one store, a caller blocks until its call
+    is allowed.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Reserving the token before sleeping keeps the order of callers.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            self.sleep(wait)
+
+def not_sent(error):
+    """Whether a failed request never reached the store.
+
+    True when no connection could be made, refused or timed out. A reset
+    of a pooled connection may come after the request was sent.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+class StoreClient:
+    """HTTP calls to one store API.
+
+    Connections are pooled in one session per store and reused across calls
+    and threads. Every call has a timeout, goes through the store's rate
+    limiter and is retried with exponential backoff on connection errors,
+    timeouts and RETRY_STATUSES, honouring Retry-After.
+    """
+
+    def __init__(self, name, rate=None, burst=1, timeout=(5, 30), retries=3, backoff=0.5, pool_size=10, sleep=time.sleep):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.limiter = RateLimiter(rate, burst, sleep=sleep) if rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url, data, idempotent=True):
+        """POST a form and return the decoded JSON answer.
+
+        ``data`` is the form, or a function building it for each attempt so
+        that signed payloads get a fresh timestamp. A call that is not
+        ``idempotent`` may have been acted on whenever it was sent, so it is
+        only retried when it did not reach the store or the store answered
+        one of REJECTED_STATUSES.
+        """
+        retry_statuses = RETRY_STATUSES if idempotent else REJECTED_STATUSES
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            delay = self.backoff * 2 ** attempt
+            try:
+                r = self.session.post(url, data=data() if callable(data) else data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent and not not_sent(e):
+                    raise MaybeSentError('{0} call may have gone through: {1}'.format(self.name, e))
+                error = e
+            else:
+                if r.status_code not in retry_statuses:
+                    if r.status_code in RETRY_STATUSES:
+                        raise MaybeSentError('{0} answered {1}, the call may have gone through'.format(self.name, r.status_code))
+                    if r.status_code >= 400:
+                        raise StoreError('{0} answered {1}'.format(self.name, r.status_code))
+                    try:
+                        return r.json()
+                    except ValueError:
+                        raise StoreError('{0} answered with invalid JSON'.format(self.name))
+                error = StoreError('{0} answered {1}'.format(self.name, r.status_code))
+                retry_after = r.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            if attempt < self.retries:
+                logger.warning('%s call failed (%s), retrying in %.1fs', self.name, error, delay)
+                self.sleep(delay)
+        raise StoreError('{0} call failed: {1}'.format(self.name, error))
+
+clients = {}
+clients_lock = threading.Lock()
+
+def get_client(name):
+    """The shared client of store ``name``, configured by STORE_CLIENTS."""
+    with clients_lock:
+        client = clients.get(name)
+        if client is None:
+            options = dict(settings.STORE_CLIENT_DEFAULTS)
+            options.update(settings.STORE_CLIENTS.get(name, {}))
+            client = clients[name] = StoreClient(name, **options)
+        return client
+
+def reset_clients():
+    """Drop the shared clients, so that changed settings apply."""
+    with clients_lock:
+        for client in clients.values():
+            client.session.close()
+        clients.clear()
@@ -0,0 +1,65 @@
+import threading, time
+from distribute.store.base import StoreBase, result
+from distribute.store.client import StoreError
+
+class FakeStore(StoreBase):
+    """A store answering from memory, for tests and local development.
+
+    The store app's ``auth_data`` scripts it: ``submit`` and ``review`` are
+    the codes answered by submit and submit_result (success by default),
+    ``message`` comes with them, ``version`` is the current version,
+    ``delay`` the seconds every call takes and ``error`` makes every call
+    raise StoreError. Calls are recorded in ``calls``, the most calls in
+    progress at once in ``max_active``.
+    """
+    calls = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, auth_data):
+        self.auth_data = auth_data
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.calls = []
+            cls.active = cls.max_active = 0
+
+    @classmethod
+    def name(cls):
+        return 'fake'
+
+    @classmethod
+    def display_name(cls):
+        return 'Fake'
+
+    @classmethod
+    def channel(cls):
+        return 'fake'
+
+    def call(self, method, *args):
+        cls = type(self)
+        with cls.lock:
+            cls.calls.append((self.auth_data.get('name', ''), method) + args)
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(self.auth_data.get('delay', 0))
+            if self.auth_data.get('error'):
+                raise StoreError(self.auth_data['error'])
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def submit(self, package):
+        self.call('submit', package.bundle_identifier)
+        return result(self.auth_data.get('submit', 'success'), self.auth_data.get('message', ''))
+
+    def submit_result(self, submit_id):
+        self.call('submit_result', submit_id)
+        return result(self.auth_data.get('review', 'success'), self.auth_data.get('message', ''))
+
+    def current_version(self):
+        self.call('current_version')
+        return self.auth_data.get('version', '')
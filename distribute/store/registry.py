@@ -0,0 +1,30 @@
+import contextlib
+
+adapters = {}
+
+def register(store_type):
+    """Register a StoreBase subclass as the adapter calling stores of ``store_type``."""
+    def decorator(cls):
+        adapters[store_type] = cls
+        return cls
+    return decorator
+
+def get_adapter(store_type):
+    """The adapter class of ``store_type``, None when stores of the type are handled by hand."""
+    return adapters.get(store_type)
+
+def get_store(store_app):
+    """The adapter calling the store of ``store_app``, None when there is none."""
+    adapter = adapters.get(store_app.store)
+    return adapter(store_app.auth_data) if adapter is not None else None
+
+@contextlib.contextmanager
+def override(replacements):
+    """Use other adapters, fakes in tests, for store types within the block."""
+    saved = dict(adapters)
+    adapters.update(replacements)
+    try:
+        yield
+    finally:
+        adapters.clear()
+        adapters.update(saved)
@@ -0,0 +1,255 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from distribute.downloads import package_filename, signed_url
+from distribute.models import ReleaseStore, StoreApp
+from distribute.store.base import AppPackage, result
+from distribute.store.client import MaybeSentError, StoreError
+from distribute.store.registry import adapters, get_store
+from job.queue import enqueue, schedule, task
+
+logger = logging.getLogger(__name__)
+
+SUBMIT = 'distribute.submit_stores'
+POLL = 'distribute.poll_stores'
+REFRESH = 'distribute.refresh_store_versions'
+
+# Submissions waiting for the store: the review, then the release.
+IN_FLIGHT = [ReleaseStore.State.SubmitReview, ReleaseStore.State.ReviewPassed]
+
+UNSUPPORTED = 'The store does not take submissions.'
+
+def app_package(release_store):
+    package = release_store.package
+    name = package.package_file.name
+    filename = package_filename(package.app.name, package.short_version, package.internal_build, name)
+    app_package = AppPackage()
+    app_package.package_download_url = signed_url(None, name, filename)
+    app_package.fingerprint = package.fingerprint
+    app_package.bundle_identifier = package.bundle_identifier
+    app_package.version = package.version
+    app_package.short_version = package.short_version
+    app_package.release_notes = release_store.release_notes
+    return app_package
+
+def submit(release_stores):
+    """Hand submissions over to the background worker, one job for all stores."""
+    enqueue(SUBMIT, release_store_ids=[release_store.pk for release_store in release_stores])
+
+def wait(release_store, now, interval):
+    release_store.poll_interval = interval
+    release_store.next_poll_time = now + timedelta(seconds=interval)
+
+def settle(release_store, state, message=''):
+    release_store.state = state
+    release_store.message = message[:1024]
+    release_store.next_poll_time = None
+
+def backoff(release_store, now):
+    """Poll a pending submission less and less often."""
+    interval = min(max(release_store.poll_interval * 2, settings.STORE_POLL_INTERVAL), settings.STORE_POLL_MAX_INTERVAL)
+    wait(release_store, now, interval)
+
+def submit_one(store_app, package):
+    # Runs in the pool, it calls the store and leaves the database alone.
+    # The adapter is built here too, bad auth_data fails this store only.
+    try:
+        store = get_store(store_app)
+        if store is None:
+            return result('failure', UNSUPPORTED)
+        return store.submit(package)
+    except MaybeSentError as e:
+        # Pending, the poll asks the store whether it got the submission.
+        logger.warning('Submitting to store app %s may have failed: %s', store_app.pk, e)
+        return result('pending', str(e))
+    except StoreError as e:
+        # The client has retried already.
+        logger.warning('Submitting to store app %s failed: %s', store_app.pk, e)
+        return result('failure', str(e))
+    except Exception as e:
+        logger.exception('Submitting to store app %s failed', store_app.pk)
+        return result('failure', str(e))
+
+def fan_out(release_stores):
+    """Submit to all the stores at once, from STORE_SUBMIT_WORKERS threads at most.
+
+    Returns the result of every submission, in order. A store failing does
+    not hold up or fail the others.
+    """
+    calls = [(release_store.store, app_package(release_store)) for release_store in release_stores]
+    with ThreadPoolExecutor(max_workers=settings.STORE_SUBMIT_WORKERS) as pool:
+        return list(pool.map(lambda call: submit_one(*call), calls))
+
+def claim_submissions(release_store_ids):
+    """Move the submissions still Initial to SubmitReview before any store is called.
+
+    Submitting twice queues a second update at the store, so a retried job
+    must not find them Initial again. Until the submission is saved, they
+    are not due for JOB_QUEUE_LEASE seconds. If the job dies meanwhile, the
+    poll asks the store how the submission went.
+    """
+    lease = timezone.now() + timedelta(seconds=settings.JOB_QUEUE_LEASE)
+    initial = ReleaseStore.objects.filter(state=ReleaseStore.State.Initial)
+    claimed = [pk for pk in release_store_ids if initial.filter(pk=pk).update(state=ReleaseStore.State.SubmitReview, next_poll_time=lease) == 1]
+    return list(ReleaseStore.objects.select_related('package__app', 'store').filter(pk__in=claimed))
+
+@task(SUBMIT)
+def submit_stores(release_store_ids):
+    release_stores = claim_submissions(release_store_ids)
+    if not release_stores:
+        return
+    lease = release_stores[0].next_poll_time
+    try:
+        results = fan_out(release_stores)
+        now = timezone.now()
+        for release_store, r in zip(release_stores, results):
+            if r['error']['code'] in ('success', 'pending'):
+                # A pending submission keeps why, the poll settles it.
+                release_store.message = r['error']['message'][:1024]
+                wait(release_store, now, settings.STORE_POLL_INTERVAL)
+            else:
+                settle(release_store, ReleaseStore.State.ReviewRejected, r['error']['message'])
+            release_store.save()
+    except Exception:
+        # Poll the claimed submissions once their lease is over. A worker
+        # that dies restarts the poll with start_recurring instead.
+        schedule(POLL, lease)
+        raise
+    polls = [release_store.next_poll_time for release_store in release_stores if release_store.next_poll_time is not None]
+    if polls:
+        schedule(POLL, min(polls))
+
+def claim(limit):
+    """Take up to ``limit`` due submissions, like job.queue.claim takes jobs.
+
+    A claimed submission is not due again for JOB_QUEUE_LEASE seconds, so
+    concurrent polls never call the store twice for it.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.JOB_QUEUE_LEASE)
+    due = ReleaseStore.objects.filter(state__in=IN_FLIGHT, next_poll_time__lte=now)
+    claimed = []
+    for pk, next_poll_time in due.order_by('next_poll_time').values_list('pk', 'next_poll_time')[:limit]:
+        if due.filter(pk=pk, next_poll_time=next_poll_time).update(next_poll_time=lease) == 1:
+            claimed.append(pk)
+    return list(ReleaseStore.objects.select_related('package', 'store').filter(pk__in=claimed))
+
+def poll(store, release_store, now):
+    """Advance one submission: review, then release of the package."""
+    package = release_store.package
+    if release_store.state == ReleaseStore.State.SubmitReview:
+        r = store.submit_result(package.bundle_identifier)['error']
+        if r['code'] == 'success':
+            release_store.state = ReleaseStore.State.ReviewPassed
+            release_store.message = ''
+            # The store publishes soon after the review, look again early.
+            wait(release_store, now, settings.STORE_POLL_INTERVAL)
+        elif r['code'] == 'failure':
+            settle(release_store, ReleaseStore.State.ReviewRejected, r['message'])
+        else:
+            backoff(release_store, now)
+        return
+    current_version = store.current_version()
+    release_store.store.current_version = current_version
+    release_store.store.version_update_time = now
+    release_store.store.save(update_fields=['current_version', 'version_update_time'])
+    if current_version == package.short_version:
+        settle(release_store, ReleaseStore.State.Released)
+    else:
+        backoff(release_store, now)
+
+def poll_batch(release_stores):
+    # Submissions to the same store app share one adapter.
+    stores = {}
+    for release_store in release_stores:
+        now = timezone.now()
+        try:
+            if release_store.store_id not in stores:
+                stores[release_store.store_id] = get_store(release_store.store)
+            store = stores[release_store.store_id]
+            if store is None:
+                settle(release_store, ReleaseStore.State.ReviewRejected, UNSUPPORTED)
+            else:
+                release_store.message = ''
+                poll(store, release_store, now)
+        except StoreError as e:
+            logger.warning('Polling submission %s failed: %s', release_store.pk, e)
+            release_store.message = str(e)[:1024]
+            backoff(release_store, now)
+        except Exception as e:
+            # Bad auth_data or an answer the adapter did not expect, the
+            # other submissions go on and this one is tried again later.
+            logger.exception('Polling submission %s failed', release_store.pk)
+            release_store.message = str(e)[:1024]
+            backoff(release_store, now)
+        release_store.save(update_fields=['state', 'message', 'poll_interval', 'next_poll_time', 'update_time'])
+
+@task(POLL, recur=True)
+def poll_stores():
+    """Poll the stores for every due submission, in batches of STORE_POLL_BATCH.
+
+    Stores are only ever called from here and from submit_stores, never from
+    a request. The job schedules itself again while submissions are in flight,
+    even when it fails.
+    """
+    try:
+        while True:
+            release_stores = claim(settings.STORE_POLL_BATCH)
+            if not release_stores:
+                break
+            poll_batch(release_stores)
+    finally:
+        when = ReleaseStore.objects.filter(state__in=IN_FLIGHT).order_by('next_poll_time').values_list('next_poll_time', flat=True).first()
+        if when is not None:
+            schedule(POLL, when)
+
+def read_version(store_app):
+    # Runs in the pool, it calls the store and leaves the database alone.
+    try:
+        return get_store(store_app).current_version()
+    except StoreError as e:
+        logger.warning('Reading the version of store app %s failed: %s', store_app.pk, e)
+        return None
+    except Exception:
+        logger.exception('Reading the version of store app %s failed', store_app.pk)
+        return None
+
+def refresh_batch(pool, store_apps):
+    versions = list(pool.map(read_version, store_apps))
+    now = timezone.now()
+    refreshed = []
+    for store_app, version in zip(store_apps, versions):
+        # A failed read keeps the last version, its time tells how old it is.
+        if version is not None:
+            store_app.current_version = version
+            store_app.version_update_time = now
+            refreshed.append(store_app)
+    StoreApp.objects.bulk_update(refreshed, ['current_version', 'version_update_time'])
+
+def refresh():
+    """Schedule a refresh of the store versions right away, for new store apps."""
+    schedule(REFRESH, timezone.now())
+
+@task(REFRESH, recur=True)
+def refresh_versions():
+    """Read current_version of every store app from its store.
+
+    Stores are called by STORE_REFRESH_WORKERS threads at most, batches of
+    STORE_REFRESH_BATCH store apps are written with one bulk update. The job
+    schedules itself again every STORE_REFRESH_INTERVAL seconds, even when it
+    fails, so lists of store apps never call the stores. runjobs starts it.
+    """
+    store_apps = StoreApp.objects.filter(store__in=list(adapters)).order_by('pk')
+    last = 0
+    try:
+        with ThreadPoolExecutor(max_workers=settings.STORE_REFRESH_WORKERS) as pool:
+            while True:
+                batch = list(store_apps.filter(pk__gt=last)[:settings.STORE_REFRESH_BATCH])
+                if not batch:
+                    break
+                refresh_batch(pool, batch)
+                last = batch[-1].pk
+    finally:
+        schedule(REFRESH, timezone.now() + timedelta(seconds=settings.STORE_REFRESH_INTERVAL))
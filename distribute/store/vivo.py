@@ -1,46 +1,65 @@
-import time, hmac, hashlib, requests
+import time, hmac, hashlib
 from django.conf import settings
+from distribute.models import StoreApp
+from distribute.store.base import StoreBase, result
+from distribute.store.client import StoreError, get_client
+from distribute.store.registry import register
 
-class VivoStore:
+# submit_result status of the task.
+TASK_PASSED = 3
+TASK_FAILED = 4
+
+def sign(secret, payload):
+    """The HMAC-SHA256 signature of ``payload``, over its items sorted by key."""
+    message = '&'.join('{0}={1}'.format(key, payload[key]) for key in sorted(payload))
+    return hmac.new(secret, message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+@register(StoreApp.StoreType.Vivo)
+class VivoStore(StoreBase):
 
     def __init__(self, auth_data):
         self.access_key = auth_data['access_key']
         self.access_secret = auth_data['access_secret']
         self.vivo_store_app_id = auth_data['vivo_store_app_id']
+        self.secret = bytes(self.access_secret, 'latin-1')
+        self.client = get_client(self.name())
 
     @classmethod
-    def name():
+    def name(cls):
         return 'vivo'
 
     @classmethod
-    def display_name():
+    def display_name(cls):
         return 'Vivo'
 
     @classmethod
-    def icon():
+    def icon(cls):
         return settings.STATIC_URL + 'store/vivo.png'
 
     @classmethod
-    def channel(self):
+    def channel(cls):
         return 'vivo'
 
-    def request(self, payload):
-        timestamp = int(time.time() * 1000)
-        request_payload = {
-            'access_key': self.access_key,
-            'timestamp': timestamp,
-            'format': 'json',
-            'v': '1.0',
-            'sign_method': 'hmac',
-            'target_app_key': 'developer',
-        }
-        request_payload.update(payload)
-        message = '&'.join(list(k+'='+str(request_payload[k]) for k in sorted(request_payload))).encode('utf-8')
-        sign = hmac.new(bytes(self.access_secret , 'latin-1'), msg=message, digestmod = hashlib.sha256)
-        request_payload['sign'] = sign.hexdigest()
-        url = 'https://developer-api.vivo.com.cn/router/rest'
-        r = requests.post(url, data=request_payload)
-        return r.json()
+    def request(self, payload, idempotent=True):
+        """Call the developer API, signed again for every attempt."""
+        def signed():
+            request_payload = {
+                'access_key': self.access_key,
+                'timestamp': int(time.time() * 1000),
+                'format': 'json',
+                'v': '1.0',
+                'sign_method': 'hmac',
+                'target_app_key': 'developer',
+            }
+            request_payload.update(payload)
+            request_payload['sign'] = sign(self.secret, request_payload)
+            return request_payload
+        return self.client.post(settings.STORE_VIVO_API_URL, signed, idempotent)
+
+    @staticmethod
+    def succeeded(r):
+        # subCode comes as a string.
+        return r.get('code') == 0 and str(r.get('subCode')) == '0'
 
     def submit(self, package):
         payload = {
@@ -52,20 +71,11 @@ class VivoStore:
             'onlineType': 1,
             'updateDesc': package.release_notes
         }
-        r = self.request(payload)
-        if r.json()['code'] == 0 and r.json()['subCode'] == 0:
-            return {
-                'error': {
-                    'code': 'success',
-                    'message': 'success'
-                }
-            }
-        return {
-            'error': {
-                'code': 'failure',
-                'message': r.json()['msg']
-            }
-        }
+        # Submitting twice would queue a second update.
+        r = self.request(payload, idempotent=False)
+        if self.succeeded(r):
+            return result('success', 'success')
+        return result('failure', r.get('msg', ''))
 
     def submit_result(self, submit_id):
         bundle_identifier = submit_id
@@ -75,21 +85,16 @@ class VivoStore:
             'packetType': 0
         }
         r = self.request(payload)
-        if r.json()['code'] == 0 and r.json()['data']['status'] == 3:
-            return {
-                'error': {
-                    'code': 'success'
-                }
-            }
-        return {
-            'error': {
-                'code': 'failure',
-                'message': r.json()['msg']
-            }
-        }
+        if not self.succeeded(r):
+            return result('failure', r.get('msg', ''))
+        data = r.get('data') or {}
+        if data.get('status') == TASK_PASSED:
+            return result('success')
+        if data.get('status') == TASK_FAILED:
+            return result('failure', data.get('errorReason', ''))
+        return result('pending')
 
     def current_version(self):
-        url = 'https://h5-api.appstore.vivo.com.cn/detailInfo'
         payload = {
             'appId': self.vivo_store_app_id,
             'imei': '1234567890',
@@ -99,9 +104,11 @@ class VivoStore:
             'h5_websource': 'h5appstore',
             'frompage': 'messageh5'
         }
-        r = requests.post(url, payload)
-        version = r.json()['version_name']
-        return version
+        r = self.client.post(settings.STORE_VIVO_DETAIL_URL, payload)
+        try:
+            return r['version_name']
+        except (KeyError, TypeError):
+            raise StoreError('vivo answered without a version')
 
 # {'code': 0, 'msg': '应用更新数据提交成功，请稍后查询结果', 'subCode': '0', 'timestamp': 1644913822356}
 # {'code': 0, 'msg': '更新版本比上架版本低，更新失败', 'subCode': '12008', 'timestamp': 1645153192647}
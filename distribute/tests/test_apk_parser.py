@@ -0,0 +1,98 @@
+import io, struct, zipfile
+from unittest import mock
+from androguard.core.bytecodes.apk import APK
+from django.test import SimpleTestCase
+from util.tests.case import sample_apk
+from distribute.app_parser.apk_parser import ApkParser, ApkManifest
+from distribute.app_parser.axml import AxmlError, StringPool, parse_manifest
+from distribute.app_parser.zip_index import ZipIndex
+
+def string_pool(strings, utf8):
+    data = b''
+    offsets = []
+    for s in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = s.encode('utf-8')
+            data += bytes([len(s), len(encoded)]) + encoded + b'\0'
+        else:
+            data += struct.pack('<H', len(s)) + s.encode('utf-16-le') + b'\0\0'
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    size = strings_start + len(data)
+    header = struct.pack('<HHIIIIII', 0x0001, header_size, size, len(strings), 0, 0x100 if utf8 else 0, strings_start, 0)
+    return header + struct.pack('<%dI' % len(strings), *offsets) + data
+
+class ApkParserTest(SimpleTestCase):
+
+    def setUp(self):
+        self.apk_path = sample_apk()
+
+    def test_same_as_androguard(self):
+        with open(self.apk_path, 'rb') as f:
+            manifest = ApkManifest(f, ZipIndex.from_file(f))
+            f.seek(0)
+            apk = APK(f.read(), raw=True)
+            for method in ['get_app_name', 'get_androidversion_code', 'get_androidversion_name', 'get_package',
+                    'get_min_sdk_version', 'get_target_sdk_version', 'get_app_icon']:
+                self.assertEqual(getattr(manifest, method)(), getattr(apk, method)(), method)
+            self.assertEqual(manifest.get_file(manifest.get_app_icon()), apk.get_file(apk.get_app_icon()))
+
+    def test_parser(self):
+        with open(self.apk_path, 'rb') as f:
+            parser = ApkParser(f)
+            self.assertIsInstance(parser.apk, ApkManifest)
+            self.assertEqual(parser.minimum_os_version, '5.0')
+            self.assertIsNotNone(parser.app_icon)
+
+    def test_fallback(self):
+        with open(self.apk_path, 'rb') as f:
+            with mock.patch('distribute.app_parser.apk_parser.ApkManifest', side_effect=AxmlError('unsupported')):
+                with self.assertLogs('distribute.app_parser.apk_parser', 'WARNING'):
+                    parser = ApkParser(f)
+            self.assertIsInstance(parser.apk, APK)
+            self.assertEqual(parser.bundle_identifier, 'com.example.sample')
+
+    def test_fallback_without_resources(self):
+        out = io.BytesIO()
+        with zipfile.ZipFile(self.apk_path) as apk, zipfile.ZipFile(out, 'w') as stripped:
+            for info in apk.infolist():
+                if info.filename != 'resources.arsc':
+                    stripped.writestr(info, apk.read(info))
+        out.seek(0)
+        with self.assertLogs('distribute.app_parser.apk_parser', 'WARNING'):
+            parser = ApkParser(out)
+        self.assertIsInstance(parser.apk, APK)
+        self.assertEqual(parser.bundle_identifier, 'com.example.sample')
+        self.assertEqual(parser.version, '7')
+        self.assertEqual(parser.short_version, '1.2.3')
+
+    def test_fallback_on_bad_deflate(self):
+        out = io.BytesIO()
+        with zipfile.ZipFile(self.apk_path) as apk, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as rewritten:
+            for info in apk.infolist():
+                rewritten.writestr(info.filename, apk.read(info))
+        entry = ZipIndex.from_file(out).entries['resources.arsc']
+        # An invalid block type right after the local header and name.
+        start = entry.header_offset + 30 + len('resources.arsc')
+        content = bytearray(out.getvalue())
+        content[start:start + 4] = b'\xff\xff\xff\xff'
+        with self.assertLogs('distribute.app_parser.apk_parser', 'WARNING'):
+            parser = ApkParser(io.BytesIO(bytes(content)))
+        self.assertIsInstance(parser.apk, APK)
+        self.assertEqual(parser.bundle_identifier, 'com.example.sample')
+
+    def test_string_pool(self):
+        strings = ['', 'manifest', 'Ünïcödé', 'x' * 100]
+        for utf8 in (True, False):
+            pool = StringPool(string_pool(strings, utf8), 0)
+            self.assertEqual(len(pool), len(strings))
+            self.assertEqual([pool[i] for i in range(len(pool))], strings)
+            with self.assertRaises(AxmlError):
+                pool[len(strings)]
+
+    def test_not_axml(self):
+        with self.assertRaises(AxmlError):
+            parse_manifest(b'<manifest package="com.example"/>')
+        with self.assertRaises(AxmlError):
+            parse_manifest(struct.pack('<HHI', 0x0003, 8, 64) + struct.pack('<HHI', 0x0001, 28, 1000))
@@ -0,0 +1,86 @@
+import os
+from unittest import mock
+from django.core.files.storage import default_storage
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from distribute.models import Blob, Package
+from job import queue
+
+class BlobTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.app.create(self.app))
+        self.assert_status_201(self.api.app.create(dict(self.app, name='other_app')))
+        self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+
+    def refcounts(self):
+        return dict(Blob.objects.values_list('name', 'refcount'))
+
+    def test_reupload_is_not_stored_again(self):
+        first = Package.objects.get(internal_build=1)
+        self.assertTrue(first.package_file.name.startswith('packages/'))
+        # Storage adds a suffix when a file of an earlier run is in the way.
+        self.assertTrue(os.path.basename(first.package_file.name).startswith(first.sha256))
+        self.assertTrue(first.package_file.name.endswith('.ipa'))
+        self.assertEqual(self.refcounts(), {first.package_file.name: 1, first.icon_file.name: 1})
+
+        with mock.patch.object(default_storage, 'save') as save:
+            r = self.api.app.upload_app('admin', 'app_name', self.ipa_path)
+        self.assert_status_202(r)
+        save.assert_not_called()
+        # Parsed already, nothing is queued.
+        self.assertEqual(r.json()['state'], 'Ready')
+        second = Package.objects.get(app__name='app_name', internal_build=2)
+        self.assertEqual(second.package_file.name, first.package_file.name)
+        self.assertEqual(second.icon_file.name, first.icon_file.name)
+        self.assertEqual(second.version, first.version)
+        self.assertEqual(self.refcounts(), {first.package_file.name: 2, first.icon_file.name: 2})
+
+        # Another app shares the bytes but parses them itself.
+        r = self.api.app.upload_app('admin', 'other_app', self.ipa_path)
+        self.assertEqual(r.json()['state'], 'Processing')
+        queue.run_pending()
+        self.assertEqual(self.refcounts(), {first.package_file.name: 3, first.icon_file.name: 3})
+
+        self.assert_status_204(self.api.app.remove_package('admin', 'app_name', 1))
+        self.assertEqual(self.refcounts(), {first.package_file.name: 2, first.icon_file.name: 2})
+        self.assertTrue(default_storage.exists(first.package_file.name))
+
+    def test_last_reference_deletes_file(self):
+        name = Package.objects.get(internal_build=1).package_file.name
+        self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assert_status_204(self.api.app.remove_package('admin', 'app_name', 1))
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assert_status_204(self.api.app.delete_app('admin', 'app_name'))
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_store_again_while_released(self):
+        name = Package.objects.get(internal_build=1).package_file.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assert_status_204(self.api.app.remove_package('admin', 'app_name', 1))
+        self.assertFalse(Blob.objects.exists())
+        # Uploaded again before the file of the released blob is deleted.
+        self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        for callback in callbacks:
+            callback()
+        package = Package.objects.get(internal_build=2)
+        self.assertNotEqual(package.package_file.name, name)
+        self.assertTrue(default_storage.exists(package.package_file.name))
+        self.assertFalse(default_storage.exists(name))
@@ -0,0 +1,104 @@
+import time
+from django.test import override_settings
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from job import queue
+
+# Every request of the test client loads the session and the user first.
+AUTH_QUERIES = 2
+
+@override_settings(PERMISSION_CACHE_TIMEOUT=300)
+class ConditionalGetTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+
+        self.org = {'name': 'org_name', 'display_name': 'org_display_name', 'visibility': 'Internal'}
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Internal',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.org.create(self.org))
+        self.assert_status_201(self.api.app.create(self.app))
+        for i in range(2):
+            self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+
+    def get(self, client, path, etag):
+        return client.client.get(client.build_url(path), HTTP_IF_NONE_MATCH=etag, HTTP_AUTHORIZATION=client.token)
+
+    def assert_not_modified(self, client, path, etag, queries):
+        with self.assertNumQueries(AUTH_QUERIES + queries):
+            r = self.get(client, path, etag)
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r['ETag'], etag)
+
+    def test_list(self):
+        path = 'users/admin/apps/app_name/distribute/packages'
+        r = self.api.app.get_package_list('admin', 'app_name')
+        self.assert_status_200(r)
+        etag = r['ETag']
+        # Deletes do not move the newest update_time, lists validate by ETag only.
+        self.assertNotIn('Last-Modified', r)
+        # Only the aggregate runs, the page is not read.
+        self.assert_not_modified(self.api.client, path, etag, 1)
+        self.assertEqual(self.get(self.api.client, path + '?top=1', etag).status_code, 200)
+
+        self.assert_status_200(self.api.app.modify_package('admin', 'app_name', 2, {'commit_id': 'abc'}))
+        r = self.get(self.api.client, path, etag)
+        self.assert_status_200(r)
+        etag = r['ETag']
+        self.assert_status_204(self.api.app.remove_package('admin', 'app_name', 1))
+        r = self.get(self.api.client, path, etag)
+        self.assert_status_200(r)
+        self.assert_list_length(r, 1)
+        since = 'Thu, 01 Jan 2099 00:00:00 GMT'
+        r = self.api.client.client.get(self.api.client.build_url(path), HTTP_IF_MODIFIED_SINCE=since, HTTP_AUTHORIZATION=self.api.client.token)
+        self.assert_status_200(r)
+
+    def test_release_list_follows_package(self):
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(self.api.app.create_release('admin', 'app_name', 'production', release))
+        path = 'users/admin/apps/app_name/distribute/releases/env/production'
+        etag = self.api.app.get_release_list('admin', 'app_name', 'production')['ETag']
+        self.assert_not_modified(self.api.client, path, etag, 1)
+        etag = self.api.app.get_release('admin', 'app_name', 1)['ETag']
+        self.assert_not_modified(self.api.client, 'users/admin/apps/app_name/distribute/releases/1', etag, 1)
+
+        time.sleep(0.001)
+        self.api.app.modify_package('admin', 'app_name', 1, {'commit_id': 'abc'})
+        self.assert_status_200(self.get(self.api.client, 'users/admin/apps/app_name/distribute/releases/1', etag))
+
+    def test_detail_depends_on_user(self):
+        viewer = ApiClient(UnitTestClient('/api/', 'viewer'))
+        r = self.api.org.get_one('org_name')
+        etag = r['ETag']
+        self.assertIn('Authorization', r['Vary'])
+        # The cached permission already holds the organization.
+        self.assert_not_modified(self.api.client, 'orgs/org_name', etag, 0)
+        self.assert_status_200(self.get(viewer.client, 'orgs/org_name', etag))
+
+        etag = viewer.app.get_list('admin')['ETag']
+        self.assert_not_modified(viewer.client, 'users/admin/apps', etag, 1)
+        time.sleep(0.001)
+        self.assert_status_201(self.api.app.add_member('admin', 'app_name', {'username': 'viewer', 'role': 'Viewer'}))
+        r = self.get(viewer.client, 'users/admin/apps', etag)
+        self.assert_status_200(r)
+        self.assertEqual(self.get_resp_list(r)[0]['role'], 'Viewer')
+
+        # The app stays listed, only its role goes away, and a newer change
+        # to the app keeps the newest time.
+        time.sleep(0.001)
+        self.assert_status_200(self.api.app.modify('admin', 'app_name', {'display_name': 'changed'}))
+        etag = self.get(viewer.client, 'users/admin/apps', etag)['ETag']
+        self.assert_status_204(self.api.app.remove_member('admin', 'app_name', 'viewer'))
+        r = self.get(viewer.client, 'users/admin/apps', etag)
+        self.assert_status_200(r)
+        self.assertNotIn('role', self.get_resp_list(r)[0])
@@ -0,0 +1,127 @@
+import time
+from django.test import override_settings
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from util.sendfile import RangeNotSatisfiable, parse_range
+from distribute.models import Package
+from distribute.downloads import signed_expiry, signed_url
+from job import queue
+
+class DownloadTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+        with open(self.ipa_path, 'rb') as f:
+            self.content = f.read()
+
+        self.org = {'name': 'org_name', 'display_name': 'org_display_name', 'visibility': 'Private'}
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.org.create(self.org))
+        self.assert_status_201(self.api.org.create_app('org_name', self.app))
+        self.assert_status_201(self.api.app.create(self.app))
+        self.assert_status_202(self.api.org.upload_app('org_name', 'app_name', self.ipa_path))
+        self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+        self.path = 'users/admin/apps/app_name/distribute/packages/1/download'
+
+    def get(self, path, client=None, **headers):
+        client = client or self.api.client
+        return client.client.get(client.build_url(path), HTTP_AUTHORIZATION=client.token, **headers)
+
+    def test_download(self):
+        r = self.get(self.path)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(b''.join(r.streaming_content), self.content)
+        self.assertEqual(r['Accept-Ranges'], 'bytes')
+        self.assertEqual(r['Content-Disposition'], 'attachment; filename="app_name_1.0.1_1.ipa"')
+
+        package = self.api.app.get_package('admin', 'app_name', 1).json()
+        self.assertEqual(package['package_file'], 'http://testserver/api/' + self.path)
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(self.api.org.create_release('org_name', 'app_name', 'production', release))
+        path = 'orgs/org_name/apps/app_name/distribute/releases/1/download'
+        self.assertEqual(self.api.org.get_release('org_name', 'app_name', 1).json()['package_file'], 'http://testserver/api/' + path)
+        r = self.get(path)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(b''.join(r.streaming_content), self.content)
+
+    def test_range(self):
+        r = self.get(self.path, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(b''.join(r.streaming_content), self.content[10:20])
+        self.assertEqual(r['Content-Range'], 'bytes 10-19/{0}'.format(len(self.content)))
+        self.assertEqual(r['Content-Length'], '10')
+
+        r = self.get(self.path, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=r['ETag'])
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(b''.join(r.streaming_content), self.content[100:])
+        # The file changed since the client started, it gets all of it.
+        r = self.get(self.path, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"other"')
+        self.assertEqual(r.status_code, 200)
+        r.close()
+        r = self.get(self.path, HTTP_RANGE='bytes={0}-'.format(len(self.content)))
+        self.assertEqual(r.status_code, 416)
+        self.assertEqual(r['Content-Range'], 'bytes */{0}'.format(len(self.content)))
+
+    @override_settings(SENDFILE_ACCEL_LOCATION='/protected/')
+    def test_accel_redirect(self):
+        r = self.get(self.path)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['X-Accel-Redirect'], '/protected/' + Package.objects.get(app__owner__username='admin').package_file.name)
+        self.assertEqual(r.content, b'')
+        self.assertEqual(r['Content-Type'], 'application/octet-stream')
+
+    def test_permission(self):
+        viewer = ApiClient(UnitTestClient('/api/', 'viewer'))
+        self.assertEqual(self.get(self.path, viewer.client).status_code, 404)
+        self.assertEqual(self.get('orgs/org_name/apps/app_name/distribute/packages/1/download', viewer.client).status_code, 404)
+        self.assertEqual(self.get('users/admin/apps/app_name/distribute/packages/2/download').status_code, 404)
+
+    def test_signed_download(self):
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(self.api.app.create_release('admin', 'app_name', 'production', release))
+        url = self.api.app.get_release('admin', 'app_name', 1).json()['download_url']
+        self.assertEqual(self.api.app.get_release('admin', 'app_name', 1).json()['download_url'], url)
+        # No session and no query.
+        with self.assertNumQueries(0):
+            r = self.client.get(url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(b''.join(r.streaming_content), self.content[:10])
+        self.assertEqual(r['Content-Disposition'], 'attachment; filename="app_name_1.0.1_1.ipa"')
+        self.assertTrue(r['Cache-Control'].startswith('public, max-age='))
+
+        token = url.rsplit('/', 1)[1]
+        self.assertEqual(self.client.get('/api/downloads/' + token[:-1] + 'x').status_code, 404)
+        self.assertEqual(self.client.get('/api/downloads/garbage').status_code, 404)
+        name = Package.objects.get(app__owner__username='admin').package_file.name
+        self.assertEqual(self.client.get(signed_url(None, name, 'a.ipa', expires=int(time.time()) - 1)).status_code, 410)
+
+    def test_signed_expiry(self):
+        with self.settings(DOWNLOAD_URL_MAX_AGE=100):
+            self.assertEqual(signed_expiry(1000), 1200)
+            self.assertEqual(signed_expiry(1099), 1200)
+            self.assertEqual(signed_expiry(1100), 1300)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-0', 10), (0, 0))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=-30', 10), (0, 9))
+        self.assertIsNone(parse_range(None, 10))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('bytes=5-1', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=10-', 10)
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=-0', 10)
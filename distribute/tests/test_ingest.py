@@ -0,0 +1,74 @@
+import io, hashlib, struct, zipfile
+from django.test import SimpleTestCase
+from util.tests.case import sample_apk, sample_ipa
+from distribute.ingest import PackageIngest
+from distribute.app_parser.zip_index import ZipIndex
+
+class PackageIngestTest(SimpleTestCase):
+
+    def setUp(self):
+        self.apk_path = sample_apk()
+        self.ipa_path = sample_ipa()
+
+    def assert_ingest(self, path):
+        with open(path, 'rb') as f:
+            content = f.read()
+            ingest = PackageIngest()
+            for i in range(0, len(content), 1000):
+                ingest.update(content[i:i + 1000])
+            self.assertEqual(ingest.size, len(content))
+            self.assertEqual(ingest.fingerprint, hashlib.md5(content).hexdigest())
+            self.assertEqual(ingest.sha256, hashlib.sha256(content).hexdigest())
+
+            index = ingest.zip_index(f)
+            with zipfile.ZipFile(path) as z:
+                self.assertEqual(set(index.names()), set(z.namelist()))
+                for name in z.namelist():
+                    self.assertEqual(index.read(f, name), z.read(name))
+            self.assertEqual(ZipIndex.from_directory(f, *index.directory).entries, index.entries)
+
+    def test_ingest_apk(self):
+        self.assert_ingest(self.apk_path)
+
+    def test_ingest_ipa(self):
+        self.assert_ingest(self.ipa_path)
+
+    def test_not_a_zip(self):
+        ingest = PackageIngest()
+        ingest.update(b'not a zip archive')
+        self.assertIsNone(ingest.zip_index(io.BytesIO(b'not a zip archive')))
+
+    def test_central_directory_larger_than_tail(self):
+        fp = io.BytesIO()
+        with zipfile.ZipFile(fp, 'w') as z:
+            for i in range(5000):
+                z.writestr('Payload/Sample.app/Assets/file_name_{0:05}.txt'.format(i), str(i))
+        ingest = PackageIngest.from_file(fp)
+        index = ingest.zip_index(fp)
+        self.assertEqual(len(index), 5000)
+        self.assertEqual(index.read(fp, 'Payload/Sample.app/Assets/file_name_04999.txt'), b'4999')
+
+    def test_zip64(self):
+        fp = io.BytesIO()
+        with zipfile.ZipFile(fp, 'w') as z:
+            for i in range(0x10000 + 1):
+                z.writestr(str(i), b'')
+        index = ZipIndex.from_file(fp)
+        self.assertEqual(len(index), 0x10000 + 1)
+
+    def assert_not_a_zip(self, content):
+        ingest = PackageIngest()
+        ingest.update(content)
+        self.assertIsNone(ingest.zip_index(io.BytesIO(content)))
+
+    def test_truncated_central_directory(self):
+        entry = b'PK\x01\x02' + b'\x00' * 10
+        eocd = b'PK\x05\x06' + struct.pack('<4xHHII2x', 1, 1, len(entry), 0)
+        self.assert_not_a_zip(entry + eocd)
+
+    def test_bad_utf8_name(self):
+        fp = io.BytesIO()
+        with zipfile.ZipFile(fp, 'w') as z:
+            z.writestr('名前.txt', b'')
+        content = fp.getvalue().replace('名前'.encode(), b'\xff\xfe\xfd\xfc\xfb\xfa')
+        self.assert_not_a_zip(content)
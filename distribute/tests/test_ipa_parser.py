@@ -0,0 +1,91 @@
+import io, plistlib, zipfile
+from django.test import SimpleTestCase
+from distribute.app_parser.ipa_parser import IpaParser
+from distribute.app_parser.zip_index import ZipIndex
+
+class RecordingIndex(ZipIndex):
+
+    def __init__(self, entries):
+        super().__init__(entries)
+        self.reads = []
+
+    def read(self, fp, name):
+        self.reads.append(name)
+        return super().read(fp, name)
+
+def make_ipa(info, icons, extra_files=0):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('Payload/Sample.app/Info.plist', plistlib.dumps(info, fmt=plistlib.FMT_BINARY))
+        for name, content in icons.items():
+            z.writestr('Payload/Sample.app/' + name, content)
+        for i in range(extra_files):
+            z.writestr('Payload/Sample.app/Assets/file{0}.png'.format(i), b'')
+    buf.seek(0)
+    return buf
+
+class IpaParserTest(SimpleTestCase):
+
+    info = {
+        'CFBundleDisplayName': 'Sample',
+        'CFBundleIdentifier': 'com.example.sample',
+        'CFBundleVersion': '42',
+        'CFBundleShortVersionString': '1.0.1',
+        'MinimumOSVersion': '12.0',
+    }
+
+    def parse(self, fp):
+        index = ZipIndex.from_file(fp)
+        index = RecordingIndex(index.entries)
+        return IpaParser(fp, index), index
+
+    def test_bundle_icons(self):
+        info = dict(self.info, CFBundleIcons={'CFBundlePrimaryIcon': {'CFBundleIconFiles': ['AppIcon20x20', 'AppIcon60x60']}})
+        icons = {
+            'AppIcon20x20@3x.png': b'60',
+            'AppIcon60x60@2x.png': b'120',
+            'AppIcon60x60@3x.png': b'180',
+            'AppIcon76x76@2x~ipad.png': b'ipad',
+            'Unrelated1024x1024.png': b'unrelated',
+        }
+        parser, index = self.parse(make_ipa(info, icons, extra_files=30000))
+        self.assertEqual(parser.display_name, 'Sample')
+        self.assertEqual(parser.bundle_identifier, 'com.example.sample')
+        self.assertEqual(parser.version, '42')
+        self.assertEqual(parser.short_version, '1.0.1')
+        self.assertEqual(parser.minimum_os_version, '12.0')
+        self.assertEqual(parser.app_icon, b'180')
+        self.assertEqual(parser.app_icon, b'180')
+        # Info.plist is decoded once and only the chosen icon is read.
+        self.assertEqual(index.reads, ['Payload/Sample.app/Info.plist', 'Payload/Sample.app/AppIcon60x60@3x.png'])
+
+    def test_ipad_icons(self):
+        info = dict(self.info, **{'CFBundleIcons~ipad': {'CFBundlePrimaryIcon': {'CFBundleIconFiles': ['AppIcon76x76', 'AppIcon83.5x83.5']}}})
+        icons = {
+            'AppIcon76x76@2x~ipad.png': b'152',
+            'AppIcon83.5x83.5@2x~ipad.png': b'167',
+        }
+        parser, _ = self.parse(make_ipa(info, icons))
+        self.assertEqual(parser.app_icon, b'167')
+
+    def test_largest_icon_fallback(self):
+        icons = {
+            'Icon.png': b'57',
+            'AppIcon40x40@2x.png': b'80',
+            'AppIcon60x60@2x.png': b'120',
+            'Assets/Large1024x1024.png': b'not at the top of the bundle',
+        }
+        parser, _ = self.parse(make_ipa(self.info, icons))
+        self.assertEqual(parser.app_icon, b'120')
+
+    def test_no_icon(self):
+        parser, _ = self.parse(make_ipa(self.info, {}))
+        self.assertIsNone(parser.app_icon)
+        self.assertEqual(parser.display_name, 'Sample')
+
+    def test_no_bundle(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as z:
+            z.writestr('Payload/readme.txt', b'')
+        with self.assertRaises(ValueError):
+            self.parse(buf)
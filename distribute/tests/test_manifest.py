@@ -0,0 +1,90 @@
+import plistlib
+from urllib.parse import parse_qs, urlparse
+from django.core.cache import cache
+from django.test import override_settings
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from application.models import Application
+from distribute.models import Package
+from job import queue
+
+@override_settings(MANIFEST_CACHE=True)
+class ManifestTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.app.create(self.app))
+        self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+        self.package = self.api.app.get_package('admin', 'app_name', 1).json()
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        r = self.api.app.create_release('admin', 'app_name', 'production', release)
+        self.assert_status_201(r)
+        install_url = r.json()['install_url']
+        self.assertTrue(install_url.startswith('itms-services://?action=download-manifest&url='))
+        self.url = parse_qs(urlparse(install_url).query)['url'][0]
+
+    def test_manifest(self):
+        # Built with the release, the device hit reads the cache only.
+        with self.assertNumQueries(0):
+            r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'application/xml')
+        item = plistlib.loads(r.content)['items'][0]
+        self.assertEqual(item['metadata'], {
+            'bundle-identifier': self.package['bundle_identifier'],
+            'bundle-version': self.package['short_version'],
+            'kind': 'software',
+            'title': self.package['name'],
+        })
+        assets = {asset['kind']: asset['url'] for asset in item['assets']}
+        self.assertEqual(assets['display-image'], self.package['icon_file'])
+        self.assertEqual(self.client.get(assets['software-package']).status_code, 200)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).content, r.content)
+
+    def test_invalidated_on_update(self):
+        Package.objects.update(short_version='9.9')
+        self.assertEqual(plistlib.loads(self.client.get(self.url).content)['items'][0]['metadata']['bundle-version'], self.package['short_version'])
+        self.assert_status_200(self.api.app.modify_release('admin', 'app_name', 1, {'release_notes': 'changed'}))
+        self.assertEqual(plistlib.loads(self.client.get(self.url).content)['items'][0]['metadata']['bundle-version'], '9.9')
+
+        self.assert_status_204(self.api.app.remove_release('admin', 'app_name', 1))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_disabled_release(self):
+        self.assert_status_200(self.api.app.modify_release('admin', 'app_name', 1, {'enabled': False}))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assert_status_200(self.api.app.modify_release('admin', 'app_name', 1, {'enabled': True}))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(MANIFEST_CACHE=False)
+    def test_process_local_cache(self):
+        # Another process changing the release could not invalidate the entry.
+        Package.objects.update(short_version='9.9')
+        with self.assertNumQueries(1):
+            r = self.client.get(self.url)
+        self.assertEqual(plistlib.loads(r.content)['items'][0]['metadata']['bundle-version'], '9.9')
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get(self.url[:-1] + 'x').status_code, 404)
+
+    def test_only_ios_has_install_url(self):
+        self.assertIn('install_url', self.api.app.get_release('admin', 'app_name', 1).json())
+        Application.objects.update(os=Application.OperatingSystem.Android)
+        self.assertNotIn('install_url', self.api.app.get_release('admin', 'app_name', 1).json())
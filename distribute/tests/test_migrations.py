@@ -0,0 +1,70 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+class LookupConstraintsMigrationTest(TransactionTestCase):
+
+    before = [('distribute', '0004_package_state')]
+    after = [('distribute', '0005_lookup_constraints')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_renumbered(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Application = apps.get_model('application', 'Application')
+        Package = apps.get_model('distribute', 'Package')
+        Release = apps.get_model('distribute', 'Release')
+        ReleaseDeploymentKey = apps.get_model('distribute', 'ReleaseDeploymentKey')
+        owner = User.objects.create(username='admin')
+        app = Application.objects.create(owner=owner, name='app_name', display_name='app_name', release_type=1, os=2, platform=2)
+        other = Application.objects.create(owner=owner, name='other', display_name='other', release_type=1, os=2, platform=2)
+        # count() + 1 after a delete: 1, 2, 3, delete 1, 3 again.
+        packages = [Package.objects.create(app=app, internal_build=internal_build, size=0, fingerprint='x') for internal_build in [2, 3, 3, 3]]
+        Package.objects.create(app=other, internal_build=3, size=0, fingerprint='x')
+        deployment = ReleaseDeploymentKey.objects.create(app=app, name='production')
+        releases = [Release.objects.create(app=app, deployment=deployment, package=packages[0], release_id=1) for i in range(2)]
+
+        apps = self.migrate(self.after)
+        Package = apps.get_model('distribute', 'Package')
+        Release = apps.get_model('distribute', 'Release')
+        self.assertEqual([Package.objects.get(pk=p.pk).internal_build for p in packages], [2, 3, 4, 5])
+        self.assertEqual(Package.objects.get(app_id=other.pk).internal_build, 3)
+        self.assertEqual([Release.objects.get(pk=r.pk).release_id for r in releases], [1, 2])
+
+    def test_duplicate_members_merged(self):
+        apps = self.migrate([('application', '0001_initial'), ('organization', '0001_initial')])
+        User = apps.get_model('auth', 'User')
+        Application = apps.get_model('application', 'Application')
+        ApplicationUser = apps.get_model('application', 'ApplicationUser')
+        Organization = apps.get_model('organization', 'Organization')
+        OrganizationUser = apps.get_model('organization', 'OrganizationUser')
+        owner = User.objects.create(username='admin')
+        app = Application.objects.create(owner=owner, name='app_name', display_name='app_name', release_type=1, os=2, platform=2)
+        app_users = [ApplicationUser.objects.create(app=app, user=owner, role=role) for role in [2, 1, 1]]
+        org = Organization.objects.create(name='org_name', display_name='org_name', description='', visibility=1)
+        org_users = [OrganizationUser.objects.create(org=org, user=owner, role=role) for role in [3, 1]]
+
+        apps = self.migrate([('application', '0002_app_constraints'), ('organization', '0002_member_constraints')])
+        self.assertEqual(list(apps.get_model('application', 'ApplicationUser').objects.values_list('pk', flat=True)), [app_users[1].pk])
+        self.assertEqual(list(apps.get_model('organization', 'OrganizationUser').objects.values_list('pk', flat=True)), [org_users[1].pk])
+
+    def test_duplicate_apps_stop_migration(self):
+        apps = self.migrate([('application', '0001_initial')])
+        User = apps.get_model('auth', 'User')
+        Application = apps.get_model('application', 'Application')
+        owner = User.objects.create(username='admin')
+        for i in range(2):
+            Application.objects.create(owner=owner, name='app_name', display_name='app_name', release_type=1, os=2, platform=2)
+
+        with self.assertRaisesMessage(RuntimeError, 'owner {0}: app_name'.format(owner.pk)):
+            self.migrate([('application', '0002_app_constraints')])
+        Application.objects.filter(pk=Application.objects.order_by('pk').last().pk).delete()
@@ -0,0 +1,165 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.test import RequestFactory, override_settings
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from util import permission
+from job import queue
+
+# Every request of the test client loads the session and the user first.
+AUTH_QUERIES = 2
+
+# One test process, the process-local cache is shared by all its requests.
+@override_settings(PERMISSION_CACHE_TIMEOUT=300)
+class PermissionQueryTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+
+        self.ipa_path = self.sample_ipa()
+
+        self.org = {'name': 'org_name', 'display_name': 'org_display_name', 'visibility': 'Private'}
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.client.org.create(self.org))
+        self.assert_status_201(self.client.org.create_app('org_name', self.app))
+        self.assert_status_201(self.client.app.create(self.app))
+        self.assert_status_202(self.client.org.upload_app('org_name', 'app_name', self.ipa_path))
+        self.assert_status_202(self.client.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+
+    def assert_queries(self, num, func):
+        with self.assertNumQueries(AUTH_QUERIES + num):
+            r = func()
+        self.assertLess(r.status_code, 300, r.status_code)
+
+    def test_org_endpoints(self):
+        client = self.client.org
+        # Only the first request loads the permission, the others hit the cache.
+        self.assert_queries(1, lambda: client.get_one('org_name'))
+        self.assert_queries(1, lambda: client.get_app('org_name', 'app_name'))
+        # The ETag aggregate and the page.
+        self.assert_queries(2, lambda: client.get_package_list('org_name', 'app_name'))
+        self.assert_queries(1, lambda: client.get_package('org_name', 'app_name', 1))
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(client.create_release('org_name', 'app_name', 'production', release))
+        # The release_id counter exists now: a savepoint around its UPDATE and
+        # SELECT. Refreshing LatestRelease adds 5 more.
+        self.assert_queries(13, lambda: client.create_release('org_name', 'app_name', 'production', release))
+        self.assert_queries(1, lambda: client.get_release('org_name', 'app_name', 1))
+
+    def test_user_app_endpoints(self):
+        client = self.client.app
+        self.assert_queries(1, lambda: client.get_one('admin', 'app_name'))
+        self.assert_queries(2, lambda: client.get_package_list('admin', 'app_name'))
+        self.assert_queries(1, lambda: client.get_package('admin', 'app_name', 1))
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(client.create_release('admin', 'app_name', 'production', release))
+        self.assert_queries(12, lambda: client.create_release('admin', 'app_name', 'production', release))
+        self.assert_queries(1, lambda: client.get_release('admin', 'app_name', 1))
+
+    def test_list_queries_do_not_grow(self):
+        client = self.client.app
+        release = {'release_notes': 'release_notes', 'internal_build': 1, 'enabled': True}
+        self.assert_status_201(client.create_release('admin', 'app_name', 'production', release))
+        self.assert_queries(2, lambda: client.get_package_list('admin', 'app_name'))
+        self.assert_queries(2, lambda: client.get_release_list('admin', 'app_name', 'production'))
+
+        for i in range(3):
+            self.assert_status_202(client.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+        for i in range(3):
+            self.assert_status_201(client.create_release('admin', 'app_name', 'production', release))
+        r = client.get_release_list('admin', 'app_name', 'production')
+        self.assert_list_length(r, 4)
+        self.assertTrue(self.get_resp_list(r)[0]['package_file'].startswith('http://testserver/'))
+        self.assert_queries(2, lambda: client.get_package_list('admin', 'app_name'))
+        self.assert_queries(2, lambda: client.get_release_list('admin', 'app_name', 'production'))
+
+    def test_cache_invalidation(self):
+        viewer = ApiClient(UnitTestClient('/api/', 'viewer'))
+        self.assert_status_404(viewer.org.get_one('org_name'))
+        stats = permission.cache_stats()
+        self.assert_status_404(viewer.org.get_one('org_name'))
+        self.assertEqual(permission.cache_stats()['hits'], stats['hits'] + 1)
+
+        r = self.client.org.add_member('org_name', {'username': 'viewer', 'role': 'Member'})
+        self.assert_status_201(r)
+        stats = permission.cache_stats()
+        r = viewer.org.get_one('org_name')
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['role'], 'Member')
+        self.assertEqual(permission.cache_stats()['misses'], stats['misses'] + 1)
+        self.assert_status_403(viewer.org.create_app('org_name', dict(self.app, name='app_name_2')))
+
+        self.assert_status_200(self.client.org.change_member_role('org_name', 'viewer', 'Admin'))
+        self.assert_status_201(viewer.org.create_app('org_name', dict(self.app, name='app_name_2')))
+
+        self.assert_status_204(self.client.org.remove_member('org_name', 'viewer'))
+        self.assert_status_404(viewer.org.get_one('org_name'))
+
+    @override_settings(PERMISSION_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        viewer = ApiClient(UnitTestClient('/api/', 'viewer'))
+        stats = permission.cache_stats()
+        self.assert_status_404(viewer.org.get_one('org_name'))
+        self.assert_status_404(viewer.org.get_one('org_name'))
+        self.assertEqual(permission.cache_stats(), stats)
+
+    def test_cache_metrics(self):
+        self.assert_status_200(self.client.org.get_one('org_name'))
+        self.assert_status_200(self.client.org.get_one('org_name'))
+        client = self.client.client.client
+        self.assertEqual(client.get('/api/metrics/cache').status_code, 403)
+        User.objects.filter(username='admin').update(is_staff=True)
+        r = client.get('/api/metrics/cache')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()['enabled'])
+        self.assertGreater(r.json()['hits'], 0)
+        self.assertGreater(r.json()['hit_ratio'], 0)
+
+    def test_memoized_per_request(self):
+        cache.clear()
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(username='admin')
+        with self.assertNumQueries(2):
+            user_org = permission.check_org_view_permission(request, 'org_name')
+            self.assertEqual(permission.check_org_admin_permission(request, 'org_name'), user_org)
+            app = permission.get_org_app(request, user_org.org, 'app_name')
+            self.assertIs(permission.get_org_app(request, user_org.org, 'app_name'), app)
+        with self.assertNumQueries(1):
+            user_app = permission.check_app_view_permission(request, 'admin', 'app_name')
+            self.assertEqual(permission.check_app_manager_permission(request, 'admin', 'app_name'), user_app)
+
+    def test_denied(self):
+        viewer = User.objects.create(username='viewer')
+        request = RequestFactory().get('/')
+        request.user = viewer
+        with self.assertRaises(Http404):
+            permission.check_org_view_permission(request, 'org_name')
+        with self.assertRaises(Http404):
+            permission.check_org_admin_permission(request, 'org_name')
+        with self.assertRaises(Http404):
+            permission.check_app_view_permission(request, 'admin', 'missing')
+
+        self.client.app.modify('admin', 'app_name', {'visibility': 'Internal'})
+        request = RequestFactory().get('/')
+        request.user = viewer
+        self.assertIsNone(permission.check_app_view_permission(request, 'admin', 'app_name').role)
+        with self.assertRaises(PermissionDenied):
+            permission.check_app_upload_permission(request, 'admin', 'app_name')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        with self.assertRaises(Http404):
+            permission.check_app_view_permission(request, 'admin', 'app_name')
@@ -0,0 +1,47 @@
+import re
+from django.db import connection
+from django.test import TestCase
+from application.models import Application, ApplicationUser
+from organization.models import OrganizationUser
+from distribute.models import Package, Release, ReleaseDeploymentKey
+
+# SQLite reports full table scans as "SCAN table", PostgreSQL as "Seq Scan".
+table_scan = re.compile(r'\bSCAN\b|Seq Scan')
+
+class QueryPlanTest(TestCase):
+    """The lookups every request makes must be served by an index.
+
+    The test tables are nearly empty, so PostgreSQL is told to avoid
+    sequential scans whenever it can; a lookup only falls back to one when no
+    index matches it.
+    """
+
+    hot_lookups = {
+        'package by build': lambda: Package.objects.filter(app_id=1, internal_build=1),
+        'release by id': lambda: Release.objects.filter(app_id=1, release_id=1),
+        'releases of an environment': lambda: Release.objects.filter(app_id=1, deployment__name='production').order_by('release_id'),
+        'user app by name': lambda: Application.objects.filter(owner__username='owner', name='app'),
+        'org app by name': lambda: Application.objects.filter(org__name='org', name='app'),
+        'app member': lambda: ApplicationUser.objects.filter(app_id=1, user_id=1),
+        'org member': lambda: OrganizationUser.objects.filter(org_id=1, user_id=1),
+        'deployment by key': lambda: ReleaseDeploymentKey.objects.filter(key='5e4f9f3a-2f0b-4c53-9d6e-6f1c2c3a4b5d'),
+        'deployment by name': lambda: ReleaseDeploymentKey.objects.filter(app_id=1, name='production'),
+    }
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def test_hot_lookups_use_indexes(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('query plans are only checked on SQLite and PostgreSQL')
+        for name, lookup in self.hot_lookups.items():
+            with self.subTest(name):
+                plan = lookup().explain()
+                self.assertIsNone(table_scan.search(plan), plan)
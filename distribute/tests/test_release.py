@@ -1,7 +1,7 @@
-import requests, shutil, os
 from util.tests.client import ApiClient
 from util.tests.unit_test_client import UnitTestClient
 from util.tests.case import BaseTestCase
+from job import queue
 
 class ReleaseTest(BaseTestCase):
 
@@ -10,20 +10,8 @@ class ReleaseTest(BaseTestCase):
         self.client: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
         self.org_index = 0
         self.app_index = 0
-        if not os.path.exists('downloads'):
-            os.makedirs('downloads')
-        self.apk_path = 'downloads/android-sample.apk'
-        if not os.path.exists(self.apk_path):
-            url = 'https://raw.githubusercontent.com/bitbar/test-samples/master/apps/android/bitbar-sample-app.apk'
-            with requests.get(url, stream=True) as r:
-                with open(self.apk_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
-        self.ipa_path = 'downloads/ios-sample.ipa'
-        if not os.path.exists(self.ipa_path):
-            url = 'https://raw.githubusercontent.com/bitbar/test-samples/master/apps/ios/bitbar-ios-sample.ipa'
-            with requests.get(url, stream=True) as r:
-                with open(self.ipa_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
+        self.apk_path = self.sample_apk()
+        self.ipa_path = self.sample_ipa()
 
     def generate_org(self):
         self.org_index += 1
@@ -70,7 +58,7 @@ class ReleaseTest(BaseTestCase):
         self.assert_status_201(r)
 
         r = self.client.org.upload_app(org_name, app_name, self.ipa_path)
-        self.assert_status_201(r)
+        self.assert_status_202(r)
         internal_build = r.json()['internal_build']
 
         release = {
@@ -79,6 +67,10 @@ class ReleaseTest(BaseTestCase):
             'enabled': True
         }
         env = 'production'
+        # the package can not be released until it has been parsed
+        r = self.client.org.create_release(org_name, app_name, env, release)
+        self.assert_status_409(r)
+        queue.run_pending()
         r = self.client.org.create_release(org_name, app_name, env, release)
         self.assert_status_201(r)
         release_id = r.json()['release_id']
@@ -109,7 +101,7 @@ class ReleaseTest(BaseTestCase):
         self.assert_status_201(r)
 
         r = self.client.app.upload_app(ownername, app_name, self.ipa_path)
-        self.assert_status_201(r)
+        self.assert_status_202(r)
         internal_build = r.json()['internal_build']
 
         release = {
@@ -118,6 +110,10 @@ class ReleaseTest(BaseTestCase):
             'enabled': True
         }
         env = 'production'
+        # the package can not be released until it has been parsed
+        r = self.client.app.create_release(ownername, app_name, env, release)
+        self.assert_status_409(r)
+        queue.run_pending()
         r = self.client.app.create_release(ownername, app_name, env, release)
         self.assert_status_201(r)
         release_id = r.json()['release_id']
@@ -139,3 +135,46 @@ class ReleaseTest(BaseTestCase):
         self.assert_status_204(r)
         r = self.client.app.get_release(ownername, app_name, release_id)
         self.assert_status_404(r)
+
+    def test_package_and_release_list(self):
+        app = self.generate_ios_app()
+        ownername = 'admin'
+        app_name = app['name']
+        self.assert_status_201(self.client.app.create(app))
+        for i in range(5):
+            self.assert_status_202(self.client.app.upload_app(ownername, app_name, self.ipa_path))
+        queue.run_pending()
+        self.client.app.modify_package(ownername, app_name, 4, {'commit_id': 'abc'})
+        for internal_build in [2, 3, 5]:
+            release = {'release_notes': 'release_notes', 'internal_build': internal_build, 'enabled': internal_build != 3}
+            self.assert_status_201(self.client.app.create_release(ownername, app_name, 'production', release))
+
+        builds = []
+        query = {'top': 2, 'sort': '-internal_build', 'count': 'true'}
+        while True:
+            r = self.client.app.get_package_list(ownername, app_name, query)
+            self.assert_status_200(r)
+            self.assertEqual(r.json()['count'], 5)
+            builds += [package['internal_build'] for package in self.get_resp_list(r)]
+            if 'cursor' not in r.json():
+                break
+            query['cursor'] = r.json()['cursor']
+        self.assertEqual(builds, [5, 4, 3, 2, 1])
+
+        r = self.client.app.get_package_list(ownername, app_name, {'filter': "commit_id eq 'abc' and state eq 'Ready'"})
+        self.assertEqual([package['internal_build'] for package in self.get_resp_list(r)], [4])
+        r = self.client.app.get_package_list(ownername, app_name, {'filter': "internal_build ge '4'"})
+        self.assertEqual([package['internal_build'] for package in self.get_resp_list(r)], [4, 5])
+        for invalid in ["internal_build eq 'abc'", "update_time gt 'garbage'", 'create_time lt 1.5']:
+            r = self.client.app.get_package_list(ownername, app_name, {'filter': invalid})
+            self.assert_status_400(r)
+
+        r = self.client.app.get_release_list(ownername, app_name, 'production', {'filter': 'enabled eq true', 'sort': 'internal_build desc'})
+        self.assert_status_200(r)
+        self.assertEqual([release['internal_build'] for release in self.get_resp_list(r)], [5, 2])
+        r = self.client.app.get_release_list(ownername, app_name, 'production', {'filter': 'internal_build ge 3'})
+        self.assertEqual([release['release_id'] for release in self.get_resp_list(r)], [2, 3])
+        r = self.client.app.get_release_list(ownername, app_name, 'staging')
+        self.assert_list_length(r, 0)
+        r = self.client.app.get_release_list(ownername, app_name, 'production', {'filter': 'enabled eq maybe'})
+        self.assert_status_400(r)
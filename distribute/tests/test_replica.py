@@ -0,0 +1,105 @@
+import copy, os, subprocess, sys
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from util import replica
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # A replica that is always in sync: the test database under another alias.
+        connection = copy.copy(connections['default'])
+        connection.alias = 'replica'
+        connections['replica'] = connection
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'JavaKotlin',
+            'visibility': 'Public',
+            'os': 'Android'
+        }
+        self.assert_status_201(self.api.app.create(self.app))
+        # The create made the admin stick to the primary, start afresh.
+        self.api.client.client.cookies.pop(replica.STICKY_COOKIE)
+        self.reset()
+
+    def tearDown(self):
+        del connections['replica']
+
+    def reset(self):
+        cache.clear()
+        self.reset_counts()
+
+    def reset_counts(self):
+        replica.queries.clear()
+
+    def test_get_reads_replica(self):
+        self.assert_status_200(self.api.app.get_package_list('admin', 'app_name'))
+        self.assertGreater(replica.queries['replica'], 0)
+        # Only the permission, a lagging replica could still grant a revoked one.
+        self.assertEqual(replica.queries['default'], 1)
+
+    @override_settings(PERMISSION_CACHE_TIMEOUT=300)
+    def test_cached_permission_from_primary(self):
+        self.assert_status_200(self.api.app.get_package_list('admin', 'app_name'))
+        self.assertEqual(replica.queries['default'], 1)
+        self.reset_counts()
+        self.assert_status_200(self.api.app.get_package_list('admin', 'app_name'))
+        self.assertEqual(replica.queries['default'], 0)
+
+    def test_needs_shared_cache(self):
+        env = dict(os.environ, APPCENTER_SETTINGS_DATABASE_REPLICA_URLS='sqlite:///replica.sqlite3', APPCENTER_SETTINGS_CACHE_URL='locmem://')
+        code = 'import django; django.setup()'
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Read replicas need a shared cache', result.stdout)
+        env['APPCENTER_SETTINGS_CACHE_URL'] = 'redis://localhost:6379/0'
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+    def test_read_your_writes(self):
+        self.assert_status_200(self.api.app.modify('admin', 'app_name', {'display_name': 'changed'}))
+        writes = replica.queries['default']
+        self.assertGreater(writes, 0)
+        self.assertIn(replica.STICKY_COOKIE, self.api.client.client.cookies)
+
+        # The writer reads from the primary for a while, by cookie or by cache.
+        self.assertEqual(self.api.app.get_one('admin', 'app_name').json()['display_name'], 'changed')
+        self.assertEqual(replica.queries['replica'], 0)
+        self.api.client.client.cookies.pop(replica.STICKY_COOKIE)
+        self.assert_status_200(self.api.app.get_one('admin', 'app_name'))
+        self.assertEqual(replica.queries['replica'], 0)
+
+        # Other clients are not held back.
+        viewer = ApiClient(UnitTestClient('/api/', 'viewer'))
+        self.assert_status_200(viewer.app.get_one('admin', 'app_name'))
+        self.assertGreater(replica.queries['replica'], 0)
+
+    def test_other_apps_use_primary(self):
+        self.assert_status_200(self.api.user.me())
+        self.assertEqual(replica.queries['replica'], 0)
+
+    def test_metrics(self):
+        self.assert_status_200(self.api.app.get_package_list('admin', 'app_name'))
+        client = self.api.client
+        self.assertEqual(client.client.get('/api/metrics/database').status_code, 403)
+        User.objects.filter(username='admin').update(is_staff=True)
+        r = client.client.get('/api/metrics/database')
+        self.assertEqual(r.status_code, 200)
+        self.assertGreater(r.json()['queries']['replica'], 0)
+        self.assertGreater(r.json()['replica_ratio'], 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assert_status_200(self.api.app.get_package_list('admin', 'app_name'))
+        self.assertEqual(replica.queries['replica'], 0)
+        self.assertGreater(replica.queries['default'], 0)
@@ -0,0 +1,81 @@
+from django.test import RequestFactory
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from util.choice import ChoiceField
+from distribute.models import Package, Release
+from distribute.serializers import PackageSerializer, ReleaseSerializer, package_rows, release_rows
+from job import queue
+
+class RowSerializerTest(BaseTestCase):
+    """The values() fast path renders the same bytes as the serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.app.create(self.app))
+        for i in range(3):
+            self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+        Package.objects.filter(internal_build=2).update(icon_file='', description='描述 "quoted"', commit_id='')
+        for internal_build in (1, 2, 3):
+            release = {'release_notes': 'notes {0}'.format(internal_build), 'internal_build': internal_build, 'enabled': internal_build != 2}
+            self.assert_status_201(self.api.app.create_release('admin', 'app_name', 'production', release))
+        Package.objects.filter(internal_build=3).update(state=Package.State.Processing, package_file='dir/a b.ipa')
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/api/users/admin/apps/app_name/distribute/packages')
+        return request
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def golden(self, serializer, queryset):
+        request = self.request()
+        return self.render(serializer(queryset, many=True, context={'request': request}).data)
+
+    def test_package_rows(self):
+        packages = Package.objects.order_by('internal_build')
+        expected = self.golden(PackageSerializer, packages)
+        request = self.request()
+        self.assertEqual(self.render(package_rows.compile(request)(packages.values(*package_rows.columns))), expected)
+
+        r = self.api.app.get_package_list('admin', 'app_name')
+        self.assert_status_200(r)
+        self.assertEqual(self.render(r.json()['value']), expected)
+
+    def test_release_rows(self):
+        releases = Release.objects.select_related('package').order_by('release_id')
+        expected = self.golden(ReleaseSerializer, releases)
+        request = self.request()
+        self.assertEqual(self.render(release_rows.compile(request)(releases.values(*release_rows.columns))), expected)
+
+        r = self.api.app.get_release_list('admin', 'app_name', 'production')
+        self.assert_status_200(r)
+        self.assertEqual(self.render(r.json()['value']), expected)
+
+    def test_pages_and_sort(self):
+        r = self.api.app.get_release_list('admin', 'app_name', 'production', query={'top': 2, 'sort': 'version desc'})
+        self.assert_list_length(r, 2)
+        r = self.api.app.get_release_list('admin', 'app_name', 'production', query={'top': 2, 'sort': 'version desc', 'cursor': r.json()['cursor']})
+        self.assert_list_length(r, 1)
+
+    def test_choice_labels(self):
+        field = ChoiceField(choices=Package.State.choices)
+        self.assertEqual(field.to_internal_value('Processing'), Package.State.Processing)
+        for data in ('Unknown', 1, ['Ready'], {}):
+            with self.assertRaises(Exception):
+                field.to_internal_value(data)
@@ -0,0 +1,87 @@
+import os, subprocess, sys, tempfile, threading
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from application.models import Application
+from distribute.models import AppSequence, Package
+from distribute import sequence
+
+def create_app(name='app_name'):
+    owner, _ = User.objects.get_or_create(username='admin')
+    return Application.objects.create(owner=owner, name=name, display_name=name, release_type=1, os=2, platform=2)
+
+class SequenceTest(TestCase):
+
+    def test_consecutive_per_app(self):
+        app1 = create_app('app1')
+        app2 = create_app('app2')
+        self.assertEqual([sequence.next_internal_build(app1) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(sequence.next_internal_build(app2), 1)
+        self.assertEqual(sequence.next_release_id(app1), 1)
+
+    def test_continues_after_existing_rows(self):
+        app = create_app()
+        for internal_build in [1, 2, 5]:
+            Package.objects.create(app=app, internal_build=internal_build, size=0, fingerprint='x')
+        self.assertEqual(sequence.next_internal_build(app), 6)
+        # Deleting the latest package does not hand its number out again.
+        Package.objects.filter(internal_build=5).delete()
+        self.assertEqual(sequence.next_internal_build(app), 7)
+
+    def test_two_statements_once_created(self):
+        app = create_app()
+        sequence.next_internal_build(app)
+        # the UPDATE and the SELECT of the new value, plus the savepoint and its release
+        with self.assertNumQueries(4):
+            self.assertEqual(sequence.next_internal_build(app), 2)
+
+class ConcurrentSequenceTest(TransactionTestCase):
+
+    threads = 8
+    per_thread = 25
+
+    def test_parallel_allocations_are_unique(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Shared-cache in-memory databases fail on lock conflicts instead
+            # of waiting for them, SqliteFileSequenceTest runs this on a file.
+            self.skipTest('set APPCENTER_SETTINGS_TEST_DATABASE_NAME to run on a SQLite file')
+        app = create_app()
+        values = []
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def allocate():
+            try:
+                barrier.wait()
+                for _ in range(self.per_thread):
+                    with transaction.atomic():
+                        values.append(sequence.next_internal_build(app))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=allocate) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        total = self.threads * self.per_thread
+        self.assertEqual(sorted(values), list(range(1, total + 1)))
+        self.assertEqual(AppSequence.objects.get(app=app, name='internal_build').value, total)
+
+class SqliteFileSequenceTest(SimpleTestCase):
+    """Run ConcurrentSequenceTest on a SQLite file when the suite runs in memory."""
+
+    def test_parallel_allocations_on_file(self):
+        if connection.vendor != 'sqlite' or not connection.is_in_memory_db():
+            self.skipTest('ConcurrentSequenceTest runs on this database')
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, APPCENTER_SETTINGS_TEST_DATABASE_NAME=os.path.join(directory, 'test.sqlite3'))
+            test = ConcurrentSequenceTest.__module__ + '.' + ConcurrentSequenceTest.__name__
+            result = subprocess.run([sys.executable, 'manage.py', 'test', test, '--noinput'],
+                cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertNotIn('skipped', result.stdout)
@@ -0,0 +1,137 @@
+import requests
+from unittest import mock
+from urllib3.exceptions import ProtocolError
+from django.test import SimpleTestCase, override_settings
+from distribute.store.base import AppPackage
+from distribute.store.client import RateLimiter, StoreClient, StoreError, reset_clients
+from distribute.store.vivo import VivoStore, sign
+from distribute.tests.vivo_server import VivoServer
+
+AUTH_DATA = {'access_key': 'key', 'access_secret': 'secret', 'vivo_store_app_id': '42'}
+
+class VivoStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = VivoServer(b'secret').__enter__()
+        self.settings = override_settings(
+            STORE_CLIENT_DEFAULTS={'timeout': (1, 5), 'retries': 2, 'backoff': 0},
+            STORE_CLIENTS={},
+            STORE_VIVO_API_URL=self.server.url + '/router/rest',
+            STORE_VIVO_DETAIL_URL=self.server.url + '/detailInfo')
+        self.settings.enable()
+        reset_clients()
+        self.store = VivoStore(AUTH_DATA)
+        self.package = AppPackage()
+        self.package.package_download_url = 'https://example.com/app.apk'
+        self.package.bundle_identifier = 'com.example.app'
+        self.package.version = 10
+        self.package.fingerprint = 'abc'
+        self.package.release_notes = 'notes'
+
+    def tearDown(self):
+        reset_clients()
+        self.settings.disable()
+        self.server.__exit__()
+
+    def test_submit_and_result(self):
+        self.assertEqual(self.store.submit(self.package)['error']['code'], 'success')
+        path, payload = self.server.requests[0]
+        self.assertEqual(payload['apkUrl'], 'https://example.com/app.apk')
+        self.assertEqual(self.store.submit_result('com.example.app')['error']['code'], 'pending')
+        self.server.tasks['com.example.app'] = 3
+        self.assertEqual(self.store.submit_result('com.example.app')['error']['code'], 'success')
+        self.server.tasks['com.example.app'] = 4
+        self.server.error_reason = 'bad url'
+        self.assertEqual(self.store.submit_result('com.example.app')['error'], {'code': 'failure', 'message': 'bad url'})
+        self.assertEqual(self.store.submit_result('com.example.other')['error']['code'], 'failure')
+        self.assertEqual(self.store.current_version(), '1.0.0')
+        # Every call went over the same pooled connection.
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_bad_signature(self):
+        store = VivoStore(dict(AUTH_DATA, access_secret='wrong'))
+        self.assertEqual(store.submit(self.package)['error'], {'code': 'failure', 'message': 'bad sign'})
+
+    def test_retries(self):
+        self.server.failures = [503, 429]
+        with self.assertLogs('distribute.store.client', 'WARNING'):
+            self.assertEqual(self.store.current_version(), '1.0.0')
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.server.failures = [503, 503, 503]
+        with self.assertLogs('distribute.store.client', 'WARNING'), self.assertRaises(StoreError):
+            self.store.current_version()
+        self.server.failures = [500]
+        with self.assertRaises(StoreError):
+            self.store.current_version()
+
+    def test_submit_not_retried_after_timeout(self):
+        self.store.client = StoreClient('vivo', timeout=(1, 0.2), retries=2, backoff=0)
+        self.server.delays = [0.5]
+        with self.assertRaises(StoreError):
+            self.store.submit(self.package)
+        self.assertEqual(len(self.server.requests), 1)
+        # Reads are retried.
+        self.server.tasks['com.example.app'] = 1
+        self.server.delays = [0.5]
+        with self.assertLogs('distribute.store.client', 'WARNING'):
+            self.assertEqual(self.store.submit_result('com.example.app')['error']['code'], 'pending')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_submit_retried_and_signed_again(self):
+        self.server.failures = [503]
+        with mock.patch('distribute.store.vivo.time') as clock:
+            clock.time.side_effect = [1.0, 2.0]
+            with self.assertLogs('distribute.store.client', 'WARNING'):
+                self.assertEqual(self.store.submit(self.package)['error']['code'], 'success')
+        self.assertEqual([payload['timestamp'] for path, payload in self.server.requests], ['1000', '2000'])
+
+    def test_submit_not_retried_after_gateway_error(self):
+        for status in (502, 504):
+            self.server.requests.clear()
+            self.server.failures = [status]
+            with self.assertRaises(StoreError):
+                self.store.submit(self.package)
+            self.assertEqual(len(self.server.requests), 1)
+
+    def test_submit_not_retried_after_reset(self):
+        reset = requests.ConnectionError(ProtocolError('Connection aborted.', ConnectionResetError()))
+        with mock.patch.object(self.store.client.session, 'post', side_effect=reset) as post:
+            with self.assertRaises(StoreError):
+                self.store.submit(self.package)
+        self.assertEqual(post.call_count, 1)
+
+    def test_connection_error(self):
+        sleeps = []
+        client = StoreClient('down', retries=2, backoff=1, timeout=(1, 1), sleep=sleeps.append)
+        self.server.__exit__()
+        with self.assertLogs('distribute.store.client', 'WARNING'), self.assertRaises(StoreError):
+            client.post(self.server.url, {})
+        self.assertEqual(sleeps, [1, 2])
+        # A refused connection never reached the store, submissions are retried too.
+        sleeps.clear()
+        with self.assertLogs('distribute.store.client', 'WARNING'), self.assertRaises(StoreError):
+            client.post(self.server.url, {}, idempotent=False)
+        self.assertEqual(sleeps, [1, 2])
+        self.server = VivoServer(b'secret').__enter__()
+
+    def test_sign(self):
+        self.assertEqual(sign(b'secret', {'b': 2, 'a': 1}), sign(b'secret', {'a': 1, 'b': 2}))
+        self.assertNotEqual(sign(b'secret', {'a': 1}), sign(b'secret', {'a': 2}))
+
+class RateLimiterTest(SimpleTestCase):
+
+    def test_rate(self):
+        now = [0.0]
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        limiter = RateLimiter(2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for i in range(4):
+            limiter.acquire()
+        # The burst passes, the next calls wait for 1/rate each.
+        self.assertEqual(sleeps, [0.5, 0.5])
+        now[0] += 10
+        limiter.acquire()
+        self.assertEqual(len(sleeps), 2)
@@ -0,0 +1,123 @@
+from django.test import override_settings
+from django.utils import timezone
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from application.models import Application
+from distribute.models import ReleaseStore, StoreApp
+from distribute.store import registry, scheduler
+from distribute.store.fake import FakeStore
+from job import queue
+
+FAKES = {
+    StoreApp.StoreType.GooglePlay: FakeStore,
+    StoreApp.StoreType.MicrosoftStore: FakeStore,
+    StoreApp.StoreType.AppStore: FakeStore,
+}
+
+class BrokenStore(FakeStore):
+
+    def __init__(self, auth_data):
+        raise KeyError('access_key')
+
+class StoreFanOutTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.registry = registry.override(FAKES)
+        self.registry.__enter__()
+        FakeStore.reset()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.apk_path = self.sample_apk()
+        app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'JavaKotlin',
+            'visibility': 'Private',
+            'os': 'Android'
+        }
+        self.assert_status_201(self.api.org.create({'name': 'org_name', 'display_name': 'org_display_name', 'visibility': 'Private'}))
+        self.assert_status_201(self.api.org.create_app('org_name', app))
+        self.assert_status_202(self.api.org.upload_app('org_name', 'app_name', self.apk_path))
+        queue.run_pending()
+        self.app = Application.objects.get(name='app_name')
+
+    def tearDown(self):
+        self.registry.__exit__(None, None, None)
+
+    def store_app(self, store, **auth_data):
+        return StoreApp.objects.create(app=self.app, store=store, auth_data=dict(auth_data, name=store.label))
+
+    def submit(self, **submission):
+        return self.api.org.submit_to_stores('org_name', 'app_name', 1, dict(submission, release_notes='notes'))
+
+    def test_fan_out(self):
+        self.store_app(StoreApp.StoreType.GooglePlay, delay=0.2)
+        self.store_app(StoreApp.StoreType.MicrosoftStore, delay=0.2, submit='failure', message='rejected')
+        self.store_app(StoreApp.StoreType.AppStore, delay=0.2, error='timed out')
+        # Stores without an adapter are left out by default.
+        self.store_app(StoreApp.StoreType.RawLink)
+
+        r = self.submit()
+        self.assert_status_201(r)
+        self.assertEqual([(s['store'], s['state']) for s in r.json()], [('GooglePlay', 'Initial'), ('MicrosoftStore', 'Initial'), ('AppStore', 'Initial')])
+        self.assertEqual(FakeStore.calls, [])
+        with self.assertLogs('distribute.store.scheduler', 'WARNING'):
+            queue.run_pending()
+        # All stores were called at once.
+        self.assertEqual(FakeStore.max_active, 3)
+        self.assertEqual(sorted(call[:2] for call in FakeStore.calls), [('AppStore', 'submit'), ('GooglePlay', 'submit'), ('MicrosoftStore', 'submit')])
+
+        states = {s['store']: (s['state'], s.get('message', '')) for s in self.api.org.get_package_store_list('org_name', 'app_name', 1).json()}
+        self.assertEqual(states, {
+            'GooglePlay': ('SubmitReview', ''),
+            'MicrosoftStore': ('ReviewRejected', 'rejected'),
+            'AppStore': ('ReviewRejected', 'timed out'),
+        })
+
+    def test_broken_adapter(self):
+        self.store_app(StoreApp.StoreType.GooglePlay)
+        self.store_app(StoreApp.StoreType.MicrosoftStore)
+        self.assert_status_201(self.submit())
+        with registry.override({StoreApp.StoreType.MicrosoftStore: BrokenStore}):
+            with self.assertLogs('distribute.store.scheduler', 'ERROR'):
+                queue.run_pending()
+        self.assertEqual([call[:2] for call in FakeStore.calls], [('GooglePlay', 'submit')])
+        states = {s['store']: s['state'] for s in self.api.org.get_package_store_list('org_name', 'app_name', 1).json()}
+        self.assertEqual(states, {'GooglePlay': 'SubmitReview', 'MicrosoftStore': 'ReviewRejected'})
+
+    @override_settings(STORE_SUBMIT_WORKERS=2)
+    def test_bounded(self):
+        for store in FAKES:
+            self.store_app(store, delay=0.1)
+        self.assert_status_201(self.submit())
+        queue.run_pending()
+        self.assertEqual(len(FakeStore.calls), 3)
+        self.assertEqual(FakeStore.max_active, 2)
+
+    def test_chosen_stores(self):
+        self.store_app(StoreApp.StoreType.GooglePlay)
+        self.store_app(StoreApp.StoreType.MicrosoftStore)
+        r = self.submit(stores=['MicrosoftStore'])
+        self.assert_status_201(r)
+        self.assertEqual([s['store'] for s in r.json()], ['MicrosoftStore'])
+        self.assert_status_400(self.submit(stores=['RawLink']))
+        self.assert_status_400(self.submit(stores=['Unknown']))
+        self.assert_status_404(self.api.org.submit_to_stores('org_name', 'app_name', 2, {'release_notes': 'notes'}))
+
+    def test_review_with_fakes(self):
+        self.store_app(StoreApp.StoreType.GooglePlay, version='1.0')
+        self.submit()
+        queue.run_pending()
+        ReleaseStore.objects.update(next_poll_time=timezone.now())
+        scheduler.poll_stores()
+        self.assertEqual(ReleaseStore.objects.get().state, ReleaseStore.State.ReviewPassed)
+
+    def test_registry(self):
+        self.assertIs(registry.get_adapter(StoreApp.StoreType.GooglePlay), FakeStore)
+        self.assertIsNone(registry.get_adapter(StoreApp.StoreType.RawLink))
+        self.assertEqual(registry.get_adapter(StoreApp.StoreType.Vivo).name(), 'vivo')
+        with registry.override({StoreApp.StoreType.Vivo: FakeStore}):
+            self.assertIs(registry.get_adapter(StoreApp.StoreType.Vivo), FakeStore)
+        self.assertEqual(registry.get_adapter(StoreApp.StoreType.Vivo).name(), 'vivo')
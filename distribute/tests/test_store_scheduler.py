@@ -0,0 +1,268 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import override_settings
+from django.utils import timezone
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from distribute.models import Package, ReleaseStore, StoreApp
+from distribute.store import scheduler
+from distribute.store.client import reset_clients
+from distribute.tests.vivo_server import VivoServer
+from job import queue
+from job.models import Job
+
+AUTH_DATA = {'access_key': 'key', 'access_secret': 'secret', 'vivo_store_app_id': '42'}
+
+class StoreSchedulerTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = VivoServer(b'secret').__enter__()
+        self.settings = override_settings(
+            STORE_CLIENT_DEFAULTS={'timeout': (1, 5), 'retries': 0, 'backoff': 0},
+            STORE_CLIENTS={},
+            STORE_VIVO_API_URL=self.server.url + '/router/rest',
+            STORE_VIVO_DETAIL_URL=self.server.url + '/detailInfo',
+            STORE_POLL_INTERVAL=60,
+            STORE_POLL_MAX_INTERVAL=300)
+        self.settings.enable()
+        reset_clients()
+
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.apk_path = self.sample_apk()
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'JavaKotlin',
+            'visibility': 'Private',
+            'os': 'Android'
+        }
+        self.assert_status_201(self.api.org.create({'name': 'org_name', 'display_name': 'org_display_name', 'visibility': 'Private'}))
+        self.assert_status_201(self.api.org.create_app('org_name', self.app))
+        self.assert_status_202(self.api.org.upload_app('org_name', 'app_name', self.apk_path))
+        queue.run_pending()
+        self.package = Package.objects.get(internal_build=1)
+        self.store_app = StoreApp.objects.create(app=self.package.app, store=StoreApp.StoreType.Vivo, auth_data=AUTH_DATA)
+
+    def tearDown(self):
+        reset_clients()
+        self.settings.disable()
+        self.server.__exit__()
+
+    def submit(self):
+        release = {'internal_build': 1, 'release_notes': 'notes', 'store': 'Vivo', 'state': 'SubmitReview'}
+        r = self.api.org.create_store_release('org_name', 'app_name', release)
+        self.assert_status_201(r)
+        return r.json()
+
+    def poll(self):
+        # Make every in-flight submission due, as if time went by.
+        ReleaseStore.objects.exclude(next_poll_time=None).update(next_poll_time=timezone.now() - timedelta(seconds=1))
+        scheduler.poll_stores()
+        return ReleaseStore.objects.get()
+
+    def test_submit_review_release(self):
+        # The request only records the submission, the store is called in the background.
+        self.assertEqual(self.submit()['state'], 'Initial')
+        self.assertEqual(self.server.requests, [])
+        queue.run_pending()
+        path, payload = self.server.requests[0]
+        self.assertEqual(payload['packageName'], self.package.bundle_identifier)
+        self.assertIn('/api/downloads/', payload['apkUrl'])
+        release_store = ReleaseStore.objects.get()
+        self.assertEqual(release_store.state, ReleaseStore.State.SubmitReview)
+        self.assertEqual(release_store.poll_interval, 60)
+        # The poll is scheduled for later and not run yet.
+        self.assertEqual(Job.objects.filter(name=scheduler.POLL, state=Job.State.Pending).get().run_after, release_store.next_poll_time)
+        self.assertEqual(len(self.server.requests), 1)
+
+        # Pending reviews are polled less and less often.
+        self.assertEqual(self.poll().poll_interval, 120)
+        self.assertEqual(self.poll().poll_interval, 240)
+        self.assertEqual(self.poll().poll_interval, 300)
+
+        self.server.tasks[self.package.bundle_identifier] = 3
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewPassed)
+        self.assertEqual(release_store.poll_interval, 60)
+
+        self.server.version = '0.9'
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewPassed)
+        self.store_app.refresh_from_db()
+        self.assertEqual(self.store_app.current_version, '0.9')
+
+        self.server.version = self.package.short_version
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.Released)
+        self.assertIsNone(release_store.next_poll_time)
+        self.store_app.refresh_from_db()
+        self.assertEqual(self.store_app.current_version, self.package.short_version)
+        r = self.api.org.get_store_release('org_name', 'app_name', 1)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['state'], 'Released')
+        self.assertEqual(r.json()['store'], 'Vivo')
+
+        # Nothing in flight, the stores are left alone.
+        count = len(self.server.requests)
+        scheduler.poll_stores()
+        self.assertEqual(len(self.server.requests), count)
+
+    def test_rejected(self):
+        self.submit()
+        queue.run_pending()
+        self.server.tasks[self.package.bundle_identifier] = 4
+        self.server.error_reason = 'bad url'
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewRejected)
+        self.assertEqual(release_store.message, 'bad url')
+        self.assertIsNone(release_store.next_poll_time)
+
+    def test_submit_failure(self):
+        self.store_app.auth_data = dict(AUTH_DATA, access_secret='wrong')
+        self.store_app.save()
+        self.submit()
+        queue.run_pending()
+        release_store = ReleaseStore.objects.get()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewRejected)
+        self.assertEqual(release_store.message, 'bad sign')
+        self.assertFalse(Job.objects.filter(name=scheduler.POLL).exists())
+
+    def test_submit_may_have_gone_through(self):
+        self.server.failures = [502]
+        self.submit()
+        with self.assertLogs('distribute.store.scheduler', 'WARNING'):
+            queue.run_pending()
+        self.assertEqual(len(self.server.requests), 1)
+        release_store = ReleaseStore.objects.get()
+        self.assertEqual(release_store.state, ReleaseStore.State.SubmitReview)
+        self.assertIn('502', release_store.message)
+        self.server.tasks[self.package.bundle_identifier] = 3
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewPassed)
+        self.assertEqual(release_store.message, '')
+
+    def test_submitted_once_when_job_crashes(self):
+        self.submit()
+        release_store = ReleaseStore.objects.get()
+        with mock.patch('distribute.store.scheduler.wait', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                scheduler.submit_stores([release_store.pk])
+        self.assertEqual(len(self.server.requests), 1)
+        release_store.refresh_from_db()
+        self.assertEqual(release_store.state, ReleaseStore.State.SubmitReview)
+        self.assertEqual(Job.objects.get(name=scheduler.POLL, state=Job.State.Pending).run_after, release_store.next_poll_time)
+
+        # The retry leaves the store alone, the poll finds out how it went.
+        scheduler.submit_stores([release_store.pk])
+        self.assertEqual(len(self.server.requests), 1)
+        self.server.tasks[self.package.bundle_identifier] = 3
+        self.assertEqual(self.poll().state, ReleaseStore.State.ReviewPassed)
+
+    def test_store_down(self):
+        self.submit()
+        queue.run_pending()
+        self.server.failures = [503]
+        with self.assertLogs('distribute.store.scheduler', 'WARNING'):
+            release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.SubmitReview)
+        self.assertEqual(release_store.poll_interval, 120)
+
+    def test_poll_error(self):
+        self.submit()
+        queue.run_pending()
+        self.store_app.auth_data = {}
+        self.store_app.save()
+        with self.assertLogs('distribute.store.scheduler', 'ERROR'):
+            release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.SubmitReview)
+        self.assertIn('access_key', release_store.message)
+        self.assertEqual(release_store.poll_interval, 120)
+        # The job keeps polling.
+        self.assertLessEqual(Job.objects.get(name=scheduler.POLL, state=Job.State.Pending).run_after, release_store.next_poll_time)
+
+        self.store_app.auth_data = AUTH_DATA
+        self.store_app.save()
+        self.server.tasks[self.package.bundle_identifier] = 3
+        release_store = self.poll()
+        self.assertEqual(release_store.state, ReleaseStore.State.ReviewPassed)
+        self.assertEqual(release_store.message, '')
+
+    def test_poll_job_reschedules_on_crash(self):
+        self.submit()
+        queue.run_pending()
+        Job.objects.filter(name=scheduler.POLL).delete()
+        ReleaseStore.objects.update(next_poll_time=timezone.now())
+        with mock.patch('distribute.store.scheduler.poll_batch', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                scheduler.poll_stores()
+        self.assertTrue(Job.objects.filter(name=scheduler.POLL, state=Job.State.Pending).exists())
+
+    def test_claimed_once(self):
+        self.submit()
+        queue.run_pending()
+        ReleaseStore.objects.update(next_poll_time=timezone.now())
+        self.assertEqual(len(scheduler.claim(10)), 1)
+        self.assertEqual(scheduler.claim(10), [])
+
+    @override_settings(STORE_REFRESH_BATCH=2, STORE_REFRESH_WORKERS=2)
+    def test_refresh_versions(self):
+        auth_data = dict(AUTH_DATA, store_link='https://example.com/app')
+        self.assert_status_201(self.api.org.set_vivo_store('org_name', 'app_name', auth_data))
+        self.assertEqual(self.api.org.get_vivo_store('org_name', 'app_name').json(), auth_data)
+        for i in range(4):
+            StoreApp.objects.create(app=self.package.app, store=StoreApp.StoreType.Vivo, auth_data=AUTH_DATA)
+        StoreApp.objects.create(app=self.package.app, store=StoreApp.StoreType.RawLink, auth_data={})
+        self.server.version = '2.0'
+        queue.run_pending()
+        self.assertEqual(len(self.server.requests), 5)
+        refreshed = StoreApp.objects.filter(store=StoreApp.StoreType.Vivo)
+        self.assertEqual({(s.current_version, s.version_update_time is None) for s in refreshed}, {('2.0', False)})
+        self.assertEqual(StoreApp.objects.get(store=StoreApp.StoreType.RawLink).version_update_time, None)
+        # The next refresh waits for its time.
+        self.assertTrue(Job.objects.filter(name=scheduler.REFRESH, state=Job.State.Pending, run_after__gt=timezone.now()).exists())
+
+        # Lists serve the cached versions.
+        r = self.api.org.get_store_app_list('org_name', 'app_name')
+        self.assert_status_200(r)
+        self.assertEqual(len(self.server.requests), 5)
+        store = r.json()[0]
+        self.assertEqual(store['store'], 'Vivo')
+        self.assertEqual(store['store_name'], 'vivo')
+        self.assertEqual(store['current_version'], '2.0')
+        self.assertIn('version_update_time', store)
+        self.assertNotIn('auth_data', store)
+
+    def test_refresh_failure(self):
+        self.server.failures = [500]
+        with self.assertLogs('distribute.store.scheduler', 'WARNING'):
+            scheduler.refresh_versions()
+        self.store_app.refresh_from_db()
+        self.assertIsNone(self.store_app.version_update_time)
+        scheduler.refresh_versions()
+        self.store_app.refresh_from_db()
+        self.assertEqual(self.store_app.current_version, '1.0.0')
+
+    def test_refresh_error(self):
+        Job.objects.filter(name=scheduler.REFRESH).delete()
+        broken = StoreApp.objects.create(app=self.package.app, store=StoreApp.StoreType.Vivo, auth_data={})
+        self.server.version = '2.0'
+        with self.assertLogs('distribute.store.scheduler', 'ERROR'):
+            scheduler.refresh_versions()
+        self.store_app.refresh_from_db()
+        self.assertEqual(self.store_app.current_version, '2.0')
+        broken.refresh_from_db()
+        self.assertIsNone(broken.version_update_time)
+        self.assertTrue(Job.objects.filter(name=scheduler.REFRESH, state=Job.State.Pending).exists())
+
+    def test_started_by_workers(self):
+        # Store apps of an upgraded deployment are refreshed without a save.
+        Job.objects.all().delete()
+        queue.start_recurring()
+        self.assertTrue(Job.objects.filter(name=scheduler.REFRESH, state=Job.State.Pending).exists())
+        queue.run_pending()
+        self.store_app.refresh_from_db()
+        self.assertEqual(self.store_app.current_version, '1.0.0')
+        self.assertEqual(Job.objects.filter(name=scheduler.REFRESH, state=Job.State.Pending).count(), 1)
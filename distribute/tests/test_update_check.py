@@ -0,0 +1,99 @@
+from util.tests.client import ApiClient
+from util.tests.unit_test_client import UnitTestClient
+from util.tests.case import BaseTestCase
+from distribute.models import LatestRelease, Release, ReleaseDeploymentKey, Upgrade
+from distribute.latest import version_key
+from job import queue
+
+class UpdateCheckTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api: ApiClient = ApiClient(UnitTestClient('/api/', 'admin'))
+        self.ipa_path = self.sample_ipa()
+
+        self.app = {
+            'name': 'app_name',
+            'display_name': 'app_display_name',
+            'release_type': 'Alpha',
+            'platform': 'ObjectiveCSwift',
+            'visibility': 'Private',
+            'os': 'iOS'
+        }
+        self.assert_status_201(self.api.app.create(self.app))
+        for i in range(2):
+            self.assert_status_202(self.api.app.upload_app('admin', 'app_name', self.ipa_path))
+        queue.run_pending()
+        self.package = self.api.app.get_package('admin', 'app_name', 1).json()
+        self.key = str(ReleaseDeploymentKey.objects.get(app__name='app_name', name='production').key)
+
+    def check(self, etag=None, **query):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/updates/' + self.key, query, **headers)
+
+    def release(self, internal_build, enabled=True):
+        release = {'release_notes': 'notes {0}'.format(internal_build), 'internal_build': internal_build, 'enabled': enabled}
+        r = self.api.app.create_release('admin', 'app_name', 'production', release)
+        self.assert_status_201(r)
+        return r.json()['release_id']
+
+    def test_update_check(self):
+        self.assert_status_404(self.check())
+        self.release(1)
+
+        r = self.check()
+        self.assert_status_200(r)
+        data = r.json()
+        self.assertEqual(data['release_id'], 1)
+        self.assertEqual(data['release_notes'], 'notes 1')
+        self.assertEqual(data['version'], self.package['version'])
+        self.assertEqual(data['bundle_identifier'], self.package['bundle_identifier'])
+        self.assertTrue(data['package_file'].startswith('http://testserver/api/downloads/'))
+        self.assertEqual(self.client.get(data['package_file']).status_code, 200)
+        self.assertTrue(data['update_available'])
+        self.assertFalse(data['mandatory'])
+
+        self.assertFalse(self.check(version=self.package['version']).json()['update_available'])
+        self.assertTrue(self.check(version='0').json()['update_available'])
+        self.assertFalse(self.check(version='0', bundle_identifier='com.example.other').json()['update_available'])
+
+        # Repeat polls cost one query and no serialization.
+        etag = self.check(version='0')['ETag']
+        with self.assertNumQueries(1):
+            r = self.check(etag, version='0')
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(self.check(etag, version='1').status_code, 200)
+
+        # A disabled release is not offered.
+        release_id = self.release(2, enabled=False)
+        self.assertEqual(self.check(etag, version='0').status_code, 304)
+        self.api.app.modify_release('admin', 'app_name', release_id, {'enabled': True})
+        r = self.check(etag, version='0')
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['release_id'], release_id)
+
+        Upgrade.objects.create(release=Release.objects.get(release_id=release_id), upgrade_id=1, target_version='0',
+            release_notes='please upgrade', enabled=True, mandatory=True)
+        data = self.check(version='0').json()
+        self.assertTrue(data['mandatory'])
+        self.assertEqual(data['release_notes'], 'please upgrade')
+        self.assertFalse(self.check(version='1').json()['mandatory'])
+
+        self.assert_status_204(self.api.app.remove_release('admin', 'app_name', release_id))
+        self.assertEqual(self.check().json()['release_id'], 1)
+
+        self.assert_status_204(self.api.app.delete_app('admin', 'app_name'))
+        self.assert_status_404(self.check())
+        self.assertFalse(LatestRelease.objects.exists())
+
+    def test_staging_has_no_release(self):
+        self.release(1)
+        self.key = str(ReleaseDeploymentKey.objects.get(app__name='app_name', name='staging').key)
+        self.assert_status_404(self.check())
+
+    def test_version_key(self):
+        self.assertGreater(version_key('1.10'), version_key('1.9'))
+        self.assertGreater(version_key('2'), version_key('1.9.9'))
+        self.assertGreater(version_key('1.0.1'), version_key('1.0'))
+        self.assertGreater(version_key('1.0-beta'), version_key('1.0'))
+        self.assertEqual(version_key('42'), version_key('42'))
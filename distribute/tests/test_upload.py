@@ -1,7 +1,18 @@
-import requests, shutil, os
+import os, hashlib, tempfile, zipfile
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.middleware.csrf import CSRF_SECRET_LENGTH
+from django.test import Client, override_settings
+from django.utils.crypto import get_random_string
+from django.utils import timezone
+from distribute import jobs, upload
+from distribute.models import PackageUpload
+from job.models import Job
 from util.tests.client import ApiClient
 from util.tests.unit_test_client import UnitTestClient
 from util.tests.case import BaseTestCase
+from job import queue
 
 class DistributeUploadTest(BaseTestCase):
 
@@ -11,20 +22,8 @@ class DistributeUploadTest(BaseTestCase):
         self.org_index = 0
         self.app_index = 0
 
-        if not os.path.exists('downloads'):
-            os.makedirs('downloads')
-        self.apk_path = 'downloads/android-sample.apk'
-        if not os.path.exists(self.apk_path):
-            url = 'https://raw.githubusercontent.com/bitbar/test-samples/master/apps/android/bitbar-sample-app.apk'
-            with requests.get(url, stream=True) as r:
-                with open(self.apk_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
-        self.ipa_path = 'downloads/ios-sample.ipa'
-        if not os.path.exists(self.ipa_path):
-            url = 'https://raw.githubusercontent.com/bitbar/test-samples/master/apps/ios/bitbar-ios-sample.ipa'
-            with requests.get(url, stream=True) as r:
-                with open(self.ipa_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
+        self.apk_path = self.sample_apk()
+        self.ipa_path = self.sample_ipa()
 
     def generate_org(self):
         self.org_index += 1
@@ -71,11 +70,15 @@ class DistributeUploadTest(BaseTestCase):
         self.assert_status_201(r)
 
         r = self.client.org.upload_app(org_name, app_name, self.ipa_path)
-        self.assert_status_201(r)
+        self.assert_status_202(r)
+        self.assertEqual(r.json()['state'], 'Processing')
         internal_build = r.json()['internal_build']
 
+        queue.run_pending()
         r = self.client.org.get_package(org_name, app_name, internal_build)
         self.assert_status_200(r)
+        self.assertEqual(r.json()['state'], 'Ready')
+        self.assertNotEqual(r.json()['bundle_identifier'], '')
 
         r = self.client.org.get_package_list(org_name, app_name)
         self.assert_status_200(r)
@@ -110,7 +113,7 @@ class DistributeUploadTest(BaseTestCase):
         self.assert_status_201(r)
 
         r = self.client.org.upload_app(org_name, app_name, self.apk_path)
-        self.assert_status_201(r)
+        self.assert_status_202(r)
 
         r = self.client.org.get_package(org_name, app_name, 1)
         self.assert_status_200(r)
@@ -128,7 +131,7 @@ class DistributeUploadTest(BaseTestCase):
         app_name = app['name']
 
         r = self.client.app.upload_app(ownername, app_name, self.ipa_path)
-        self.assert_status_201(r)
+        self.assert_status_202(r)
         internal_build = r.json()['internal_build']
 
         r = self.client.app.get_package(ownername, app_name, internal_build)
@@ -154,6 +157,19 @@ class DistributeUploadTest(BaseTestCase):
         self.assert_status_200(r)
         self.assert_list_length(r, 0)
 
+    def test_ipa_without_bundle_fails(self):
+        app = self.generate_ios_app()
+        self.assert_status_201(self.client.app.create(app))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'empty.ipa')
+            with zipfile.ZipFile(path, 'w') as z:
+                z.writestr('Payload/readme.txt', b'')
+            self.assert_status_202(self.client.app.upload_app('admin', app['name'], path))
+        with self.assertLogs('distribute.jobs', 'ERROR'):
+            queue.run_pending()
+        r = self.client.app.get_package('admin', app['name'], 1)
+        self.assertEqual(r.json()['state'], 'Failed')
+
     def test_user_app_upload_apk(self):
         app = self.generate_android_app()
         r = self.client.app.create(app)
@@ -163,11 +179,229 @@ class DistributeUploadTest(BaseTestCase):
         app_name = app['name']
 
         r = self.client.app.upload_app(ownername, app_name, self.apk_path)
-        self.assert_status_201(r)
-
+        self.assert_status_202(r)
+        self.assertEqual(r.json()['state'], 'Processing')
+        with open(self.apk_path, 'rb') as f:
+            content = f.read()
+        self.assertEqual(r.json()['fingerprint'], hashlib.md5(content).hexdigest())
+        self.assertEqual(r.json()['sha256'], hashlib.sha256(content).hexdigest())
+        self.assertEqual(r.json()['size'], len(content))
+
+        queue.run_pending()
         r = self.client.app.get_package(ownername, app_name, 1)
         self.assert_status_200(r)
+        self.assertEqual(r.json()['state'], 'Ready')
+        self.assertNotEqual(r.json()['bundle_identifier'], '')
 
         r = self.client.app.get_package_list(ownername, app_name)
         self.assert_status_200(r)
         self.assert_list_length(r, 1)
+
+    def test_session_upload_with_csrf(self):
+        app = self.generate_android_app()
+        r = self.client.app.create(app)
+        self.assert_status_201(r)
+
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.get(username='admin'))
+        token = get_random_string(CSRF_SECRET_LENGTH)
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        path = '/api/users/admin/apps/' + app['name'] + '/distribute/packages'
+        with open(self.apk_path, 'rb') as fp:
+            r = client.post(path, data={'file': fp}, HTTP_X_CSRFTOKEN=token)
+        self.assert_status_202(r)
+        with open(self.apk_path, 'rb') as fp:
+            r = client.post(path, data={'file': fp, 'csrfmiddlewaretoken': token})
+        self.assert_status_202(r)
+        with open(self.apk_path, 'rb') as fp:
+            r = client.post(path, data={'file': fp})
+        self.assert_status_403(r)
+
+    def test_user_app_chunked_upload_ipa(self):
+        app = self.generate_ios_app()
+        r = self.client.app.create(app)
+        self.assert_status_201(r)
+
+        ownername = 'admin'
+        app_name = app['name']
+        with open(self.ipa_path, 'rb') as f:
+            content = f.read()
+        size = len(content)
+        chunk_size = size // 3 + 1
+
+        r = self.client.app.start_upload(ownername, app_name, 'ios-sample.ipa', size)
+        self.assert_status_201(r)
+        upload_id = r.json()['upload_id']
+        self.assertEqual(r.json()['offset'], 0)
+
+        r = self.client.app.upload_chunk(ownername, app_name, upload_id, content[:chunk_size], 0, size)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['offset'], chunk_size)
+
+        # a chunk after a gap is rejected, the client should resume from offset
+        r = self.client.app.upload_chunk(ownername, app_name, upload_id, content[2 * chunk_size:], 2 * chunk_size, size)
+        self.assert_status_409(r)
+        self.assertEqual(r.json()['offset'], chunk_size)
+
+        r = self.client.app.commit_upload(ownername, app_name, upload_id)
+        self.assert_status_409(r)
+
+        # resending an already received chunk is harmless
+        r = self.client.app.upload_chunk(ownername, app_name, upload_id, content[:chunk_size], 0, size)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['offset'], chunk_size)
+
+        r = self.client.app.get_upload(ownername, app_name, upload_id)
+        self.assert_status_200(r)
+        offset = r.json()['offset']
+        while offset < size:
+            r = self.client.app.upload_chunk(ownername, app_name, upload_id, content[offset:offset + chunk_size], offset, size)
+            self.assert_status_200(r)
+            offset = r.json()['offset']
+
+        r = self.client.app.commit_upload(ownername, app_name, upload_id, 'ffffffffffffffffffffffffffffffff')
+        self.assert_status_400(r)
+
+        fingerprint = hashlib.md5(content).hexdigest()
+        r = self.client.app.commit_upload(ownername, app_name, upload_id, fingerprint)
+        self.assert_status_202(r)
+        self.assertEqual(r.json()['fingerprint'], fingerprint)
+        self.assertEqual(r.json()['size'], size)
+        internal_build = r.json()['internal_build']
+
+        r = self.client.app.get_package(ownername, app_name, internal_build)
+        self.assert_status_200(r)
+        r = self.client.app.get_upload(ownername, app_name, upload_id)
+        self.assert_status_404(r)
+
+    def test_org_app_chunked_upload_apk(self):
+        org = self.generate_org()
+        r = self.client.org.create(org)
+        self.assert_status_201(r)
+
+        app = self.generate_android_app()
+        org_name = org['name']
+        app_name = app['name']
+        r = self.client.org.create_app(org_name, app)
+        self.assert_status_201(r)
+
+        with open(self.apk_path, 'rb') as f:
+            content = f.read()
+        size = len(content)
+
+        r = self.client.org.start_upload(org_name, app_name, 'android-sample.apk', size)
+        self.assert_status_201(r)
+        upload_id = r.json()['upload_id']
+
+        r = self.client.org.upload_chunk(org_name, app_name, upload_id, content, 0, size + 1)
+        self.assert_status_400(r)
+
+        r = self.client.org.upload_chunk(org_name, app_name, upload_id, content, 0, size)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['offset'], size)
+
+        r = self.client.org.commit_upload(org_name, app_name, upload_id)
+        self.assert_status_202(r)
+        self.assertEqual(r.json()['fingerprint'], hashlib.md5(content).hexdigest())
+        # The parse job reads the central directory where the commit found it.
+        offset, size, count = Job.objects.get(name='distribute.parse_package').kwargs['directory']
+        self.assertEqual(offset + size + 22, len(content))
+
+        r = self.client.org.get_package_list(org_name, app_name)
+        self.assert_status_200(r)
+        self.assert_list_length(r, 1)
+
+        r = self.client.org.start_upload(org_name, app_name, 'android-sample.apk', size)
+        self.assert_status_201(r)
+        upload_id = r.json()['upload_id']
+        r = self.client.org.abort_upload(org_name, app_name, upload_id)
+        self.assert_status_204(r)
+        r = self.client.org.get_upload(org_name, app_name, upload_id)
+        self.assert_status_404(r)
+
+    def test_upload_max_size(self):
+        app = self.generate_android_app()
+        self.assert_status_201(self.client.app.create(app))
+        size = os.path.getsize(self.apk_path)
+        with override_settings(UPLOAD_MAX_SIZE=size - 1):
+            r = self.client.app.start_upload('admin', app['name'], 'android-sample.apk', size)
+            self.assert_status_400(r)
+            self.assertIn('file_size', r.json())
+            r = self.client.app.upload_app('admin', app['name'], self.apk_path)
+            self.assert_status_400(r)
+            self.assertIn('file', r.json())
+        with override_settings(UPLOAD_MAX_SIZE=size):
+            self.assert_status_201(self.client.app.start_upload('admin', app['name'], 'android-sample.apk', size))
+            self.assert_status_202(self.client.app.upload_app('admin', app['name'], self.apk_path))
+
+    def test_commit_upload_once(self):
+        app = self.generate_android_app()
+        self.assert_status_201(self.client.app.create(app))
+        app_name = app['name']
+        with open(self.apk_path, 'rb') as f:
+            content = f.read()
+        size = len(content)
+        r = self.client.app.start_upload('admin', app_name, 'android-sample.apk', size)
+        upload_id = r.json()['upload_id']
+        self.assert_status_200(self.client.app.upload_chunk('admin', app_name, upload_id, content, 0, size))
+
+        # a failed commit hands the session back to the client
+        r = self.client.app.commit_upload('admin', app_name, upload_id, 'ffffffffffffffffffffffffffffffff')
+        self.assert_status_400(r)
+        self.assertEqual(PackageUpload.objects.get().state, PackageUpload.State.Uploading)
+
+        # another request is committing the session
+        PackageUpload.objects.update(state=PackageUpload.State.Committing)
+        self.assert_status_409(self.client.app.commit_upload('admin', app_name, upload_id))
+        self.assert_status_409(self.client.app.upload_chunk('admin', app_name, upload_id, content, 0, size))
+        self.assert_status_409(self.client.app.abort_upload('admin', app_name, upload_id))
+        r = self.client.app.get_package_list('admin', app_name)
+        self.assert_list_length(r, 0)
+        self.assertTrue(os.path.exists(upload.part_file_path(PackageUpload.objects.get())))
+
+        PackageUpload.objects.update(state=PackageUpload.State.Uploading)
+        self.assert_status_202(self.client.app.commit_upload('admin', app_name, upload_id))
+        self.assertFalse(PackageUpload.objects.exists())
+
+    def test_expired_uploads(self):
+        app = self.generate_android_app()
+        self.assert_status_201(self.client.app.create(app))
+        app_name = app['name']
+        with open(self.apk_path, 'rb') as f:
+            content = f.read()
+        size = len(content)
+        upload_ids = []
+        for i in range(3):
+            r = self.client.app.start_upload('admin', app_name, 'android-sample.apk', size)
+            self.assert_status_201(r)
+            upload_ids.append(r.json()['upload_id'])
+        instances = [PackageUpload.objects.get(upload_id=upload_id) for upload_id in upload_ids]
+        paths = [upload.part_file_path(instance) for instance in instances]
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+            self.assertFalse(os.path.abspath(path).startswith(os.path.abspath(settings.MEDIA_ROOT)))
+
+        # The first session is abandoned, the second one is still being sent.
+        old = timezone.now() - timedelta(seconds=settings.UPLOAD_EXPIRE_SECONDS + 1)
+        PackageUpload.objects.filter(upload_id__in=upload_ids[:2]).update(update_time=old)
+        r = self.client.app.upload_chunk('admin', app_name, upload_ids[1], content[:100], 0, size)
+        self.assert_status_200(r)
+        # A part file of a session that is gone.
+        orphan = os.path.join(settings.UPLOAD_ROOT, 'orphan.part')
+        open(orphan, 'wb').close()
+        os.utime(orphan, (old.timestamp(), old.timestamp()))
+        jobs.expire_uploads()
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assert_status_404(self.client.app.get_upload('admin', app_name, upload_ids[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+        self.assertTrue(Job.objects.filter(name=jobs.EXPIRE_UPLOADS, state=Job.State.Pending).exists())
+
+        # A session whose part file is gone can not be completed.
+        os.remove(paths[1])
+        r = self.client.app.upload_chunk('admin', app_name, upload_ids[1], content[100:], 100, size)
+        self.assertEqual(r.status_code, 410)
+        self.assert_status_404(self.client.app.get_upload('admin', app_name, upload_ids[1]))
+        os.remove(paths[2])
+        r = self.client.app.commit_upload('admin', app_name, upload_ids[2])
+        self.assertEqual(r.status_code, 410)
@@ -0,0 +1,84 @@
+import json, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from distribute.store.vivo import sign
+
+class VivoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        payload = dict(parse_qsl(self.rfile.read(int(self.headers['Content-Length'])).decode()))
+        with server.lock:
+            server.requests.append((self.path, payload))
+            server.connections.add(self.client_address)
+            failures = server.failures.pop(0) if server.failures else None
+            delay = server.delays.pop(0) if server.delays else 0
+        time.sleep(delay)
+        if failures is not None:
+            return self.reply(failures, {}, {'Retry-After': '0'})
+        if self.path == '/detailInfo':
+            return self.reply(200, {'version_name': server.version})
+        signature = payload.pop('sign', '')
+        if signature != sign(server.secret, payload):
+            return self.reply(200, {'code': 1, 'subCode': '401', 'msg': 'bad sign'})
+        if payload['method'] == 'app.update.app':
+            server.tasks[payload['packageName']] = 1
+            return self.reply(200, {'code': 0, 'subCode': '0', 'msg': 'submitted'})
+        status = server.tasks.get(payload['packageName'])
+        if status is None:
+            return self.reply(200, {'code': 1, 'subCode': '404', 'msg': 'no task'})
+        return self.reply(200, {'code': 0, 'subCode': '0', 'msg': 'success',
+            'data': {'packageName': payload['packageName'], 'status': status, 'errorReason': server.error_reason}})
+
+class VivoServer(ThreadingHTTPServer):
+    """A stand-in of the Vivo developer and app store APIs, on localhost.
+
+    ``failures`` are statuses answered before any real answer, ``delays``
+    the seconds waited before them, ``tasks`` maps package names to the
+    status submit_result reports.
+    """
+    daemon_threads = True
+
+    def __init__(self, secret):
+        super().__init__(('127.0.0.1', 0), VivoHandler)
+        self.secret = secret
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = set()
+        self.failures = []
+        self.delays = []
+        self.tasks = {}
+        self.version = '1.0.0'
+        self.error_reason = ''
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out close the connection before the answer.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
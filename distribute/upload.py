@@ -0,0 +1,65 @@
+import os, re
+from django.conf import settings
+from django.core.files import File
+
+CHUNK_SIZE = 64 * 1024
+
+content_range_pattern = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+class ContentRangeError(Exception):
+    pass
+
+class PackageUploadFile(File):
+    """A fully received chunked upload.
+
+    Exposing ``temporary_file_path`` lets the storage backend move the part
+    file into place instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+def part_file_path(upload):
+    # Outside MEDIA_ROOT, partial uploads are never served.
+    return os.path.join(settings.UPLOAD_ROOT, '{0}.part'.format(upload.upload_id))
+
+def create_part_file(upload):
+    path = part_file_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+def remove_part_file(upload):
+    try:
+        os.remove(part_file_path(upload))
+    except FileNotFoundError:
+        pass
+
+def parse_content_range(value, file_size):
+    m = content_range_pattern.match(value or '')
+    if m is None:
+        raise ContentRangeError('Invalid Content-Range header.')
+    start, end, total = (int(x) for x in m.groups())
+    if total != file_size or start > end or end >= total:
+        raise ContentRangeError('Content-Range does not match the upload.')
+    return start, end
+
+def write_chunk(upload, stream, start, end):
+    """Copy ``end - start + 1`` bytes from ``stream`` into the part file at ``start``.
+
+    Returns the number of bytes actually written, which is less than expected
+    when the client went away in the middle of the request body.
+    """
+    remaining = end - start + 1
+    with open(part_file_path(upload), 'r+b') as f:
+        f.seek(start)
+        while remaining > 0:
+            data = stream.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            f.write(data)
+            remaining -= len(data)
+    return end - start + 1 - remaining
+
+def open_part_file(upload):
+    path = part_file_path(upload)
+    return PackageUploadFile(open(path, 'rb'), name=upload.file_name)
@@ -2,8 +2,18 @@ from django.urls import path
 from distribute import views
 
 urlpatterns = [
-    path('<str:org_name>/apps/<str:app_name>/distribute/packages', views.OrgAppPackageList.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages', views.OrgAppPackageList.as_view(), name='org-package-list'),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages/uploads', views.OrgAppPackageUploadList.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages/uploads/<uuid:upload_id>', views.OrgAppPackageUploadDetail.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages/uploads/<uuid:upload_id>/commit', views.OrgAppPackageUploadCommit.as_view()),
     path('<str:org_name>/apps/<str:app_name>/distribute/packages/<int:internal_build>', views.OrgAppPackageDetail.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages/<int:internal_build>/download', views.OrgAppPackageDownload.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/packages/<int:internal_build>/stores', views.OrgAppPackageStoreList.as_view()),
     path('<str:org_name>/apps/<str:app_name>/distribute/releases/env/<env>', views.OrgAppReleaseList.as_view()),
     path('<str:org_name>/apps/<str:app_name>/distribute/releases/<int:release_id>', views.OrgAppReleaseDetail.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/releases/<int:release_id>/download', views.OrgAppReleaseDownload.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/stores', views.OrgStoreAppList.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/stores/vivo', views.OrgStoreAppVivo.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/stores/releases', views.OrgAppReleaseStoreStateList.as_view()),
+    path('<str:org_name>/apps/<str:app_name>/distribute/stores/releases/<int:release_store_id>', views.OrgAppReleaseStoreStateDetail.as_view()),
 ]
@@ -2,9 +2,14 @@ from django.urls import path
 from distribute import views
 
 urlpatterns = [
-    path('<str:app_name>/distribute/packages', views.UserAppPackageList.as_view()),
+    path('<str:app_name>/distribute/packages', views.UserAppPackageList.as_view(), name='user-package-list'),
+    path('<str:app_name>/distribute/packages/uploads', views.UserAppPackageUploadList.as_view()),
+    path('<str:app_name>/distribute/packages/uploads/<uuid:upload_id>', views.UserAppPackageUploadDetail.as_view()),
+    path('<str:app_name>/distribute/packages/uploads/<uuid:upload_id>/commit', views.UserAppPackageUploadCommit.as_view()),
     path('<str:app_name>/distribute/packages/<int:internal_build>', views.UserAppPackageDetail.as_view()),
+    path('<str:app_name>/distribute/packages/<int:internal_build>/download', views.UserAppPackageDownload.as_view()),
     path('<str:app_name>/distribute/releases', views.UserAppReleaseList.as_view()),
     path('<str:app_name>/distribute/releases/env/<env>', views.UserAppReleaseList.as_view()),
     path('<str:app_name>/distribute/releases/<int:release_id>', views.UserAppReleaseDetail.as_view()),
+    path('<str:app_name>/distribute/releases/<int:release_id>/download', views.UserAppReleaseDownload.as_view()),
 ]
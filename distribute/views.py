@@ -1,114 +1,208 @@
-from django.core.exceptions import PermissionDenied
-from django.core.files.base import ContentFile
-from django.http import Http404
-from django.db.models import Q
+import os, time
+from django.core import signing
+from django.db import transaction
+from django.db.models.functions import Greatest
+from django.http import Http404, HttpResponse
+from django.utils import timezone
 from rest_framework import permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from distribute.serializers import *
 from distribute.app_parser import parser
-from distribute.models import ReleaseDeploymentKey
-from organization.models import OrganizationUser, Organization
-from application.models import Application, ApplicationUser
-from util.visibility import VisibilityType
+from distribute import upload, ingest, sequence, latest, blobs, manifest
+from distribute.downloads import download_package, signed_expiry, unsign
+from distribute.store import registry, scheduler
+from job import queue
+from distribute.models import LatestRelease, PackageUpload, ReleaseDeploymentKey
+from util.sendfile import sendfile
+from util.conditional import make_etag, not_modified, set_validators, respond_with_objects
+from util.pagination import ListField, paginate
+from util.permission import check_org_view_permission, check_org_upload_app_permission, check_org_admin_permission, get_org_app
+from util.permission import check_app_view_permission, check_app_upload_permission, check_app_manager_permission
+
+package_list_fields = {
+    'internal_build': ListField('internal_build'),
+    'name': ListField('name'),
+    'version': ListField('version'),
+    'short_version': ListField('short_version'),
+    'bundle_identifier': ListField('bundle_identifier'),
+    'size': ListField('size'),
+    'commit_id': ListField('commit_id'),
+    'state': ListField('state', Package.State),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
+
+release_list_fields = {
+    'release_id': ListField('release_id'),
+    'enabled': ListField('enabled'),
+    'internal_build': ListField('package__internal_build'),
+    'version': ListField('package__version'),
+    'short_version': ListField('package__short_version'),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
+
+# Lists are read with values() and package_rows/release_rows, which give
+# the same JSON as PackageSerializer/ReleaseSerializer at a fraction of the
+# cost per row.
+def list_packages(request, packages):
+    serialize = package_rows.compile(request)
+    return paginate(request, packages, ['internal_build'], serialize, package_list_fields, columns=package_rows.columns)
+
+def list_releases(request, releases):
+    serialize = release_rows.compile(request)
+    times = ['update_time', 'package__update_time']
+    return paginate(request, releases, ['release_id'], serialize, release_list_fields, times, release_rows.columns)
 
 def create_package(request, app):
     serializer = UploadPackageSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     file = serializer.validated_data['file']
+    return save_package(request, app, file)
+
+def save_package(request, app, file):
     ext = file.name.split('.')[-1]
-    pkg = parser.parse(file.file, ext, app.os, app.platform)
-    if pkg is None:
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    if pkg.app_icon is not None:
-        icon_file = ContentFile(pkg.app_icon)
-        icon_file.name = 'icon.png'
-    else:
-        icon_file = None
-    internal_build = Package.objects.filter(app=app).count() + 1
-    instance = Package.objects.create(
-        app=app,
-        name=pkg.display_name,
-        package_file=file,
-        icon_file=icon_file,
-        version=pkg.version,
-        short_version=pkg.short_version,
-        bundle_identifier=pkg.bundle_identifier,
-        internal_build=internal_build,
-        min_os=pkg.minimum_os_version,
-        extra=pkg.extra,
-        size=file.size)
-    if not app.icon_file and icon_file is not None:
-        app.icon_file = icon_file
-        app.save()
+    if not parser.can_parse(ext, app.os, app.platform):
+        return Response({'file': ['Unsupported package type.']}, status=status.HTTP_400_BAD_REQUEST)
+    package_ingest = getattr(file, 'ingest', None)
+    if package_ingest is None:
+        package_ingest = ingest.PackageIngest.from_file(file.file)
+    index = package_ingest.zip_index(file.file)
+    if index is None:
+        return Response({'file': ['The package is not a valid archive.']}, status=status.HTTP_400_BAD_REQUEST)
+    # Allocated in its own transaction, so the counter is not locked while
+    # the package file is written to the storage.
+    internal_build = sequence.next_internal_build(app)
+    # Identical bytes are stored once, an app that already has them parsed
+    # gets the package ready without parsing it again.
+    package_file = blobs.store(file, package_ingest.sha256, ext, blobs.PACKAGES)
+    parsed = Package.objects.filter(app=app, sha256=package_ingest.sha256, state=Package.State.Ready).order_by('-internal_build').first()
+    try:
+        with transaction.atomic():
+            instance = Package(
+                app=app,
+                package_file=package_file,
+                fingerprint=package_ingest.fingerprint,
+                sha256=package_ingest.sha256,
+                internal_build=internal_build,
+                state=Package.State.Processing,
+                size=file.size)
+            if parsed is not None:
+                for name in ('name', 'version', 'short_version', 'bundle_identifier', 'min_os', 'extra', 'icon_file'):
+                    setattr(instance, name, getattr(parsed, name))
+                instance.state = Package.State.Ready
+                blobs.retain(parsed.icon_file.name)
+            instance.save()
+            if parsed is None:
+                queue.enqueue('distribute.parse_package', package_id=instance.pk, directory=list(index.directory))
+    except Exception:
+        blobs.release(package_file)
+        raise
+    instance.refresh_from_db()
     serializer = PackageSerializer(instance, context={'request': request})
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
-def org_viewer_query(user, org_name):
-    if user.is_authenticated:
-        allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-        q1 = Q(org__name=org_name)
-        q2 = Q(org__visibility__in=allow_visibility)
-        q3 = Q(user=user)
-        return (q2 | q3) & q1
-    else:
-        q1 = Q(org__name=org_name)
-        q2 = Q(org__visibility=VisibilityType.Public)
-        return q1 & q2
+def start_package_upload(request, app):
+    serializer = PackageUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    instance = serializer.save(app=app, uploader=request.user)
+    upload.create_part_file(instance)
+    serializer = PackageUploadSerializer(instance)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-def check_org_view_permission(org_name, user):
+def get_package_upload(upload_id, **kwargs):
     try:
-        return OrganizationUser.objects.get(org_viewer_query(user, org_name))
-    except OrganizationUser.DoesNotExist:
+        return PackageUpload.objects.get(upload_id=upload_id, **kwargs)
+    except PackageUpload.DoesNotExist:
         raise Http404
 
-def check_org_upload_app_permission(org_name, user):
-    try:
-        admin_role = OrganizationUser.OrganizationUserRole.Admin
-        collaborator_role = OrganizationUser.OrganizationUserRole.Collaborator
-        user_org = OrganizationUser.objects.get(org__name=org_name, user=user)
-        if user_org.role != admin_role and user_org.role != collaborator_role:
-            raise PermissionDenied
-        return user_org
-    except OrganizationUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Organization.objects.get(name=org_name, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Organization.DoesNotExist:
-            raise Http404
+def committing_package_upload():
+    return Response({'detail': 'The upload is being committed.'}, status=status.HTTP_409_CONFLICT)
 
-def check_org_admin_permission(org_name, user):
+def write_package_upload_chunk(request, instance):
+    if instance.state == PackageUpload.State.Committing:
+        return committing_package_upload()
     try:
-        admin_role = OrganizationUser.OrganizationUserRole.Admin
-        user_org = OrganizationUser.objects.get(org__name=org_name, user=user)
-        if user_org.role != admin_role:
-            raise PermissionDenied
-        return user_org
-    except OrganizationUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Organization.objects.get(name=org_name, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Organization.DoesNotExist:
-            raise Http404
-
-class OrgAppPackageList(APIView):
+        start, end = upload.parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), instance.file_size)
+    except upload.ContentRangeError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if start > instance.offset:
+        # Chunks must be contiguous, the client should resume from offset.
+        serializer = PackageUploadSerializer(instance)
+        return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+    try:
+        written = upload.write_chunk(instance, request, start, end)
+    except FileNotFoundError:
+        return expired_package_upload(instance)
+    # The offset only grows, update_time keeps an active session from expiring.
+    PackageUpload.objects.filter(pk=instance.pk).update(offset=Greatest('offset', start + written), update_time=timezone.now())
+    instance.refresh_from_db()
+    serializer = PackageUploadSerializer(instance)
+    return Response(serializer.data)
+
+def commit_package_upload(request, instance):
+    serializer = PackageUploadCommitSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    path = upload.part_file_path(instance)
+    if not os.path.exists(path):
+        return expired_package_upload(instance)
+    if instance.offset != instance.file_size or os.path.getsize(path) != instance.file_size:
+        return Response({'detail': 'The upload is incomplete.'}, status=status.HTTP_409_CONFLICT)
+    # Claimed before the part file is read, a concurrent commit of the same
+    # session would create a second package. update_time keeps it from expiring meanwhile.
+    uploading = PackageUpload.objects.filter(pk=instance.pk, state=PackageUpload.State.Uploading)
+    if uploading.update(state=PackageUpload.State.Committing, update_time=timezone.now()) != 1:
+        return committing_package_upload()
+    try:
+        response = create_package_from_upload(request, instance, serializer.validated_data.get('fingerprint', ''))
+    except Exception:
+        PackageUpload.objects.filter(pk=instance.pk).update(state=PackageUpload.State.Uploading)
+        raise
+    if response.status_code == status.HTTP_202_ACCEPTED:
+        upload.remove_part_file(instance)
+        instance.delete()
+    else:
+        # Nothing was created, the client may commit again or abort.
+        PackageUpload.objects.filter(pk=instance.pk).update(state=PackageUpload.State.Uploading)
+    return response
+
+def create_package_from_upload(request, instance, expected):
+    with upload.open_part_file(instance) as file:
+        # Chunks arrive in separate requests and hash state does not outlive
+        # one, so the part file is read once here, for the checksums and the
+        # central directory together.
+        file.ingest = ingest.PackageIngest.from_file(file.file)
+        if expected and expected.lower() != file.ingest.fingerprint:
+            return Response({'fingerprint': ['Fingerprint mismatch.']}, status=status.HTTP_400_BAD_REQUEST)
+        return save_package(request, instance.app, file)
+
+def expired_package_upload(instance):
+    # The part file is gone, the session can not be completed any more.
+    instance.delete()
+    return Response({'detail': 'The upload expired, start a new one.'}, status=status.HTTP_410_GONE)
+
+def abort_package_upload(instance):
+    if instance.state == PackageUpload.State.Committing:
+        return committing_package_upload()
+    upload.remove_part_file(instance)
+    instance.delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+class OrgAppPackageList(ingest.PackageIngestMixin, APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name, app_name):
-        user_org = check_org_view_permission(org_name, request.user)
+        user_org = check_org_view_permission(request, org_name)
         packages = Package.objects.filter(app__org=user_org.org, app__name=app_name)
-        serializer = PackageSerializer(packages, many=True, context={'request': request})
-        return Response(serializer.data)
+        return list_packages(request, packages)
 
     def post(self, request, org_name, app_name):
-        user_org = check_org_upload_app_permission(org_name, request.user)
-        try:
-            app = Application.objects.get(org=user_org.org, name=app_name)
-        except Application.DoesNotExist:
-            raise Http404
+        user_org = check_org_upload_app_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
         return create_package(request, app)
 
 class OrgAppPackageDetail(APIView):
@@ -121,13 +215,13 @@ class OrgAppPackageDetail(APIView):
             raise Http404
 
     def get(self, request, org_name, app_name, internal_build):
-        user_org = check_org_view_permission(org_name, request.user)
+        user_org = check_org_view_permission(request, org_name)
         package = self.get_object(user_org.org, app_name, internal_build)
-        serializer = PackageSerializer(package, context={'request': request})
-        return Response(serializer.data)
+        build = lambda: Response(PackageSerializer(package, context={'request': request}).data)
+        return respond_with_objects(request, [package], build)
 
     def put(self, request, org_name, app_name, internal_build):
-        user_org = check_org_upload_app_permission(org_name, request.user)
+        user_org = check_org_upload_app_permission(request, org_name)
         package = self.get_object(user_org.org, app_name, internal_build)
         serializer = PackageUpdateSerializer(package, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
@@ -136,40 +230,82 @@ class OrgAppPackageDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, org_name, app_name, internal_build):
-        user_org = check_org_upload_app_permission(org_name, request.user)
+        user_org = check_org_upload_app_permission(request, org_name)
         package = self.get_object(user_org.org, app_name, internal_build)
         # todo: released app should not be deleted
         package.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class OrgAppPackageDownload(APIView):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request, org_name, app_name, internal_build):
+        user_org = check_org_view_permission(request, org_name)
+        package = OrgAppPackageDetail().get_object(user_org.org, app_name, internal_build)
+        return download_package(request, app_name, package)
+
+class OrgAppPackageUploadList(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, org_name, app_name):
+        user_org = check_org_upload_app_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
+        return start_package_upload(request, app)
+
+class OrgAppPackageUploadDetail(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, org_name, app_name, upload_id):
+        user_org = check_org_upload_app_permission(request, org_name)
+        instance = get_package_upload(upload_id, app__org=user_org.org, app__name=app_name)
+        serializer = PackageUploadSerializer(instance)
+        return Response(serializer.data)
+
+    def put(self, request, org_name, app_name, upload_id):
+        user_org = check_org_upload_app_permission(request, org_name)
+        instance = get_package_upload(upload_id, app__org=user_org.org, app__name=app_name)
+        return write_package_upload_chunk(request, instance)
+
+    def delete(self, request, org_name, app_name, upload_id):
+        user_org = check_org_upload_app_permission(request, org_name)
+        instance = get_package_upload(upload_id, app__org=user_org.org, app__name=app_name)
+        return abort_package_upload(instance)
+
+class OrgAppPackageUploadCommit(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, org_name, app_name, upload_id):
+        user_org = check_org_upload_app_permission(request, org_name)
+        instance = get_package_upload(upload_id, app__org=user_org.org, app__name=app_name)
+        return commit_package_upload(request, instance)
+
 class OrgAppReleaseList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name, app_name, env):
-        user_org = check_org_view_permission(org_name, request.user)
+        user_org = check_org_view_permission(request, org_name)
         releases = Release.objects.filter(app__org=user_org.org, app__name=app_name, deployment__name=env)
-        serializer = ReleaseSerializer(releases, many=True, context={'request': request})
-        return Response(serializer.data)
+        return list_releases(request, releases)
 
     def post(self, request, org_name, app_name, env):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = ReleaseCreateSerializer(data=request.data, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            app = Application.objects.get(org=user_org.org, name=app_name)
-        except Application.DoesNotExist:
-            raise Http404
+        app = get_org_app(request, user_org.org, app_name)
         try:
             deployment = ReleaseDeploymentKey.objects.get(app=app, name=env)
         except ReleaseDeploymentKey.DoesNotExist:
             raise Http404
         package = Package.objects.get(internal_build=serializer.validated_data['internal_build'], app=app)
-        release_id = Release.objects.filter(app=app).count() + 1
+        if package.state != Package.State.Ready:
+            return Response({'internal_build': ['The package has not been processed.']}, status=status.HTTP_409_CONFLICT)
         enabled = serializer.validated_data['enabled']
         release_notes = serializer.validated_data['release_notes']
+        release_id = sequence.next_release_id(app)
         instance = Release.objects.create(app=app, release_id=release_id, deployment=deployment, package=package, release_notes=release_notes, enabled=enabled)
-        response_serializer = ReleaseSerializer(instance, context={'request': request})
+        manifest.precompute(request, instance)
+        response_serializer = ReleaseDetailSerializer(instance, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 class OrgAppReleaseDetail(APIView):
@@ -177,64 +313,72 @@ class OrgAppReleaseDetail(APIView):
 
     def get_object(self, org, app_name, release_id):
         try:
-            return Release.objects.get(app__org=org, app__name=app_name, release_id=release_id)
+            return Release.objects.select_related('package', 'app').get(app__org=org, app__name=app_name, release_id=release_id)
         except Release.DoesNotExist:
             raise Http404
 
     def get(self, request, org_name, app_name, release_id):
-        user_org = check_org_view_permission(org_name, request.user)
+        user_org = check_org_view_permission(request, org_name)
         release = self.get_object(user_org.org, app_name, release_id)
-        serializer = ReleaseSerializer(release, context={'request': request})
-        return Response(serializer.data)
+        build = lambda: Response(ReleaseDetailSerializer(release, context={'request': request}).data)
+        return respond_with_objects(request, [release, release.package], build, extra=(signed_expiry(),))
 
     def put(self, request, org_name, app_name, release_id):
-        user_org = check_org_upload_app_permission(org_name, request.user)
+        user_org = check_org_upload_app_permission(request, org_name)
         release = self.get_object(user_org.org, app_name, release_id)
         serializer = ReleaseUpdateSerializer(release, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         instance = serializer.save()
-        response_serializer = ReleaseSerializer(instance, context={'request': request})
+        manifest.precompute(request, instance)
+        response_serializer = ReleaseDetailSerializer(instance, context={'request': request})
         return Response(response_serializer.data)
 
     def delete(self, request, org_name, app_name, release_id):
-        user_org = check_org_upload_app_permission(org_name, request.user)
+        user_org = check_org_upload_app_permission(request, org_name)
         release = self.get_object(user_org.org, app_name, release_id)
         # todo: released app should not be deleted
         release.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class OrgAppReleaseDownload(APIView):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request, org_name, app_name, release_id):
+        user_org = check_org_view_permission(request, org_name)
+        release = OrgAppReleaseDetail().get_object(user_org.org, app_name, release_id)
+        return download_package(request, app_name, release.package)
+
 class OrgStoreAppList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name, app_name):
-        user_org = check_org_view_permission(org_name, request.user)
-        releases = StoreApp.objects.filter(app__org=user_org.org, app__name=app_name)
-        serializer = StoreAppSerializer(releases, many=True, context={'request': request})
+        # Versions come from the background refresh, the stores are not called.
+        user_org = check_org_view_permission(request, org_name)
+        store_apps = StoreApp.objects.filter(app__org=user_org.org, app__name=app_name)
+        serializer = StoreAppSerializer(store_apps, many=True, context={'request': request})
         return Response(serializer.data)
 
 class OrgStoreAppVivo(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name, app_name):
-        check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         try:
-            store_app = StoreApp.objects.get(app__name=app_name, store=StoreApp.StoreType.Vivo)
+            store_app = StoreApp.objects.get(app__org=user_org.org, app__name=app_name, store=StoreApp.StoreType.Vivo)
         except StoreApp.DoesNotExist:
             raise Http404
-        serializer = StoreAppVivoAuthSerializer(store_app)
+        serializer = StoreAppVivoAuthSerializer(store_app.auth_data)
         return Response(serializer.data)
 
     def post(self, request, org_name, app_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = StoreAppVivoAuthSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            app = Application.objects.get(org=user_org.org, name=app_name)
-        except Application.DoesNotExist:
-            raise Http404
-        StoreApp.objects.create(app=app, store=StoreApp.StoreType.Vivo, auth_data=serializer.validated_data)
+        app = get_org_app(request, user_org.org, app_name)
+        StoreApp.objects.update_or_create(app=app, store=StoreApp.StoreType.Vivo, defaults={'auth_data': serializer.validated_data})
+        scheduler.refresh()
         return Response(status=status.HTTP_201_CREATED)
 
 class OrgAppReleaseStoreStateList(APIView):
@@ -242,13 +386,13 @@ class OrgAppReleaseStoreStateList(APIView):
 
     def get(self, request, org_name, app_name):
         # filter: store, status ...
-        check_org_view_permission(org_name, request.user)
-        state_list = ReleaseStore.objects.filter(package__app__name=app_name, package__app__org__name=org_name)
+        check_org_view_permission(request, org_name)
+        state_list = ReleaseStore.objects.select_related('package', 'store', 'operator').filter(package__app__name=app_name, package__app__org__name=org_name)
         serializer = ReleaseStoreSerializer(state_list, many=True, context={'request': request})
         return Response(serializer.data)
 
     def post(self, request, org_name, app_name):
-        check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = ReleaseStoreCreateSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -257,96 +401,101 @@ class OrgAppReleaseStoreStateList(APIView):
         store = serializer.validated_data['store']
         release_notes = serializer.validated_data['release_notes']
 
-        package = Package.objects.get(app__name=app_name, internal_build=internal_build)
-        store = StoreApp.objects.get(app__name=app_name, store=store)
-
-        if state == ReleaseStore.State.SubmitReview:
-            pass
-
-        ReleaseStore.objects.create(
+        app = get_org_app(request, user_org.org, app_name)
+        try:
+            package = Package.objects.get(app=app, internal_build=internal_build)
+            store = StoreApp.objects.get(app=app, store=store)
+        except (Package.DoesNotExist, StoreApp.DoesNotExist):
+            raise Http404
+        if package.state != Package.State.Ready:
+            return Response({'internal_build': ['The package has not been processed.']}, status=status.HTTP_409_CONFLICT)
+
+        # A submission starts in the background, the store is never called
+        # from the request. Other states record what was done by hand.
+        submit = state == ReleaseStore.State.SubmitReview
+        instance = ReleaseStore.objects.create(
+            release_store_id=sequence.next_release_store_id(app),
             package=package,
-            release_note=release_notes, 
+            release_notes=release_notes,
             store=store,
-            state=state,
+            state=ReleaseStore.State.Initial if submit else state,
             operator=request.user)
+        if submit:
+            scheduler.submit([instance])
+        response_serializer = ReleaseStoreSerializer(instance, context={'request': request})
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-        return Response(status=status.HTTP_201_CREATED)
-
-
-class OrgAppReleaseStoreStateDetail(APIView):
+class OrgAppPackageStoreList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-    def get(self, request, org_name, app_name, release_store_id):
-        check_org_admin_permission(org_name, request.user)
+    def get_package(self, app, internal_build):
         try:
-            ReleaseStore.objects.get(release_store_id=release_store_id, package__app__name=app_name, package__app__org__name=org_name)
-        except ReleaseStore.DoesNotExist:
+            return Package.objects.get(app=app, internal_build=internal_build)
+        except Package.DoesNotExist:
             raise Http404
 
+    def get(self, request, org_name, app_name, internal_build):
+        user_org = check_org_view_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
+        package = self.get_package(app, internal_build)
+        state_list = ReleaseStore.objects.select_related('package', 'store', 'operator').filter(package=package)
+        serializer = ReleaseStoreSerializer(state_list, many=True, context={'request': request})
+        return Response(serializer.data)
 
+    def post(self, request, org_name, app_name, internal_build):
+        """Submit the package to many stores at once.
 
-# Application
-
-def user_app_viewer_query(ownername, app_name, user):
-    if user.is_authenticated:
-        allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-        q1 = Q(app__name=app_name, app__owner__username=ownername)
-        q2 = Q(app__visibility__in=allow_visibility)
-        q3 = Q(user=user)
-        return (q2 | q3) & q1
-    else:
-        q1 = Q(app__name=app_name, app__owner__username=ownername)
-        q2 = Q(app__visibility=VisibilityType.Public)
-        return q1 & q2
+        One background job calls the stores concurrently, every store gets
+        its own submission whose state tells how it went.
+        """
+        user_org = check_org_admin_permission(request, org_name)
+        serializer = StoreSubmissionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        app = get_org_app(request, user_org.org, app_name)
+        package = self.get_package(app, internal_build)
+        if package.state != Package.State.Ready:
+            return Response({'internal_build': ['The package has not been processed.']}, status=status.HTTP_409_CONFLICT)
+        stores = serializer.validated_data.get('stores', list(registry.adapters))
+        store_apps = list(StoreApp.objects.filter(app=app, store__in=stores).order_by('pk'))
+        if not store_apps:
+            return Response({'stores': ['No store app is set up for these stores.']}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            instances = [ReleaseStore.objects.create(
+                release_store_id=sequence.next_release_store_id(app),
+                package=package,
+                release_notes=serializer.validated_data['release_notes'],
+                store=store_app,
+                state=ReleaseStore.State.Initial,
+                operator=request.user) for store_app in store_apps]
+            scheduler.submit(instances)
+        response_serializer = ReleaseStoreSerializer(instances, many=True, context={'request': request})
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-def check_app_view_permission(ownername, app_name, user):
-    try:
-        return ApplicationUser.objects.get(user_app_viewer_query(ownername, app_name, user))
-    except ApplicationUser.DoesNotExist:
-        raise Http404
+class OrgAppReleaseStoreStateDetail(APIView):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-def check_app_upload_permission(ownername, app_name, user):
-    try:
-        manager_role = ApplicationUser.ApplicationUserRole.Manager
-        developer_role = ApplicationUser.ApplicationUserRole.Developer
-        user_app = ApplicationUser.objects.get(app__name=app_name, app__owner__username=ownername, user=user)
-        if user_app.role != manager_role and user_app.role != developer_role:
-            raise PermissionDenied
-        return user_app
-    except ApplicationUser.DoesNotExist:
+    def get(self, request, org_name, app_name, release_store_id):
+        check_org_view_permission(request, org_name)
         try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Application.objects.get(name=app_name, owner__username=ownername, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Application.DoesNotExist:
+            instance = ReleaseStore.objects.select_related('package', 'store', 'operator').get(release_store_id=release_store_id, package__app__name=app_name, package__app__org__name=org_name)
+        except ReleaseStore.DoesNotExist:
             raise Http404
+        serializer = ReleaseStoreSerializer(instance, context={'request': request})
+        return Response(serializer.data)
 
-def check_app_manager_permission(ownername, app_name, user):
-    try:
-        manager_role = ApplicationUser.ApplicationUserRole.Manager
-        user_app = ApplicationUser.objects.get(app__name=app_name, app__owner__username=ownername, user=user)
-        if user_app.role != manager_role:
-            raise PermissionDenied
-        return user_app
-    except ApplicationUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Application.objects.get(name=app_name, owner__username=ownername, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Application.DoesNotExist:
-            raise Http404
+# Application
 
-class UserAppPackageList(APIView):
+class UserAppPackageList(ingest.PackageIngestMixin, APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, ownername, app_name):
-        user_app = check_app_view_permission(ownername, app_name, request.user)
+        user_app = check_app_view_permission(request, ownername, app_name)
         packages = Package.objects.filter(app=user_app.app)
-        serializer = PackageSerializer(packages, many=True, context={'request': request})
-        return Response(serializer.data)
+        return list_packages(request, packages)
 
     def post(self, request, ownername, app_name):
-        user_app = check_app_upload_permission(ownername, app_name, request.user)
+        user_app = check_app_upload_permission(request, ownername, app_name)
         return create_package(request, user_app.app)
 
 class UserAppPackageDetail(APIView):
@@ -359,13 +508,13 @@ class UserAppPackageDetail(APIView):
             raise Http404
 
     def get(self, request, ownername, app_name, internal_build):
-        user_app = check_app_view_permission(ownername, app_name, request.user)
+        user_app = check_app_view_permission(request, ownername, app_name)
         package = self.get_object(user_app.app, internal_build)
-        serializer = PackageSerializer(package, context={'request': request})
-        return Response(serializer.data)
+        build = lambda: Response(PackageSerializer(package, context={'request': request}).data)
+        return respond_with_objects(request, [package], build)
 
     def put(self, request, ownername, app_name, internal_build):
-        user_app = check_app_upload_permission(ownername, app_name, request.user)
+        user_app = check_app_upload_permission(request, ownername, app_name)
         package = self.get_object(user_app.app, internal_build)
         serializer = PackageUpdateSerializer(package, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
@@ -374,23 +523,64 @@ class UserAppPackageDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, ownername, app_name, internal_build):
-        user_app = check_app_upload_permission(ownername, app_name, request.user)
+        user_app = check_app_upload_permission(request, ownername, app_name)
         package = self.get_object(user_app.app, internal_build)
         # todo: released app should not be deleted
         package.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class UserAppPackageDownload(APIView):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request, ownername, app_name, internal_build):
+        user_app = check_app_view_permission(request, ownername, app_name)
+        package = UserAppPackageDetail().get_object(user_app.app, internal_build)
+        return download_package(request, app_name, package)
+
+class UserAppPackageUploadList(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, ownername, app_name):
+        user_app = check_app_upload_permission(request, ownername, app_name)
+        return start_package_upload(request, user_app.app)
+
+class UserAppPackageUploadDetail(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, ownername, app_name, upload_id):
+        user_app = check_app_upload_permission(request, ownername, app_name)
+        instance = get_package_upload(upload_id, app=user_app.app)
+        serializer = PackageUploadSerializer(instance)
+        return Response(serializer.data)
+
+    def put(self, request, ownername, app_name, upload_id):
+        user_app = check_app_upload_permission(request, ownername, app_name)
+        instance = get_package_upload(upload_id, app=user_app.app)
+        return write_package_upload_chunk(request, instance)
+
+    def delete(self, request, ownername, app_name, upload_id):
+        user_app = check_app_upload_permission(request, ownername, app_name)
+        instance = get_package_upload(upload_id, app=user_app.app)
+        return abort_package_upload(instance)
+
+class UserAppPackageUploadCommit(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, ownername, app_name, upload_id):
+        user_app = check_app_upload_permission(request, ownername, app_name)
+        instance = get_package_upload(upload_id, app=user_app.app)
+        return commit_package_upload(request, instance)
+
 class UserAppReleaseList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, ownername, app_name, env):
-        user_app = check_app_view_permission(ownername, app_name, request.user)
+        user_app = check_app_view_permission(request, ownername, app_name)
         releases = Release.objects.filter(app=user_app.app, deployment__name=env)
-        serializer = ReleaseSerializer(releases, many=True, context={'request': request})
-        return Response(serializer.data)
+        return list_releases(request, releases)
 
     def post(self, request, ownername, app_name, env):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         app = user_app.app
         serializer = ReleaseCreateSerializer(data=request.data, context={'request': request})
         if not serializer.is_valid():
@@ -400,11 +590,14 @@ class UserAppReleaseList(APIView):
         except ReleaseDeploymentKey.DoesNotExist:
             raise Http404
         package = Package.objects.get(internal_build=serializer.validated_data['internal_build'], app=app)
-        release_id = Release.objects.filter(app=app).count() + 1
+        if package.state != Package.State.Ready:
+            return Response({'internal_build': ['The package has not been processed.']}, status=status.HTTP_409_CONFLICT)
         enabled = serializer.validated_data['enabled']
         release_notes = serializer.validated_data['release_notes']
+        release_id = sequence.next_release_id(app)
         instance = Release.objects.create(app=app, release_id=release_id, deployment=deployment, package=package, release_notes=release_notes, enabled=enabled)
-        response_serializer = ReleaseSerializer(instance, context={'request': request})
+        manifest.precompute(request, instance)
+        response_serializer = ReleaseDetailSerializer(instance, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 class UserAppReleaseDetail(APIView):
@@ -412,28 +605,115 @@ class UserAppReleaseDetail(APIView):
 
     def get_object(self, app, release_id):
         try:
-            return Release.objects.get(app=app, release_id=release_id)
+            return Release.objects.select_related('package', 'app').get(app=app, release_id=release_id)
         except Release.DoesNotExist:
             raise Http404
 
     def get(self, request, ownername, app_name, release_id):
-        user_app = check_app_view_permission(ownername, app_name, request.user)
+        user_app = check_app_view_permission(request, ownername, app_name)
         release = self.get_object(user_app.app, release_id)
-        serializer = ReleaseSerializer(release, context={'request': request})
-        return Response(serializer.data)
+        build = lambda: Response(ReleaseDetailSerializer(release, context={'request': request}).data)
+        return respond_with_objects(request, [release, release.package], build, extra=(signed_expiry(),))
 
     def put(self, request, ownername, app_name, release_id):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         release = self.get_object(user_app.app, release_id)
         serializer = ReleaseUpdateSerializer(release, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        serializer.save()
+        instance = serializer.save()
+        manifest.precompute(request, instance)
         return Response(serializer.data)
 
     def delete(self, request, ownername, app_name, release_id):
-        user_app = check_app_manager_permission(ownername, app_name, request.user)
+        user_app = check_app_manager_permission(request, ownername, app_name)
         release = self.get_object(user_app.app, release_id)
         # todo: released app should not be deleted
         release.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+# Installed apps
+
+class UserAppReleaseDownload(APIView):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request, ownername, app_name, release_id):
+        user_app = check_app_view_permission(request, ownername, app_name)
+        release = UserAppReleaseDetail().get_object(user_app.app, release_id)
+        return download_package(request, app_name, release.package)
+
+class UpdateCheck(APIView):
+    """Tell an installed app whether a newer release is available.
+
+    The deployment key identifies the app and environment, so the check needs
+    no user. It reads a single LatestRelease row; a client polling with the
+    ETag of its last answer gets a 304 without anything being serialized.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, deployment_key):
+        try:
+            instance = LatestRelease.objects.get(deployment_key=deployment_key)
+        except LatestRelease.DoesNotExist:
+            raise Http404
+        version = request.GET.get('version', '')
+        bundle_identifier = request.GET.get('bundle_identifier', '')
+        etag = make_etag(instance.revision, version, bundle_identifier, signed_expiry())
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+
+        data = LatestReleaseSerializer(instance, context={'request': request}).data
+        upgrade = latest.find_upgrade(instance, version)
+        if upgrade is not None and upgrade['release_notes']:
+            data['release_notes'] = upgrade['release_notes']
+        data['mandatory'] = upgrade is not None and upgrade['mandatory']
+        data['update_available'] = (not bundle_identifier or bundle_identifier == instance.bundle_identifier) and \
+            (not version or latest.version_key(instance.version) > latest.version_key(version))
+        return set_validators(Response(data), etag=etag)
+
+class SignedDownload(APIView):
+    """Send the file of a signed download link.
+
+    The link carries the file and its expiry, signed with SECRET_KEY, so it
+    is checked without a database query. Responses may be cached until the
+    link expires.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, token):
+        try:
+            name, filename, expires = unsign(token)
+        except signing.BadSignature:
+            raise Http404
+        remaining = expires - int(time.time())
+        if remaining <= 0:
+            return Response({'detail': 'The download link has expired.'}, status=status.HTTP_410_GONE)
+        response = sendfile(request, name, filename)
+        response['Cache-Control'] = 'public, max-age={0}'.format(remaining)
+        return response
+
+class ReleaseManifest(APIView):
+    """The itms-services manifest of an iOS release, for OTA installs.
+
+    Devices fetch it without a session, the link is signed like downloads.
+    Manifests are built when a release is created or changed and kept in
+    the cache if MANIFEST_CACHE is set, a device hit then normally reads
+    neither the database nor the IPA. Disabled releases have none.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, token):
+        try:
+            release_id, expires = manifest.unsign(token)
+        except signing.BadSignature:
+            raise Http404
+        if expires <= int(time.time()):
+            return Response({'detail': 'The install link has expired.'}, status=status.HTTP_410_GONE)
+        content = manifest.load(request, release_id, expires)
+        if content is None:
+            raise Http404
+        return HttpResponse(content, content_type='application/xml')
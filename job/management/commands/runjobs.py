@@ -0,0 +1,58 @@
+import time, multiprocessing
+import django
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# Worker processes import this module before init_process has set up
+# Django, so the models are only imported inside the functions.
+
+def init_process():
+    # Worker processes are spawned rather than forked, so they never share
+    # database connections with the parent and have to set up Django first.
+    django.setup()
+
+def run_job(job_id):
+    from job import queue
+    try:
+        return queue.run(job_id)
+    finally:
+        connections.close_all()
+
+class Command(BaseCommand):
+    help = 'Run background jobs with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty.')
+
+    def handle(self, *args, **options):
+        from job import queue
+        processes = options['processes']
+        # Start the periodic jobs of a fresh or upgraded deployment.
+        queue.start_recurring()
+        context = multiprocessing.get_context('spawn')
+        # Running jobs by their future, a slot frees up as soon as one ends.
+        running = {}
+        renewed = time.monotonic()
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_process) as pool:
+            while True:
+                job_ids = queue.claim(processes - len(running)) if len(running) < processes else []
+                for job_id in job_ids:
+                    running[pool.submit(run_job, job_id)] = job_id
+                if running:
+                    done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        if future.exception() is not None:
+                            self.stderr.write('Job {0} crashed: {1}'.format(job_id, future.exception()))
+                    # Keep the lease of long jobs, well before it runs out.
+                    if running and time.monotonic() - renewed > settings.JOB_QUEUE_LEASE / 3:
+                        queue.renew(list(running.values()))
+                        renewed = time.monotonic()
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
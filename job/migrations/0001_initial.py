@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='The registered name of the task to run.', max_length=64)),
+                ('kwargs', models.JSONField(default=dict, help_text='The keyword arguments the task is called with.')),
+                ('state', models.IntegerField(choices=[(1, 'Pending'), (2, 'Running'), (3, 'Succeeded'), (4, 'Failed')], default=1)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='The job is not picked up before this time.')),
+                ('error', models.CharField(blank=True, max_length=1024)),
+                ('create_time', models.DateTimeField(auto_now_add=True)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'run_after'], name='job_job_state_3bd48e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import models
+from django.utils import timezone
+
+class Job(models.Model):
+    class State(models.IntegerChoices):
+        Pending = 1
+        Running = 2
+        Succeeded = 3
+        Failed = 4
+
+    name = models.CharField(max_length=64, help_text='The registered name of the task to run.')
+    kwargs = models.JSONField(default=dict, help_text='The keyword arguments the task is called with.')
+    state = models.IntegerField(choices=State.choices, default=State.Pending)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text='The job is not picked up before this time.')
+    error = models.CharField(max_length=1024, blank=True)
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'run_after']),
+        ]
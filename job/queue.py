@@ -0,0 +1,114 @@
+import logging, traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from job.models import Job
+
+logger = logging.getLogger(__name__)
+
+tasks = {}
+# Tasks that reschedule themselves, started by start_recurring.
+recurring = []
+
+def task(name, recur=False):
+    """Register a function as the task run for jobs named ``name``.
+
+    A ``recur`` task schedules its next run itself; start_recurring starts
+    it when there is no job of the name yet.
+    """
+    def decorator(func):
+        tasks[name] = func
+        if recur and name not in recurring:
+            recurring.append(name)
+        return func
+    return decorator
+
+def enqueue(name, run_after=None, **kwargs):
+    if name not in tasks:
+        raise KeyError('Unknown task: ' + name)
+    job = Job.objects.create(name=name, kwargs=kwargs, run_after=run_after or timezone.now())
+    # Jobs scheduled for later wait for a worker, even in eager mode.
+    if settings.JOB_QUEUE_EAGER and job.run_after <= timezone.now():
+        transaction.on_commit(lambda: run_eager(job.pk))
+    return job
+
+def schedule(name, run_after):
+    """Make sure a job ``name`` runs no later than ``run_after``.
+
+    For jobs that reschedule themselves: there is at most one pending job of
+    the name, moved earlier when needed.
+    """
+    pending = Job.objects.filter(name=name, state=Job.State.Pending)
+    if pending.filter(run_after__lte=run_after).exists():
+        return
+    if pending.update(run_after=run_after) == 0:
+        enqueue(name, run_after=run_after)
+
+def start_recurring():
+    """Enqueue the recurring tasks that have no pending or running job.
+
+    Run by workers as they start, it is a no-op for the running chains, and
+    picks up chains that are new or that died.
+    """
+    active = set(Job.objects.filter(name__in=recurring, state__in=[Job.State.Pending, Job.State.Running]).values_list('name', flat=True))
+    for name in recurring:
+        if name not in active:
+            enqueue(name)
+
+def claim(limit):
+    """Mark up to ``limit`` due jobs as running and return their ids.
+
+    A job is claimed with a conditional update, so concurrent workers never
+    run the same job twice. Running jobs whose worker went away are picked up
+    again after JOB_QUEUE_LEASE seconds.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.JOB_QUEUE_LEASE)
+    due = Q(state=Job.State.Pending, run_after__lte=now) | Q(state=Job.State.Running, update_time__lt=expired)
+    claimed = []
+    for job_id in Job.objects.filter(due).order_by('run_after').values_list('pk', flat=True)[:limit]:
+        updated = Job.objects.filter(due, pk=job_id).update(state=Job.State.Running, attempts=F('attempts') + 1, update_time=now)
+        if updated == 1:
+            claimed.append(job_id)
+    return claimed
+
+def renew(job_ids):
+    """Extend the lease of running jobs, so jobs that outlive JOB_QUEUE_LEASE are not claimed again."""
+    Job.objects.filter(pk__in=job_ids, state=Job.State.Running).update(update_time=timezone.now())
+
+def run_eager(job_id):
+    if Job.objects.filter(pk=job_id, state=Job.State.Pending).update(state=Job.State.Running, attempts=F('attempts') + 1) == 1:
+        run(job_id)
+
+def run(job_id):
+    """Run a claimed job and record its outcome, retrying with exponential backoff."""
+    job = Job.objects.get(pk=job_id)
+    try:
+        tasks[job.name](**job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.name)
+        job.error = traceback.format_exc()[-1024:]
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_QUEUE_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.state = Job.State.Pending
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.state = Job.State.Failed
+        job.save()
+        return False
+    job.state = Job.State.Succeeded
+    job.save()
+    return True
+
+def run_pending(limit=100):
+    """Claim and run due jobs in this process until none are left."""
+    count = 0
+    while True:
+        job_ids = claim(limit)
+        if not job_ids:
+            return count
+        for job_id in job_ids:
+            run(job_id)
+        count += len(job_ids)
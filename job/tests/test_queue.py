@@ -0,0 +1,120 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from job import queue
+from job.models import Job
+
+calls = []
+
+@queue.task('job.tests.record')
+def record(value):
+    calls.append(value)
+
+@queue.task('job.tests.fail')
+def fail():
+    raise ValueError('failed')
+
+@queue.task('job.tests.tick', recur=True)
+def tick():
+    calls.append('tick')
+
+class JobQueueTest(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_pending(self):
+        job = queue.enqueue('job.tests.record', value=1)
+        self.assertEqual(job.state, Job.State.Pending)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.State.Succeeded)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(queue.run_pending(), 0)
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            queue.enqueue('job.tests.unknown')
+
+    def test_schedule(self):
+        now = timezone.now()
+        queue.schedule('job.tests.record', now + timedelta(minutes=10))
+        queue.schedule('job.tests.record', now + timedelta(minutes=20))
+        queue.schedule('job.tests.record', now + timedelta(minutes=5))
+        self.assertEqual(Job.objects.get().run_after, now + timedelta(minutes=5))
+
+    def test_start_recurring(self):
+        self.assertIn('job.tests.tick', queue.recurring)
+        queue.start_recurring()
+        queue.start_recurring()
+        job = Job.objects.get(name='job.tests.tick')
+        Job.objects.filter(pk=job.pk).update(state=Job.State.Running)
+        queue.start_recurring()
+        self.assertEqual(Job.objects.filter(name='job.tests.tick').count(), 1)
+        # A chain that died is started again.
+        Job.objects.filter(pk=job.pk).update(state=Job.State.Failed)
+        queue.start_recurring()
+        self.assertEqual(Job.objects.filter(name='job.tests.tick', state=Job.State.Pending).count(), 1)
+
+    def test_run_after(self):
+        queue.enqueue('job.tests.record', run_after=timezone.now() + timedelta(hours=1), value=1)
+        self.assertEqual(queue.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_claim_once(self):
+        queue.enqueue('job.tests.record', value=1)
+        queue.enqueue('job.tests.record', value=2)
+        claimed = queue.claim(10)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(queue.claim(10), [])
+
+    @override_settings(JOB_QUEUE_LEASE=60)
+    def test_claim_expired_lease(self):
+        job = queue.enqueue('job.tests.record', value=1)
+        self.assertEqual(queue.claim(10), [job.pk])
+        Job.objects.filter(pk=job.pk).update(update_time=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(queue.claim(10), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOB_QUEUE_LEASE=60)
+    def test_renew(self):
+        job = queue.enqueue('job.tests.record', value=1)
+        self.assertEqual(queue.claim(10), [job.pk])
+        Job.objects.filter(pk=job.pk).update(update_time=timezone.now() - timedelta(seconds=61))
+        queue.renew([job.pk])
+        self.assertEqual(queue.claim(10), [])
+
+    @override_settings(JOB_QUEUE_RETRY_DELAY=10)
+    def test_retry_backoff(self):
+        job = queue.enqueue('job.tests.fail')
+        for attempt in range(1, job.max_attempts):
+            before = timezone.now()
+            with self.assertLogs('job.queue', 'ERROR'):
+                self.assertEqual(queue.run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.state, Job.State.Pending)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('ValueError', job.error)
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10 * 2 ** (attempt - 1)))
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+        with self.assertLogs('job.queue', 'ERROR'):
+            self.assertEqual(queue.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.State.Failed)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertEqual(queue.run_pending(), 0)
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_eager(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = queue.enqueue('job.tests.record', value=1)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.State.Succeeded)
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.enqueue('job.tests.record', run_after=timezone.now() + timedelta(hours=1), value=2)
+        self.assertEqual(calls, [1])
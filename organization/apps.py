@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OrganizationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organization'
+
+    def ready(self):
+        # Invalidate cached permissions when memberships change.
+        from util import permission
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_members(apps, schema_editor):
+    """Keep one membership per user of an organization, the one with the strongest role.
+
+    The check-then-create of the member views could add a user twice.
+    """
+    OrganizationUser = apps.get_model('organization', 'OrganizationUser')
+    duplicates = OrganizationUser.objects.values('org', 'user').annotate(rows=Count('pk')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        rows = OrganizationUser.objects.filter(org=duplicate['org'], user=duplicate['user']).order_by('role', 'pk')
+        OrganizationUser.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_members, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='organizationuser',
+            constraint=models.UniqueConstraint(fields=('org', 'user'), name='unique_org_user'),
+        ),
+    ]
@@ -25,3 +25,8 @@ class OrganizationUser(models.Model):
     role = models.IntegerField(OrganizationUserRole.choices)
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['org', 'user'], name='unique_org_user'),
+        ]
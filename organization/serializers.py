@@ -2,6 +2,7 @@ from rest_framework import serializers
 from organization.models import Organization, OrganizationUser
 from application.models import Application
 from util.choice import ChoiceField
+from util.media import MediaUrlField
 from util.visibility import VisibilityType
 
 class OrganizationSerializer(serializers.ModelSerializer):
@@ -9,14 +10,7 @@ class OrganizationSerializer(serializers.ModelSerializer):
     name = serializers.SlugField(max_length=32)
     description = serializers.CharField(max_length=1024, required=False)
     visibility = ChoiceField(VisibilityType.choices)
-    icon_file = serializers.SerializerMethodField()
-
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.icon_file.url)
-        except:
-            return ''
+    icon_file = MediaUrlField()
 
     class Meta:
         model = Organization
@@ -34,17 +28,10 @@ class UserOrganizationSerializer(serializers.ModelSerializer):
     description = serializers.StringRelatedField(source='org.description', required=False)
     visibility = ChoiceField(VisibilityType.choices, source='org.visibility')
     role = ChoiceField(choices=OrganizationUser.OrganizationUserRole.choices, required=False)
-    icon_file = serializers.SerializerMethodField()
+    icon_file = MediaUrlField(source='org.icon_file')
     update_time = serializers.ReadOnlyField(source='org.update_time')
     create_time = serializers.ReadOnlyField(source='org.create_time')
 
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.org.icon_file.url)
-        except:
-            return ''
-
     class Meta:
         model = OrganizationUser
         fields = ['role', 'name', 'display_name', 'description', 'icon_file', 'visibility', 'update_time', 'create_time']
@@ -71,14 +58,7 @@ class OrgApplicationSerializer(serializers.ModelSerializer):
     release_type = ChoiceField(choices=Application.ReleaseType.choices)
     os = ChoiceField(choices=Application.OperatingSystem.choices, help_text='The OS the app will be running on')
     platform = ChoiceField(choices=Application.Platform.choices, help_text='The platform of the app')
-    icon_file = serializers.SerializerMethodField()
-
-    def get_icon_file(self, obj):
-        try:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.icon_file.url)
-        except:
-            return ''
+    icon_file = MediaUrlField()
 
     class Meta:
         model = Application
@@ -1,6 +1,8 @@
+import base64, json
 from client.api import Api
 from client.client import UnitTestClient
 from util.tests.case import BaseTestCase
+from util.pagination import encode_cursor
 
 class OrganizationListTest(BaseTestCase):
 
@@ -205,11 +207,116 @@ class OrganizationListTest(BaseTestCase):
         resp_org_info = dict([(org['name'], org.get('role', None)) for org in resp_list])
         self.assertDictEqual(resp_org_info, expect_org_info)
 
+    def test_count_and_cursor(self):
+        larry: Api = Api(UnitTestClient('/api'), 'LarryPage', True)
+        bill: Api = Api(UnitTestClient('/api'), 'BillGates', True)
+        names = []
+        for i in range(25):
+            org = self.generate_org(i, ['Public', 'Internal', 'Private'][i % 3])
+            larry.get_user_api().create_org(org)
+            if org['visibility'] != 'Private':
+                names.append(org['name'])
+        private = self.generate_org(100, 'Private')
+        bill.get_user_api().create_org(private)
+        names.append(private['name'])
+
+        r = bill.get_user_api().get_org_list(count=True)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['count'], len(names))
+
+        resp_names = []
+        cursor = None
+        while True:
+            # the token lookup, the ETag aggregate and the page
+            with self.assertNumQueries(3):
+                r = bill.get_user_api().get_org_list(top=7, cursor=cursor)
+            self.assert_status_200(r)
+            resp_names += [org['name'] for org in self.get_resp_list(r)]
+            cursor = r.json().get('cursor')
+            if cursor is None:
+                break
+        self.assertEqual(resp_names, names)
+        self.assertEqual(self.get_resp_list(r)[-1]['role'], 'Admin')
+
+        r = bill.get_user_api().get_org_list(top=7, skip=14)
+        self.assertEqual([org['name'] for org in self.get_resp_list(r)], names[14:21])
+
+        r = bill.get_user_api().get_org_list(top=0)
+        self.assert_status_400(r)
+        r = bill.get_user_api().get_org_list(cursor='invalid')
+        self.assert_status_400(r)
+        for cursor in ('MQ==', 'bnVsbA==', 'WzFd'):
+            r = bill.get_user_api().get_org_list(cursor=cursor)
+            self.assert_status_400(r)
+        r = bill.get_user_api().get_org_list(top=7, sort='update_time')
+        ordering = json.loads(base64.urlsafe_b64decode(r.json()['cursor']))[0]
+        for values in (['x', 'y'], [[1], {}]):
+            r = bill.get_user_api().get_org_list(top=7, sort='update_time', cursor=encode_cursor(ordering, values))
+            self.assert_status_400(r)
+
     def test_order_by(self):
-        pass
+        larry: Api = Api(UnitTestClient('/api'), 'LarryPage', True)
+        orgs = []
+        for i in range(12):
+            org = self.generate_org(i, 'Public')
+            org['display_name'] = 'display {0:02d}'.format(i % 4)
+            larry.get_user_api().create_org(org)
+            orgs.append(org)
+        expected = [org['name'] for org in sorted(orgs, key=lambda org: org['display_name'], reverse=True)]
+
+        for sort in ['-display_name', 'display_name desc']:
+            r = larry.get_user_api().get_org_list(top=5, sort=sort)
+            self.assert_status_200(r)
+            resp_names = [org['name'] for org in self.get_resp_list(r)]
+            cursor = r.json()['cursor']
+            while cursor is not None:
+                r = larry.get_user_api().get_org_list(top=5, sort=sort, cursor=cursor)
+                self.assert_status_200(r)
+                resp_names += [org['name'] for org in self.get_resp_list(r)]
+                cursor = r.json().get('cursor')
+            # Equal display names keep the order they were created in.
+            self.assertEqual(sorted(resp_names, key=lambda name: expected.index(name)), resp_names)
+            self.assertEqual(len(resp_names), 12)
+
+        r = larry.get_user_api().get_org_list(sort='-create_time,name')
+        self.assert_status_200(r)
+        self.assertEqual(self.get_resp_list(r)[0]['name'], orgs[-1]['name'])
+
+        r = larry.get_user_api().get_org_list(top=5, sort='name')
+        cursor = r.json()['cursor']
+        r = larry.get_user_api().get_org_list(top=5, sort='-name', cursor=cursor)
+        self.assert_status_400(r)
+        r = larry.get_user_api().get_org_list(sort='description')
+        self.assert_status_400(r)
+        r = larry.get_user_api().get_org_list(sort='name up')
+        self.assert_status_400(r)
 
     def test_filter(self):
-        pass
+        larry: Api = Api(UnitTestClient('/api'), 'LarryPage', True)
+        visibility = ['Public', 'Internal', 'Private']
+        for i in range(9):
+            larry.get_user_api().create_org(self.generate_org(i, visibility[i % 3]))
+        org = self.generate_org(20, 'Public')
+        org['display_name'] = "Larry's org"
+        larry.get_user_api().create_org(org)
+
+        r = larry.get_user_api().get_org_list(filter="visibility eq 'Private'", count=True)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['count'], 3)
+        self.assertTrue(all(org['visibility'] == 'Private' for org in self.get_resp_list(r)))
+
+        r = larry.get_user_api().get_org_list(filter="visibility ne 'Private' and display_name contains 'larry''s'")
+        self.assert_status_200(r)
+        self.assertEqual([org['name'] for org in self.get_resp_list(r)], [org['name']])
+
+        anonymous: Api = Api(UnitTestClient('/api'))
+        r = anonymous.get_user_api().get_org_list(filter="visibility eq 'Private'", count=True)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()['count'], 0)
+
+        for invalid in ["visibility eq 'Secret'", "description eq 'x'", "name eq", "name eq 'x' or name eq 'y'"]:
+            r = larry.get_user_api().get_org_list(filter=invalid)
+            self.assert_status_400(r)
 
     def test_get_public_org_permission(self):
         api: Api = Api(UnitTestClient('/api'), 'LarryPage', True)
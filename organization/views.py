@@ -1,8 +1,9 @@
+import os
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
 from django.http import Http404
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import F, FilteredRelation, Q
 from django.contrib.auth.models import User
 from rest_framework import permissions, status
 from rest_framework.response import Response
@@ -14,68 +15,61 @@ from application.serializers import ApplicationIconSerializer
 from util.visibility import VisibilityType
 from util.choice import ChoiceField
 from util.reserved import reserved_names
-
-def viewer_query(user, org_name):
-    if user.is_authenticated:
-        allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-        q1 = Q(org__name=org_name)
-        q2 = Q(org__visibility__in=allow_visibility)
-        q3 = Q(user=user)
-        return (q2 | q3) & q1
-    else:
-        q1 = Q(org__name=org_name)
-        q2 = Q(org__visibility=VisibilityType.Public)
-        return q1 & q2
-
-def check_org_view_permission(org_name, user):
-    org_user = OrganizationUser.objects.filter(viewer_query(user, org_name))
-    if not org_user.exists():
-        raise Http404
-    return org_user.first()
-
-def check_org_admin_permission(org_name, user):
-    try:
-        admin_role = OrganizationUser.OrganizationUserRole.Admin
-        user_org = OrganizationUser.objects.get(org__name=org_name, user=user)
-        if user_org.role != admin_role:
-            raise PermissionDenied
-        return user_org
-    except OrganizationUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            Organization.objects.get(name=org_name, visibility__in=allow_visibility)
-            raise PermissionDenied
-        except Organization.DoesNotExist:
-            raise Http404
+from util.conditional import respond_with_objects
+from util.media import media_urls
+from util.sendfile import sendfile
+from util.pagination import ListField, paginate
+from util.permission import check_org_view_permission, check_org_admin_permission, get_org_app
+
+org_list_fields = {
+    'name': ListField('name'),
+    'display_name': ListField('display_name'),
+    'visibility': ListField('visibility', VisibilityType),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
+
+member_list_fields = {
+    'username': ListField('user__username'),
+    'role': ListField('role', OrganizationUser.OrganizationUserRole),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
+
+app_list_fields = {
+    'name': ListField('name'),
+    'display_name': ListField('display_name'),
+    'release_type': ListField('release_type', Application.ReleaseType),
+    'os': ListField('os', Application.OperatingSystem),
+    'platform': ListField('platform', Application.Platform),
+    'update_time': ListField('update_time'),
+    'create_time': ListField('create_time'),
+}
 
 class OrganizationList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request):
-        # order, filter, search
-        # {
-        #     "value": [],
-        #     "count": 30
-        # }
-        top = int(request.GET.get('top', 10))
-        skip = int(request.GET.get('skip', 0))
-        count = True if request.GET.get('count', 'false').lower() == 'true' else False
         if request.user.is_authenticated:
-            # todo
+            # LEFT JOIN the user's own membership, if any, to get the role.
+            orgs = Organization.objects.annotate(
+                membership=FilteredRelation('organizationuser', condition=Q(organizationuser__user=request.user)),
+                role=F('membership__role'))
             allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            orgs = Organization.objects.filter(visibility__in=allow_visibility)
-            user_orgs = OrganizationUser.objects.filter(user=request.user).prefetch_related('org')
-            def not_in_user_orgs(org):
-                return len(list(filter(lambda x: x.org.name==org.name, user_orgs))) == 0
-            orgs = filter(not_in_user_orgs, orgs)
-            data = OrganizationSerializer(orgs, many=True, context={'request': request}).data
-            user_orgs_data = UserOrganizationSerializer(user_orgs, many=True, context={'request': request}).data
-            data.extend(user_orgs_data)
-            return Response(data[skip: skip + top])
+            orgs = orgs.filter(Q(visibility__in=allow_visibility) | Q(role__isnull=False))
         else:
-            orgs = Organization.objects.filter(visibility=VisibilityType.Public).order_by('name')[skip: top + skip]
-            serializer = OrganizationSerializer(orgs, many=True, context={'request': request})
-            return Response(serializer.data)
+            orgs = Organization.objects.filter(visibility=VisibilityType.Public)
+
+        def serialize(orgs):
+            data = OrganizationSerializer(orgs, many=True, context={'request': request}).data
+            role_field = ChoiceField(choices=OrganizationUser.OrganizationUserRole.choices)
+            for org, item in zip(orgs, data):
+                if getattr(org, 'role', None) is not None:
+                    item['role'] = role_field.to_representation(org.role)
+            return data
+        # A role change only touches the membership row.
+        times = ['update_time', 'membership__update_time'] if request.user.is_authenticated else ['update_time']
+        return paginate(request, orgs, ['name'], serialize, org_list_fields, times)
 
     @transaction.atomic
     def post(self, request):
@@ -101,26 +95,17 @@ class OrganizationDetail(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name):
-        if request.user.is_authenticated:
-            try:
-                user_org = OrganizationUser.objects.get(org__name=org_name, user=request.user)
+        user_org = check_org_view_permission(request, org_name)
+        def build():
+            if user_org.role is not None:
                 serializer = UserOrganizationSerializer(user_org, context={'request': request})
-                return Response(serializer.data)
-            except OrganizationUser.DoesNotExist:
-                pass
-        try:
-            if request.user.is_authenticated:
-                allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
             else:
-                allow_visibility = [VisibilityType.Public]
-            org = Organization.objects.get(name=org_name, visibility__in=allow_visibility)
-            serializer = OrganizationSerializer(org, context={'request': request})
+                serializer = OrganizationSerializer(user_org.org, context={'request': request})
             return Response(serializer.data)
-        except Organization.DoesNotExist:
-            raise Http404
+        return respond_with_objects(request, [user_org.org], build, extra=[user_org.role])
 
     def put(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = OrganizationSerializer(user_org.org, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -135,7 +120,7 @@ class OrganizationDetail(APIView):
         return Response(data)
 
     def delete(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         if Application.objects.filter(org=user_org.org).exists():
             raise PermissionDenied
         user_org.org.delete()
@@ -145,21 +130,20 @@ class OrganizationIcon(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, org_name):
-        user_org = check_org_view_permission(org_name, request.user)
+        user_org = check_org_view_permission(request, org_name)
         if not user_org.org.icon_file:
             raise Http404
-        response = Response()
-        response['X-Accel-Redirect'] = user_org.org.icon_file.url
-        return response
+        icon_file = user_org.org.icon_file
+        return sendfile(request, icon_file.name, os.path.basename(icon_file.name), icon_file.storage)
 
     def post(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = OrganizationIconSerializer(user_org.org, data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         instance = serializer.save()
         data = {
-            'icon_file': request.build_absolute_uri(instance.icon_file.url)
+            'icon_file': media_urls(request).url(instance.icon_file.name)
         }
         # todo response no content
         response = Response(data)
@@ -168,7 +152,7 @@ class OrganizationIcon(APIView):
         return response
 
     def delete(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         storage = user_org.org.icon_file.storage
         icon_file = user_org.org.icon_file
         user_org.org.icon_file = None
@@ -180,13 +164,13 @@ class OrganizationUserList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name):
-        check_org_view_permission(org_name, request.user)
-        users = OrganizationUser.objects.filter(org__name=org_name)
-        serializer = OrganizationUserSerializer(users, many=True)
-        return Response(serializer.data)
+        user_org = check_org_view_permission(request, org_name)
+        users = OrganizationUser.objects.filter(org=user_org.org).select_related('user')
+        serialize = lambda users: OrganizationUserSerializer(users, many=True).data
+        return paginate(request, users, ['pk'], serialize, member_list_fields)
 
     def post(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = OrganizationUserAddSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -218,14 +202,14 @@ class OrganizationUserDetail(APIView):
 
     def get(self, request, org_name, username):
         # todo
-        check_org_view_permission(org_name, request.user)
+        check_org_view_permission(request, org_name)
         org_user = self.get_object(org_name, username)
-        serializer = OrganizationUserSerializer(org_user)
-        return Response(serializer.data)
+        build = lambda: Response(OrganizationUserSerializer(org_user).data)
+        return respond_with_objects(request, [org_user], build)
 
     def put(self, request, org_name, username):
         admin_role = OrganizationUser.OrganizationUserRole.Admin
-        check_org_admin_permission(org_name, request.user)
+        check_org_admin_permission(request, org_name)
         org_user = self.get_object(org_name, username)
         serializer = OrganizationUserSerializer(org_user, data=request.data)
         if not serializer.is_valid():
@@ -240,7 +224,7 @@ class OrganizationUserDetail(APIView):
 
     def delete(self, request, org_name, username):
         admin_role = OrganizationUser.OrganizationUserRole.Admin
-        check_org_admin_permission(org_name, request.user)
+        check_org_admin_permission(request, org_name)
         org_user = self.get_object(org_name, username)
 
         if request.user.username == username:
@@ -255,13 +239,13 @@ class OrgApplicationList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_name):
-        check_org_view_permission(org_name, request.user)
-        apps = Application.objects.filter(org__name=org_name)
-        serializer = OrgApplicationSerializer(apps, many=True, context={'request': request})
-        return Response(serializer.data)
+        user_org = check_org_view_permission(request, org_name)
+        apps = Application.objects.filter(org=user_org.org)
+        serialize = lambda apps: OrgApplicationSerializer(apps, many=True, context={'request': request}).data
+        return paginate(request, apps, ['name'], serialize, app_list_fields)
 
     def post(self, request, org_name):
-        user_org = check_org_admin_permission(org_name, request.user)
+        user_org = check_org_admin_permission(request, org_name)
         serializer = OrgApplicationSerializer(data=request.data, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -273,21 +257,15 @@ class OrgApplicationList(APIView):
 class OrgApplicationDetail(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-    def get_object(self, org_name, app_name, for_update=False):
-        try:
-            return Application.objects.get(org__name=org_name, name=app_name)
-        except Application.DoesNotExist:
-            raise Http404
-
     def get(self, request, org_name, app_name):
-        check_org_view_permission(org_name, request.user)
-        app = self.get_object(org_name, app_name)
-        serializer = OrgApplicationSerializer(app, context={'request': request})
-        return Response(serializer.data)
+        user_org = check_org_view_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
+        build = lambda: Response(OrgApplicationSerializer(app, context={'request': request}).data)
+        return respond_with_objects(request, [app], build)
 
     def put(self, request, org_name, app_name):
-        user_org = check_org_admin_permission(org_name, request.user)
-        app = self.get_object(user_org.org.name, app_name)
+        user_org = check_org_admin_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
         serializer = OrgApplicationSerializer(app, data=request.data, partial=True, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -301,8 +279,8 @@ class OrgApplicationDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, org_name, app_name):
-        user_org = check_org_admin_permission(org_name, request.user)
-        app = self.get_object(user_org.org.name, app_name)
+        user_org = check_org_admin_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
         # todo: check users, delete related object
         app.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -310,27 +288,21 @@ class OrgApplicationDetail(APIView):
 class OrgApplicationIcon(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_object(self, org, app_name, for_update=False):
-        try:
-            return Application.objects.get(org=org, name=app_name)
-        except Application.DoesNotExist:
-            raise Http404
-
     def post(self, request, org_name, app_name):
-        user_org = check_org_admin_permission(org_name, request.user)
-        app = self.get_object(user_org.org, app_name, True)
+        user_org = check_org_admin_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
         serializer = ApplicationIconSerializer(app, data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         instance = serializer.save()
         data = {
-            'icon_file': request.build_absolute_uri(instance.icon_file.url)
+            'icon_file': media_urls(request).url(instance.icon_file.name)
         }
         return Response(data)
 
     def delete(self, request, org_name, app_name):
-        user_org = check_org_admin_permission(org_name, request.user)
-        app = self.get_object(user_org.org, app_name, True)
+        user_org = check_org_admin_permission(request, org_name)
+        app = get_org_app(request, user_org.org, app_name)
         storage = app.icon_file.storage
         icon_file = app.icon_file
         app.icon_file = None
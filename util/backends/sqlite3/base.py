@@ -0,0 +1,27 @@
+from django.db.backends.sqlite3 import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite for several worker processes on one node.
+
+    In WAL mode readers go on while a process writes. Transactions take the
+    write lock when they begin, so a writer waits up to OPTIONS ``timeout``
+    seconds for another one instead of failing with "database is locked"
+    when its read lock cannot be upgraded. OPTIONS ``journal_mode`` and
+    ``transaction_mode`` ('deferred') bring back SQLite's defaults.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.journal_mode = kwargs.pop('journal_mode', 'wal')
+        self.transaction_mode = kwargs.pop('transaction_mode', 'immediate').upper()
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute('PRAGMA journal_mode = ' + self.journal_mode)
+        # Durable on commit in WAL mode except on power loss, and much faster.
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN ' + self.transaction_mode)
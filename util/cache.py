@@ -0,0 +1,44 @@
+from pathlib import Path
+from urllib.parse import parse_qsl, urlparse
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+
+# Backends that only live in the process using them.
+PROCESS_LOCAL = (BACKENDS['locmem'], BACKENDS['dummy'])
+
+def parse_cache_url(url, base_dir=None):
+    """The CACHES entry of a cache URL.
+
+    locmem://, dummy://, file:///var/cache/appcenter (relative to ``base_dir``
+    with two slashes), redis://localhost:6379/0, which needs the redis
+    package, memcached://localhost:11211, which needs pymemcache. Query items
+    become OPTIONS.
+    """
+    parts = urlparse(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError('Unsupported cache: ' + url)
+    config = {'BACKEND': BACKENDS[parts.scheme]}
+    options = dict(parse_qsl(parts.query))
+    if options:
+        config['OPTIONS'] = options
+    if parts.scheme == 'file':
+        path = parts.netloc + parts.path
+        if not path.startswith('/') and base_dir is not None:
+            path = str(Path(base_dir) / path)
+        config['LOCATION'] = path
+    elif parts.scheme in ('redis', 'rediss'):
+        config['LOCATION'] = url.split('?')[0]
+    elif parts.scheme == 'memcached':
+        config['LOCATION'] = parts.netloc
+    return config
+
+def is_shared(config):
+    """Whether every worker process sees the same entries of cache ``config``."""
+    return config['BACKEND'] not in PROCESS_LOCAL
@@ -40,7 +40,16 @@ class ChoiceField(serializers.ChoiceField):
         if data == '' and self.allow_blank:
             return ''
 
+        try:
+            return self.label_to_value[data]
+        except (KeyError, TypeError):
+            self.fail('invalid_choice', input=data)
+
+    def _set_choices(self, choices):
+        super()._set_choices(choices)
+        # Labels to values, the first choice wins when labels repeat.
+        self.label_to_value = {}
         for key, val in self._choices.items():
-            if val == data:
-                return key
-        self.fail('invalid_choice', input=data)
+            self.label_to_value.setdefault(str(val), key)
+
+    choices = property(serializers.ChoiceField._get_choices, _set_choices)
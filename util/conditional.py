@@ -0,0 +1,65 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+def not_modified(request, etag=None, last_modified=None):
+    """The 304 response for a request whose validators still match, else None.
+
+    ``last_modified`` is a datetime.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+def respond(request, etag, last_modified, build):
+    """Answer with a 304, or with the response ``build`` returns.
+
+    The validators cover who is asking and how, since permissions decide what
+    the same URL shows to different users.
+    """
+    response = not_modified(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+    if response.status_code in (200, 304):
+        set_validators(response, etag, last_modified)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
+
+def object_validators(request, *objects, extra=()):
+    """Validators of a response built from ``objects``, with no query."""
+    times = [obj.update_time for obj in objects]
+    parts = [request.user.pk, request.get_full_path()] + [obj.pk for obj in objects] + times + list(extra)
+    return make_etag(*parts), max(times)
+
+def respond_with_objects(request, objects, build, extra=()):
+    etag, last_modified = object_validators(request, *objects, extra=extra)
+    return respond(request, etag, last_modified, build)
+
+def queryset_validators(request, queryset, times=('update_time',), extra=()):
+    """The ETag of a response built from ``queryset``, and its row count.
+
+    One aggregate query gives the newest ``times`` and the number of rows;
+    deleting a row changes the count but not the newest time, so collections
+    carry no Last-Modified and validate by ETag only. Deleting a related row,
+    like the user's membership, leaves the list row in place, so the number
+    of rows having each time counts too. Returns ``(etag, count)``.
+    """
+    aggregates = {'count': Count('pk')}
+    for i, lookup in enumerate(times):
+        aggregates['time{0}'.format(i)] = Max(lookup)
+        aggregates['count{0}'.format(i)] = Count(lookup)
+    values = queryset.order_by().aggregate(**aggregates)
+    count = values.pop('count')
+    counts = [values.pop('count{0}'.format(i)) for i in range(len(times))]
+    last_modified = max((value for value in values.values() if value is not None), default=None)
+    return make_etag(request.user.pk, request.get_full_path(), count, last_modified, *counts, *extra), count
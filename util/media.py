@@ -0,0 +1,48 @@
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+class MediaUrls:
+    """Absolute URLs of stored files, for one request.
+
+    The absolute MEDIA_URL (or EXTERNAL_URL based one) is built once, each
+    file then only appends its quoted name, as FileSystemStorage.url() does.
+    Other storages build their own URLs.
+    """
+
+    def __init__(self, request, storage=default_storage):
+        self.request = request
+        self.storage = storage
+        self.base_url = None
+        if isinstance(storage, FileSystemStorage):
+            self.base_url = request.build_absolute_uri(storage.base_url)
+
+    def url(self, name):
+        if not name:
+            return ''
+        if self.base_url is not None:
+            return self.base_url + filepath_to_uri(name).lstrip('/')
+        return self.request.build_absolute_uri(self.storage.url(name))
+
+def media_urls(request):
+    urls = getattr(request, '_media_urls', None)
+    if urls is None:
+        urls = request._media_urls = MediaUrls(request)
+    return urls
+
+class MediaUrlField(serializers.Field):
+    """The absolute URL of a file field or a stored file name.
+
+    ``empty`` stands in when there is no file.
+    """
+
+    def __init__(self, empty='', **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.empty = empty
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if not value or request is None:
+            return self.empty
+        return media_urls(request).url(getattr(value, 'name', value))
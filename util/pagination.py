@@ -0,0 +1,222 @@
+import base64, json, re
+from django.core import exceptions
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from util.conditional import queryset_validators, respond
+
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+class ListField:
+    """A field clients may filter and sort a list on.
+
+    ``lookup`` is the ORM path of the field. For choice fields, clients use
+    the labels of ``choices``, as everywhere else in the API.
+    """
+
+    def __init__(self, lookup, choices=None):
+        self.lookup = lookup
+        self.choices = choices
+
+    def to_internal_value(self, name, value):
+        if self.choices is None:
+            return value
+        for key, label in self.choices.choices:
+            if label == value:
+                return key
+        raise ValidationError({'filter': ['Invalid value for {0}: {1}.'.format(name, value)]})
+
+filter_operators = {
+    'eq': '',
+    'ne': '',
+    'gt': '__gt',
+    'ge': '__gte',
+    'lt': '__lt',
+    'le': '__lte',
+    'contains': '__icontains',
+}
+
+filter_pattern = re.compile(r"\s*(\w+)\s+(eq|ne|gt|ge|lt|le|contains)\s+('(?:[^']|'')*'|[^\s']+)\s*(?:\s(and)\s|$)")
+
+def parse_filter_value(value):
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'")
+    if value in ('true', 'false'):
+        return value == 'true'
+    if value == 'null':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({'filter': ['Invalid value: {0}.'.format(value)]})
+
+def model_field(model, lookup):
+    """The model field at the end of the ORM path ``lookup``."""
+    for name in lookup.split('__'):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+def clean_value(field, value):
+    """``value`` as the Python type of the model ``field``, ValueError when it is not one."""
+    try:
+        value = field.to_python(value)
+        field.get_prep_value(value)
+    except (TypeError, exceptions.ValidationError) as e:
+        raise ValueError(e)
+    return value
+
+def parse_filter(value, fields, model):
+    """Turn ``name eq 'x' and size gt 10`` into a Q object."""
+    q = Q()
+    pos = 0
+    while pos < len(value):
+        m = filter_pattern.match(value, pos)
+        if m is None:
+            raise ValidationError({'filter': ['Invalid filter.']})
+        name, operator, raw = m.group(1), m.group(2), m.group(3)
+        if name not in fields:
+            raise ValidationError({'filter': ['Can not filter on {0}.'.format(name)]})
+        field = fields[name]
+        data = parse_filter_value(raw)
+        if data is not None:
+            data = field.to_internal_value(name, data)
+        if data is not None and operator == 'contains':
+            data = str(data)
+        elif data is not None:
+            try:
+                data = clean_value(model_field(model, field.lookup), data)
+            except ValueError:
+                raise ValidationError({'filter': ['Invalid value for {0}: {1}.'.format(name, raw)]})
+        if data is None:
+            condition = Q(**{field.lookup + '__isnull': True})
+        else:
+            condition = Q(**{field.lookup + filter_operators[operator]: data})
+        q &= ~condition if operator == 'ne' else condition
+        pos = m.end()
+        if m.group(4) is None and pos < len(value):
+            raise ValidationError({'filter': ['Invalid filter.']})
+    return q
+
+def parse_sort(value, fields):
+    """Turn ``name,-update_time`` or ``name asc,update_time desc`` into an ordering."""
+    ordering = []
+    for item in value.split(','):
+        parts = item.split()
+        if not parts or len(parts) > 2 or (len(parts) == 2 and parts[1] not in ('asc', 'desc')):
+            raise ValidationError({'sort': ['Invalid sort.']})
+        name = parts[0]
+        descending = name.startswith('-') or (len(parts) == 2 and parts[1] == 'desc')
+        name = name.lstrip('-')
+        if name not in fields:
+            raise ValidationError({'sort': ['Can not sort on {0}.'.format(name)]})
+        ordering.append(('-' if descending else '') + fields[name].lookup)
+    return ordering
+
+def get_int(request, name, default, minimum=0, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        raise ValidationError({name: ['A valid integer is required.']})
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValidationError({name: ['Out of range.']})
+    return value
+
+def encode_cursor(ordering, values):
+    # str() keeps the microseconds of datetimes, which the keyset compares on.
+    data = json.dumps([ordering, values], default=str).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+def decode_cursor(cursor, ordering, model):
+    try:
+        cursor_ordering, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        # ValueError covers bad base64 and JSON, TypeError a JSON scalar.
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+    if cursor_ordering != ordering or not isinstance(values, list) or len(values) != len(ordering):
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+    try:
+        return [clean_value(model_field(model, lookup.lstrip('-')), value) for lookup, value in zip(ordering, values)]
+    except ValueError:
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+
+def lookup_value(obj, lookup):
+    if isinstance(obj, dict):
+        return obj[lookup.lstrip('-')]
+    for name in lookup.lstrip('-').split('__'):
+        obj = getattr(obj, name)
+    return obj
+
+def keyset_filter(ordering, values):
+    """Rows that come after ``values`` in ``ordering``.
+
+    For an ordering of (a, b) that is ``a > x OR (a = x AND b > y)``, with
+    the comparisons flipped for descending fields.
+    """
+    q = Q()
+    for i in reversed(range(len(ordering))):
+        field = ordering[i].lstrip('-')
+        lookup = '__lt' if ordering[i].startswith('-') else '__gt'
+        after = Q(**{field + lookup: values[i]})
+        q = after if i == len(ordering) - 1 else after | (Q(**{field: values[i]}) & q)
+    return q
+
+def paginate(request, queryset, ordering, serialize, fields=None, times=('update_time',), columns=None):
+    """Respond with one page of ``queryset``.
+
+    ``fields`` maps the names clients may use in ``filter`` and ``sort`` to
+    ``ListField``s, ``ordering`` is used when the client does not sort. The
+    primary key is always the last sort key, so that pages never overlap.
+
+    The page is picked with ``top`` and either ``skip`` or the ``cursor``
+    returned with the previous page. Keyset cursors stay fast on deep pages,
+    where OFFSET has to walk every skipped row. ``count=true`` adds the
+    total number of matching rows.
+
+    ``times`` are the update_time lookups of everything a serialized row
+    shows. Their maximum and the row count validate the response, a client
+    sending them back gets a 304 without the page being read.
+
+    With ``columns``, the page is read with ``values()`` and ``serialize``
+    gets dicts holding those columns instead of model instances.
+    """
+    fields = fields or {}
+    top = get_int(request, 'top', DEFAULT_TOP, 1, MAX_TOP)
+    cursor = request.GET.get('cursor')
+    count = request.GET.get('count', 'false').lower() == 'true'
+    if request.GET.get('filter'):
+        queryset = queryset.filter(parse_filter(request.GET['filter'], fields, queryset.model))
+    if request.GET.get('sort'):
+        ordering = parse_sort(request.GET['sort'], fields)
+    ordering = list(ordering)
+    if ordering[-1].lstrip('-') != 'pk':
+        ordering.append('pk')
+
+    if cursor:
+        values = decode_cursor(cursor, ordering, queryset.model)
+    else:
+        skip = get_int(request, 'skip', 0)
+    etag, total = queryset_validators(request, queryset, times)
+
+    def build():
+        page = queryset.order_by(*ordering)
+        if columns is not None:
+            page = page.values(*dict.fromkeys(list(columns) + [field.lstrip('-') for field in ordering]))
+        if cursor:
+            page = page.filter(keyset_filter(ordering, values))
+        else:
+            page = page[skip:]
+        items = list(page[:top + 1])
+        data = {'value': serialize(items[:top])}
+        if count:
+            data['count'] = total
+        if len(items) > top:
+            last = items[top - 1]
+            data['cursor'] = encode_cursor(ordering, [lookup_value(last, field) for field in ordering])
+        return Response(data)
+    return respond(request, etag, None, build)
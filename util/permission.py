@@ -0,0 +1,193 @@
+import threading, uuid
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import Http404
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from application.models import Application, ApplicationUser
+from organization.models import Organization, OrganizationUser
+from util.replica import primary
+from util.visibility import VisibilityType
+
+# The organization or application a request is about, with the role of the
+# requesting user, or None when the user is not a member.
+OrgPermission = namedtuple('OrgPermission', ['org', 'role'])
+AppPermission = namedtuple('AppPermission', ['app', 'role'])
+
+VERSION_KEY = 'permission:version'
+
+# Hits and misses of the shared cache, for this process.
+stats = Counter()
+stats_lock = threading.Lock()
+
+def count(name):
+    with stats_lock:
+        stats[name] += 1
+
+def cache_stats():
+    with stats_lock:
+        return {'hits': stats['hits'], 'misses': stats['misses']}
+
+def cached(key, load):
+    """Load ``key`` through the cache shared by all requests.
+
+    Entries carry the version of the permissions they were loaded at. Any
+    change to a membership, organization or app replaces the version, which
+    drops every entry at once. Memberships change rarely enough for that to
+    be cheaper than tracking which entries a change touches. The version
+    only changes in the cache of the writing process, so nothing is cached
+    unless PERMISSION_CACHE_TIMEOUT is set, see the settings.
+
+    Permissions are loaded from the primary, a lagging replica would grant a
+    revoked membership and cache it under the new version.
+    """
+    def load_primary():
+        with primary():
+            return load()
+    if not settings.PERMISSION_CACHE_TIMEOUT:
+        return load_primary()
+    values = cache.get_many([VERSION_KEY, key])
+    version = values.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY)
+    entry = values.get(key)
+    if entry is not None and entry[0] == version:
+        count('hits')
+        return entry[1]
+    count('misses')
+    value = load_primary()
+    cache.set(key, (version, value), settings.PERMISSION_CACHE_TIMEOUT)
+    return value
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_metrics(request):
+    """Hits and misses of the permission cache in this process."""
+    metrics = cache_stats()
+    total = metrics['hits'] + metrics['misses']
+    metrics['hit_ratio'] = metrics['hits'] / total if total else 0
+    metrics['enabled'] = bool(settings.PERMISSION_CACHE_TIMEOUT)
+    return Response(metrics)
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender=OrganizationUser)
+@receiver(post_delete, sender=OrganizationUser)
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+@receiver(post_save, sender=ApplicationUser)
+@receiver(post_delete, sender=ApplicationUser)
+def permission_changed(sender, **kwargs):
+    invalidate()
+    # A request loading the old rows before the commit would cache them under
+    # the new version, so drop them again once the change is visible.
+    transaction.on_commit(invalidate)
+
+def memoize(request, key, load):
+    """Load ``key`` at most once per request."""
+    memo = getattr(request, '_permission_cache', None)
+    if memo is None:
+        memo = request._permission_cache = {}
+    if key not in memo:
+        memo[key] = load()
+    return memo[key]
+
+def can_view(user, visibility, role):
+    if role is not None or visibility == VisibilityType.Public:
+        return True
+    return user.is_authenticated and visibility == VisibilityType.Internal
+
+def check_role(user, visibility, role, roles):
+    if role in roles:
+        return
+    if role is not None or visibility in (VisibilityType.Public, VisibilityType.Internal):
+        raise PermissionDenied
+    raise Http404
+
+def get_org_permission(request, org_name):
+    def load():
+        orgs = Organization.objects.filter(name=org_name)
+        if request.user.is_authenticated:
+            members = OrganizationUser.objects.filter(org=OuterRef('pk'), user=request.user)
+            orgs = orgs.annotate(role=Subquery(members.values('role')[:1]))
+        org = orgs.first()
+        if org is None:
+            return None
+        return OrgPermission(org, getattr(org, 'role', None))
+    key = 'permission:org:{0}:{1}'.format(request.user.pk, org_name)
+    return memoize(request, ('org', org_name), lambda: cached(key, load))
+
+def check_org_view_permission(request, org_name):
+    permission = get_org_permission(request, org_name)
+    if permission is None or not can_view(request.user, permission.org.visibility, permission.role):
+        raise Http404
+    return permission
+
+def check_org_roles(request, org_name, roles):
+    permission = get_org_permission(request, org_name)
+    if permission is None:
+        raise Http404
+    check_role(request.user, permission.org.visibility, permission.role, roles)
+    return permission
+
+def check_org_upload_app_permission(request, org_name):
+    roles = (OrganizationUser.OrganizationUserRole.Admin, OrganizationUser.OrganizationUserRole.Collaborator)
+    return check_org_roles(request, org_name, roles)
+
+def check_org_admin_permission(request, org_name):
+    return check_org_roles(request, org_name, (OrganizationUser.OrganizationUserRole.Admin,))
+
+def get_org_app(request, org, app_name):
+    def load():
+        try:
+            app = Application.objects.get(org=org, name=app_name)
+        except Application.DoesNotExist:
+            raise Http404
+        app.org = org
+        return app
+    return memoize(request, ('org_app', org.pk, app_name), load)
+
+def get_app_permission(request, ownername, app_name):
+    def load():
+        apps = Application.objects.filter(name=app_name, owner__username=ownername)
+        if request.user.is_authenticated:
+            members = ApplicationUser.objects.filter(app=OuterRef('pk'), user=request.user)
+            apps = apps.annotate(role=Subquery(members.values('role')[:1]))
+        app = apps.first()
+        if app is None:
+            return None
+        return AppPermission(app, getattr(app, 'role', None))
+    key = 'permission:app:{0}:{1}:{2}'.format(request.user.pk, ownername, app_name)
+    return memoize(request, ('app', ownername, app_name), lambda: cached(key, load))
+
+def check_app_view_permission(request, ownername, app_name):
+    permission = get_app_permission(request, ownername, app_name)
+    if permission is None or not can_view(request.user, permission.app.visibility, permission.role):
+        raise Http404
+    return permission
+
+def check_app_roles(request, ownername, app_name, roles):
+    permission = get_app_permission(request, ownername, app_name)
+    if permission is None:
+        raise Http404
+    check_role(request.user, permission.app.visibility, permission.role, roles)
+    return permission
+
+def check_app_upload_permission(request, ownername, app_name):
+    roles = (ApplicationUser.ApplicationUserRole.Manager, ApplicationUser.ApplicationUserRole.Developer)
+    return check_app_roles(request, ownername, app_name, roles)
+
+def check_app_manager_permission(request, ownername, app_name):
+    return check_app_roles(request, ownername, app_name, (ApplicationUser.ApplicationUserRole.Manager,))
@@ -0,0 +1,132 @@
+import contextlib, contextvars, hashlib, random, threading
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+STICKY_COOKIE = 'appcenter_primary'
+
+class Routing:
+    """Where the queries of the current request go."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+routing = contextvars.ContextVar('appcenter.routing', default=None)
+
+class ReplicaRouter:
+    """Send the reads of GET handlers to a replica, everything else to the primary.
+
+    ReplicaMiddleware picks the replica of a request. Once the request has
+    written, select_for_update included, its reads go back to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        current = routing.get()
+        if current is None or current.replica is None or current.wrote:
+            return DEFAULT_DB_ALIAS
+        return current.replica
+
+    def db_for_write(self, model, **hints):
+        current = routing.get()
+        if current is not None:
+            current.wrote = True
+        # Instances read from a replica are saved to the primary too.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+@contextlib.contextmanager
+def primary():
+    """Read from the primary inside the block, for reads a lagging replica must not answer."""
+    current = routing.get()
+    if current is None or current.replica is None:
+        yield
+        return
+    replica, current.replica = current.replica, None
+    try:
+        yield
+    finally:
+        current.replica = replica
+
+def client_key(request):
+    """A cache key of the client, from its token or session, None for anonymous ones."""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'util.replica.sticky.' + hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+queries = Counter()
+queries_lock = threading.Lock()
+
+def count_queries(execute, sql, params, many, context):
+    with queries_lock:
+        queries[context['connection'].alias] += 1
+    return execute(sql, params, many, context)
+
+class ReplicaMiddleware:
+    """Route the GET requests of DATABASE_REPLICA_APPS to a replica.
+
+    A client that wrote reads from the primary for the next
+    DATABASE_REPLICA_STICKY_SECONDS, which covers the replication lag: the
+    sticky mark is kept in the cache and, for browsers, in a cookie. The
+    settings refuse replicas without a cache shared by the worker processes,
+    which token clients depend on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in connections:
+            wrappers = connections[alias].execute_wrappers
+            if count_queries not in wrappers:
+                wrappers.append(count_queries)
+        current = Routing()
+        token = routing.set(current)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing.reset(token)
+        if current.wrote and settings.DATABASE_REPLICAS:
+            sticky = settings.DATABASE_REPLICA_STICKY_SECONDS
+            key = client_key(request)
+            if key is not None:
+                cache.set(key, True, sticky)
+            response.set_cookie(STICKY_COOKIE, '1', max_age=sticky, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD'):
+            return None
+        if view_func.__module__.split('.')[0] not in settings.DATABASE_REPLICA_APPS:
+            return None
+        if STICKY_COOKIE in request.COOKIES:
+            return None
+        key = client_key(request)
+        if key is not None and cache.get(key):
+            return None
+        routing.get().replica = random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def database_metrics(request):
+    """Queries run by this process per database alias, and the share read from replicas."""
+    with queries_lock:
+        counts = dict(queries)
+    total = sum(counts.values())
+    replica = sum(count for alias, count in counts.items() if alias != DEFAULT_DB_ALIAS)
+    return Response({
+        'queries': counts,
+        'replica_ratio': replica / total if total else 0,
+    })
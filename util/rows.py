@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from util.media import media_urls
+
+class RowSerializer:
+    """Read-only serialization of ``values()`` rows, for large lists.
+
+    Stands in for a DRF serializer on list endpoints: ``fields`` are
+    ``(name, column, convert)`` in the order the serializer outputs them,
+    ``convert`` is None or one of the converters below. The output is the
+    same JSON, None values are dropped like NonNullModelSerializer does.
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.columns = list(dict.fromkeys(column for name, column, convert in fields))
+
+    def compile(self, request):
+        """The function turning a list of rows into a list of dicts."""
+        fields = [(name, column, convert(request) if convert else None) for name, column, convert in self.fields]
+        plain = tuple((name, column) for name, column, convert in fields if convert is None)
+        converted = tuple((name, column, convert) for name, column, convert in fields if convert is not None)
+        order = [name for name, column, convert in fields]
+
+        def serialize(rows):
+            result = []
+            for row in rows:
+                values = {name: row[column] for name, column in plain}
+                for name, column, convert in converted:
+                    values[name] = convert(row[column])
+                result.append({name: values[name] for name in order if values[name] is not None})
+            return result
+        return serialize
+
+# Converters take the request and return the function applied to a column.
+
+_datetime_field = serializers.DateTimeField()
+
+def datetime(request):
+    # DateTimeField looks the format and time zone up for every value.
+    if (api_settings.DATETIME_FORMAT or '').lower() != ISO_8601 or not settings.USE_TZ:
+        return _datetime_field.to_representation
+    tz = timezone.get_current_timezone()
+    def convert(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat() if timezone.is_aware(value) else timezone.make_aware(value, tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+def choice(choices):
+    labels = dict(choices.choices)
+    def convert(request):
+        return labels.__getitem__
+    return convert
+
+def media_url(empty=''):
+    def convert(request):
+        url = media_urls(request).url
+        return lambda name: url(name) if name else empty
+    return convert
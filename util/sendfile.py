@@ -0,0 +1,92 @@
+import mimetypes, re
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import content_disposition_header
+from util.conditional import make_etag
+
+CHUNK_SIZE = 64 * 1024
+
+mimetypes.add_type('application/vnd.android.package-archive', '.apk')
+mimetypes.add_type('application/octet-stream', '.ipa')
+
+range_pattern = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header, size):
+    """The ``(start, end)`` of a single byte range, ``end`` included.
+
+    None when the whole file is sent: no header, several ranges or a header
+    that does not parse, which RFC 7233 allows to ignore.
+    """
+    m = range_pattern.match(header or '')
+    if m is None or (not m.group(1) and not m.group(2)):
+        return None
+    if not m.group(1):
+        length = int(m.group(2))
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+def read_range(file, start, end):
+    try:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = file.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+def sendfile(request, name, filename, storage=default_storage):
+    """Respond with the stored file ``name`` as an attachment called ``filename``.
+
+    Call it after the permission check. Behind nginx the response only names
+    the file in X-Accel-Redirect, nginx sends it with sendfile and answers
+    Range requests itself. Without SENDFILE_ACCEL_LOCATION the file is
+    streamed by Django, with single byte ranges so downloads can resume.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # Stored files are named by their content and never rewritten.
+    etag = make_etag(name)
+    if settings.SENDFILE_ACCEL_LOCATION:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.SENDFILE_ACCEL_LOCATION + filepath_to_uri(name)
+    else:
+        try:
+            file = storage.open(name, 'rb')
+        except FileNotFoundError:
+            raise Http404
+        size = file.size
+        if_range = request.headers.get('If-Range')
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size) if if_range in (None, etag) else None
+        except RangeNotSatisfiable:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{0}'.format(size)
+            return response
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(file, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(start, end, size)
+            response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['ETag'] = etag
+    return response
@@ -1,15 +1,43 @@
-import os, shutil
+import os, shutil, requests
+from django.core.cache import cache
 from django.test import TestCase
 
+SAMPLES_URL = 'https://raw.githubusercontent.com/bitbar/test-samples/master/apps/'
+
+def download_sample(path, url):
+    if not os.path.exists('downloads'):
+        os.makedirs('downloads')
+    if not os.path.exists(path):
+        with requests.get(url, stream=True) as r:
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(r.raw, f)
+    return path
+
+def sample_apk():
+    """Path of a sample APK, downloaded on first use."""
+    return download_sample('downloads/android-sample.apk', SAMPLES_URL + 'android/bitbar-sample-app.apk')
+
+def sample_ipa():
+    """Path of a sample IPA, downloaded on first use."""
+    return download_sample('downloads/ios-sample.ipa', SAMPLES_URL + 'ios/bitbar-ios-sample.ipa')
+
 class BaseTestCase(TestCase):
 
     def setUp(self):
+        # Rolled back rows do not send signals, drop what earlier tests cached.
+        cache.clear()
         db_path = 'db.sqlite3'
         db_bak_path = 'downloads/db_bak.sqlite3'
         if os.path.exists(db_path) and os.path.exists(db_bak_path):
             os.remove(db_path)
             shutil.copyfile(db_bak_path, db_path)
 
+    def sample_apk(self):
+        return sample_apk()
+
+    def sample_ipa(self):
+        return sample_ipa()
+
     def get_message(self, resp):
         try:
             return resp.json()
@@ -25,6 +53,9 @@ class BaseTestCase(TestCase):
     def assert_status_201(self, resp):
         self.assert_status(resp, 201)
 
+    def assert_status_202(self, resp):
+        self.assert_status(resp, 202)
+
     def assert_status_204(self, resp):
         self.assert_status(resp, 204)
 
@@ -17,8 +17,8 @@ class ApiClient:
         def get_one(self, ownername, name):
             return self.client.get('users/' + ownername + '/apps/' + name)
 
-        def get_list(self, ownername):
-            return self.client.get('users/' + ownername + '/apps')
+        def get_list(self, ownername, query=None):
+            return self.client.get('users/' + ownername + '/apps', query)
 
         def modify(self, ownername, name, app):
             return self.client.put('users/' + ownername + '/apps/' + name, app)
@@ -48,8 +48,8 @@ class ApiClient:
         def get_member(self, ownername, name, username):
             return self.client.get('users/' + ownername + '/apps/' + name + '/people/collaborators/' + username)
 
-        def get_member_list(self, ownername, name):
-            return self.client.get('users/' + ownername + '/apps/' + name + '/people/collaborators')
+        def get_member_list(self, ownername, name, query=None):
+            return self.client.get('users/' + ownername + '/apps/' + name + '/people/collaborators', query)
 
         def change_member_role(self, ownername, name, collaborator, role):
             data = {
@@ -65,11 +65,34 @@ class ApiClient:
                 data = {'file': fp}
                 return self.client.upload_post('users/' + ownername + '/apps/' + name + '/distribute/packages', data=data)
 
+        def start_upload(self, ownername, name, file_name, file_size):
+            data = {
+                'file_name': file_name,
+                'file_size': file_size
+            }
+            return self.client.post('users/' + ownername + '/apps/' + name + '/distribute/packages/uploads', data)
+
+        def get_upload(self, ownername, name, upload_id):
+            return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/packages/uploads/' + upload_id)
+
+        def upload_chunk(self, ownername, name, upload_id, data, start, total):
+            content_range = 'bytes {0}-{1}/{2}'.format(start, start + len(data) - 1, total)
+            return self.client.upload_put('users/' + ownername + '/apps/' + name + '/distribute/packages/uploads/' + upload_id, data, content_range)
+
+        def commit_upload(self, ownername, name, upload_id, fingerprint=None):
+            data = {}
+            if fingerprint is not None:
+                data['fingerprint'] = fingerprint
+            return self.client.post('users/' + ownername + '/apps/' + name + '/distribute/packages/uploads/' + upload_id + '/commit', data)
+
+        def abort_upload(self, ownername, name, upload_id):
+            return self.client.delete('users/' + ownername + '/apps/' + name + '/distribute/packages/uploads/' + upload_id)
+
         def get_package(self, ownername, name, internal_build):
             return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/packages/' + str(internal_build))
 
-        def get_package_list(self, ownername, name):
-            return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/packages')
+        def get_package_list(self, ownername, name, query=None):
+            return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/packages', query)
 
         def modify_package(self, ownername, name, internal_build, package):
             return self.client.put('users/' + ownername + '/apps/' + name + '/distribute/packages/' + str(internal_build), package)
@@ -83,8 +106,8 @@ class ApiClient:
         def get_release(self, ownername, name, release_id):
             return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/releases/' + str(release_id))
 
-        def get_release_list(self, ownername, name, env):
-            return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/releases/env/' + env)
+        def get_release_list(self, ownername, name, env, query=None):
+            return self.client.get('users/' + ownername + '/apps/' + name + '/distribute/releases/env/' + env, query)
 
         def modify_release(self, ownername, name, release_id, release):
             return self.client.put('users/' + ownername + '/apps/' + name + '/distribute/releases/' + str(release_id), release)
@@ -104,8 +127,8 @@ class ApiClient:
         def get_one(self, name):
             return self.client.get('orgs/' + name)
 
-        def get_list(self):
-            return self.client.get('orgs')
+        def get_list(self, query=None):
+            return self.client.get('orgs', query)
 
         def modify(self, name, org):
             return self.client.put('orgs/' + name, org)
@@ -136,8 +159,8 @@ class ApiClient:
         def get_member(self, name, username):
             return self.client.get('orgs/' + name + '/people/collaborators/' + username)
 
-        def get_member_list(self, name):
-            return self.client.get('orgs/' + name + '/people/collaborators')
+        def get_member_list(self, name, query=None):
+            return self.client.get('orgs/' + name + '/people/collaborators', query)
 
         def change_member_role(self, name, collaborator, role):
             data = {
@@ -154,8 +177,8 @@ class ApiClient:
         def get_app(self, name, app_name):
             return self.client.get('orgs/' + name + '/apps/' + app_name)
         
-        def get_app_list(self, name):
-            return self.client.get('orgs/' + name + '/apps')
+        def get_app_list(self, name, query=None):
+            return self.client.get('orgs/' + name + '/apps', query)
 
         def modify_app(self, name, app_name, app):
             return self.client.put('orgs/' + name + '/apps/' + app_name, app)
@@ -185,11 +208,34 @@ class ApiClient:
                 data = {'file': fp}
                 return self.client.upload_post('orgs/' + name + '/apps/' + app_name + '/distribute/packages', data=data)
 
+        def start_upload(self, name, app_name, file_name, file_size):
+            data = {
+                'file_name': file_name,
+                'file_size': file_size
+            }
+            return self.client.post('orgs/' + name + '/apps/' + app_name + '/distribute/packages/uploads', data)
+
+        def get_upload(self, name, app_name, upload_id):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/packages/uploads/' + upload_id)
+
+        def upload_chunk(self, name, app_name, upload_id, data, start, total):
+            content_range = 'bytes {0}-{1}/{2}'.format(start, start + len(data) - 1, total)
+            return self.client.upload_put('orgs/' + name + '/apps/' + app_name + '/distribute/packages/uploads/' + upload_id, data, content_range)
+
+        def commit_upload(self, name, app_name, upload_id, fingerprint=None):
+            data = {}
+            if fingerprint is not None:
+                data['fingerprint'] = fingerprint
+            return self.client.post('orgs/' + name + '/apps/' + app_name + '/distribute/packages/uploads/' + upload_id + '/commit', data)
+
+        def abort_upload(self, name, app_name, upload_id):
+            return self.client.delete('orgs/' + name + '/apps/' + app_name + '/distribute/packages/uploads/' + upload_id)
+
         def get_package(self, name, app_name, internal_build):
             return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/packages/' + str(internal_build))
 
-        def get_package_list(self, name, app_name):
-            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/packages')
+        def get_package_list(self, name, app_name, query=None):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/packages', query)
 
         def modify_package(self, name, app_name, internal_build, package):
             return self.client.put('orgs/' + name + '/apps/' + app_name + '/distribute/packages/' + str(internal_build), package)
@@ -203,8 +249,8 @@ class ApiClient:
         def get_release(self, name, app_name, release_id):
             return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/releases/' + str(release_id))
 
-        def get_release_list(self, name, app_name, env):
-            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/releases/env/' + env)
+        def get_release_list(self, name, app_name, env, query=None):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/releases/env/' + env, query)
 
         def modify_release(self, name, app_name, release_id, release):
             return self.client.put('orgs/' + name + '/apps/' + app_name + '/distribute/releases/' + str(release_id), release)
@@ -212,6 +258,30 @@ class ApiClient:
         def remove_release(self, name, app_name, release_id):
             return self.client.delete('orgs/' + name + '/apps/' + app_name + '/distribute/releases/' + str(release_id))            
 
+        def get_store_app_list(self, name, app_name):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/stores')
+
+        def set_vivo_store(self, name, app_name, auth_data):
+            return self.client.post('orgs/' + name + '/apps/' + app_name + '/distribute/stores/vivo', auth_data)
+
+        def get_vivo_store(self, name, app_name):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/stores/vivo')
+
+        def submit_to_stores(self, name, app_name, internal_build, submission):
+            return self.client.post('orgs/' + name + '/apps/' + app_name + '/distribute/packages/' + str(internal_build) + '/stores', submission)
+
+        def get_package_store_list(self, name, app_name, internal_build):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/packages/' + str(internal_build) + '/stores')
+
+        def create_store_release(self, name, app_name, release):
+            return self.client.post('orgs/' + name + '/apps/' + app_name + '/distribute/stores/releases', release)
+
+        def get_store_release(self, name, app_name, release_store_id):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/stores/releases/' + str(release_store_id))
+
+        def get_store_release_list(self, name, app_name):
+            return self.client.get('orgs/' + name + '/apps/' + app_name + '/distribute/stores/releases')
+
     class UserClient:
 
         def __init__(self, client):
@@ -23,8 +23,8 @@ class DjangoTestClient:
     def build_url(self, path):
         return self.base_url + path
 
-    def get(self, path):
-        return self.client.get(self.build_url(path), HTTP_AUTHORIZATION=self.token)
+    def get(self, path, query=None):
+        return self.client.get(self.build_url(path), data=query, HTTP_AUTHORIZATION=self.token)
 
     def post(self, path, body):
         content_type = 'application/json'
@@ -40,3 +40,6 @@ class DjangoTestClient:
     def upload_post(self, path, data):
         return self.client.post(self.build_url(path), data=data, format="multipart", HTTP_AUTHORIZATION=self.token)
 
+    def upload_put(self, path, data, content_range):
+        content_type = 'application/octet-stream'
+        return self.client.put(self.build_url(path), data, content_type=content_type, HTTP_CONTENT_RANGE=content_range, HTTP_AUTHORIZATION=self.token)
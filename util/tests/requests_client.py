@@ -30,8 +30,8 @@ class RequestsClient:
             }
         return {}
 
-    def get(self, path):
-        return requests.get(self.build_url(path), headers=self.headers())
+    def get(self, path, query=None):
+        return requests.get(self.build_url(path), params=query, headers=self.headers())
 
     def post(self, path, body):
         return requests.post(self.build_url(path), json=body, headers=self.headers())
@@ -44,3 +44,9 @@ class RequestsClient:
 
     def upload_post(self, path, data):
         return requests.post(self.build_url(path), files=data, headers=self.headers())
+
+    def upload_put(self, path, data, content_range):
+        headers = self.headers()
+        headers['Content-Type'] = 'application/octet-stream'
+        headers['Content-Range'] = content_range
+        return requests.put(self.build_url(path), data=data, headers=headers)